@@ -1,38 +1,59 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from flask_mysqldb import MySQL
-from werkzeug.security import generate_password_hash, check_password_hash
 import os
-import joblib
-import pandas as pd
+import json
+import base64
+import hmac
+import atexit
+import math
+import time
+from datetime import datetime
+from functools import wraps
+from inference import predict_risk
+from batcher import MicroBatcher
+from availability import RotaAvailability
+from geo_index import valid_coordinates
+from knowledge_base import ArtifactRegistry
+from history_writer import HistoryWriter
+from password_hasher import HasherBusy, PasswordHasher
+from storage import create_storage
+from history_export import FORMATS as EXPORT_FORMATS, ExportProgress, encode as encode_export, parse_filters as parse_export_filters, parse_time
+from rollups import GRANULARITIES, MAX_BUCKETS, dashboard, floor_time, rollup_rows
+from triage_queue import TriageQueue
+from vitals import VitalsStore
+from result_cache import ResultCache, normalize_text
+from streaming import NDJSON, advice_frames, error_frames, paced, tracked
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ROUTE_KEY as METRICS_ROUTE_KEY, MetricsRegistry, RequestMetrics
+from profiler import Profiler, ProfileMiddleware, chrome_trace
 
 # ================= APP =================
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["X-Next-Cursor", "Link", "X-KB-Version"])
 
 # ================= PATH =================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# ================= ML LOAD =================
-model = joblib.load(os.path.join(BASE_DIR, "risk_model.pkl"))
-vectorizer = joblib.load(os.path.join(BASE_DIR, "vectorizer.pkl"))
-print("✅ ML model loaded")
+# ================= PASSWORD HASHING =================
+# Hashes run on a process pool (see password_hasher.py). The method string
+# sets the cost; changing it rehashes each account at its next login.
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+app.config["PASSWORD_HASH_MAX_PENDING"] = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 16))
 
-# ================= TRAINING DATA =================
-training_data = pd.read_csv(
-    os.path.join(BASE_DIR, "training_data.csv"),
-    encoding="latin1"
+password_hasher = PasswordHasher(
+    app.config["PASSWORD_HASH_METHOD"],
+    workers=app.config["PASSWORD_HASH_WORKERS"],
+    max_pending=app.config["PASSWORD_HASH_MAX_PENDING"]
 )
-training_data["text"] = training_data["text"].str.lower().str.strip()
-training_data["doctor"] = training_data["doctor"].str.lower().str.strip()
-training_data["risk"] = training_data["risk"].str.strip()
-
-# ================= DOCTORS DATA =================
-doctors_data = pd.read_csv(
-    os.path.join(BASE_DIR, "doctors_ahmedabad.csv"),
-    encoding="latin1"
-)
-doctors_data["specialization"] = doctors_data["specialization"].str.lower().str.strip()
+# Started before anything else in the app spawns threads
+password_hasher.start()
+atexit.register(password_hasher.close)
+
+def busy_response():
+    response = jsonify({"message": "Server busy, please retry"})
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
 
 # ================= SPECIALIZATION MAP =================
 SPECIALIZATION_MAP = {
@@ -55,41 +76,227 @@ SPECIALIZATION_MAP = {
     "dentist": "dentist"
 }
 
-# ================= DOCTOR MATCH HELPER =================
-def get_doctors_by_specialization(doctor_text):
-    doctor_text = doctor_text.lower().strip()
+# ================= SYMPTOM KEYWORD MAP =================
+# Fallback map for common symptoms -> specialists
+SYMPTOM_KEYWORD_MAP = {
+    "heart": "cardiologist", "chest": "cardiologist", "breath": "cardiologist", "palpitation": "cardiologist",
+    "head": "neurologist", "dizzy": "neurologist", "faint": "neurologist", "seizure": "neurologist", "stroke": "neurologist",
+    "bone": "orthopedic", "joint": "orthopedic", "fracture": "orthopedic", "knee": "orthopedic", "back": "orthopedic",
+    "skin": "dermatologist", "rash": "dermatologist", "itch": "dermatologist", "acne": "dermatologist",
+    "stomach": "gastroenterologist", "abdominal": "gastroenterologist", "vomit": "gastroenterologist", "diarrhea": "gastroenterologist",
+    "throat": "ent", "ear": "ent", "nose": "ent", "cold": "general physician", "flu": "general physician", "fever": "general physician",
+    "lung": "pulmonologist", "cough": "pulmonologist", "asthma": "pulmonologist",
+    "tooth": "dentist", "gum": "dentist",
+    "child": "pediatrician", "baby": "pediatrician",
+    "mood": "psychiatrist", "anxiety": "psychiatrist", "depression": "psychiatrist",
+    "kidney": "nephrologist", "urine": "nephrologist"
+}
+
+def infer_doctor_type(symptoms):
+    for keyword, specialist in SYMPTOM_KEYWORD_MAP.items():
+        if keyword in symptoms:
+            return specialist
 
-    specialization = "general physician"
+    # If still no match, check if the symptom string itself contains a specialist name
     for key, value in SPECIALIZATION_MAP.items():
-        if key in doctor_text:
-            specialization = value
-            break
+        if key in symptoms:
+            return value
 
-    matched = doctors_data[
-        doctors_data["specialization"].str.contains(specialization, na=False)
-    ]
+    # Default if nothing found: General Physician
+    return "general physician"
+
+# ================= KNOWLEDGE BASE =================
+# Model, vectorizer, training phrases and doctor directory are loaded as one
+# versioned KnowledgeBase (see knowledge_base.py), from the compiled artifact
+# when build_kb.py has produced one. Replacing the files under
+# ARTIFACT_DIR swaps in a new version without a restart: the watcher checks
+# every ARTIFACT_WATCH_SECONDS (0 = only on POST /admin/reload).
+app.config["ARTIFACT_DIR"] = os.environ.get("ARTIFACT_DIR", BASE_DIR)
+app.config["ARTIFACT_WATCH_SECONDS"] = float(os.environ.get("ARTIFACT_WATCH_SECONDS", 10))
+# Required in the X-Admin-Token header by /admin/* (unset = admin routes disabled)
+app.config["ADMIN_TOKEN"] = os.environ.get("ADMIN_TOKEN", "")
+
+# Typo-tolerant tier (see fuzzy_index.py): edits allowed when the index is
+# built (0 = off) and the confidence a fuzzy match needs to be used
+app.config["FUZZY_MAX_DISTANCE"] = int(os.environ.get("FUZZY_MAX_DISTANCE", 2))
+app.config["FUZZY_MIN_CONFIDENCE"] = float(os.environ.get("FUZZY_MIN_CONFIDENCE", 0.75))
+
+registry = ArtifactRegistry(
+    app.config["ARTIFACT_DIR"], SPECIALIZATION_MAP, fuzzy_max_distance=app.config["FUZZY_MAX_DISTANCE"]
+)
+registry.watch(app.config["ARTIFACT_WATCH_SECONDS"])
+atexit.register(registry.stop)
+
+# Each request works against the version that was current when it started,
+# even if a reload lands halfway through
+def current_kb():
+    if "kb" not in g:
+        g.kb = registry.current
+    return g.kb
+
+@app.after_request
+def add_kb_version(response):
+    kb = g.get("kb")
+    response.headers["X-KB-Version"] = kb.version if kb is not None else registry.current.version
+    return response
+
+# ================= PROFILING =================
+# Per-request span timings, off until a sample rate or slow-request threshold
+# is set here or at runtime via POST /admin/profiling (see profiler.py).
+# Captured requests download from GET /admin/profiles as a Chrome trace.
+app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+app.config["PROFILE_SLOW_MS"] = float(os.environ.get("PROFILE_SLOW_MS", 0))
+app.config["PROFILE_BUFFER_SIZE"] = int(os.environ.get("PROFILE_BUFFER_SIZE", 200))
+
+profiler = Profiler(
+    sample_rate=app.config["PROFILE_SAMPLE_RATE"],
+    slow_ms=app.config["PROFILE_SLOW_MS"],
+    capacity=app.config["PROFILE_BUFFER_SIZE"]
+)
+
+def request_json():
+    with profiler.span("json_parse"):
+        return request.get_json(silent=True) or {}
+
+# Numeric query parameter (`default` when missing or not a number); None for
+# nan / inf, which float() accepts but no caller can use
+def float_arg(name, default):
+    value = request.args.get(name, default, type=float)
+    return value if math.isfinite(value) else None
+
+# ================= DOCTOR MATCH HELPER =================
+# Doctors are ranked by specialization, experience, distance and availability
+# (see doctor_directory.py). Availability comes from a pluggable provider;
+# the stand-in rota changes every AVAILABILITY_SLOT_MINUTES.
+app.config["AVAILABILITY_SLOT_MINUTES"] = float(os.environ.get("AVAILABILITY_SLOT_MINUTES", 30))
+availability = RotaAvailability(app.config["AVAILABILITY_SLOT_MINUTES"])
+
+# Patient location from {"location": {...}} or the top-level fields: an area
+# name ("Gota"), a city, and/or lat/lon. Coordinates are rounded to ~100 m so
+# nearby requests share cache entries. Anything unusable is ignored rather
+# than rejected; returns a dict (stable key order, used in cache keys) or None.
+def parse_location(data):
+    source = data.get("location")
+    if not isinstance(source, dict):
+        source = data
 
-    doctors = []
-    for _, row in matched.head(5).iterrows():
-        doctors.append({
-            "name": row["doctor_name"],
-            "hospital": row["hospital"],
-            "area": row["area"],
-            "contact": str(row["contact"]),
-            "experience": int(row["experience_years"]),
-            "specialization": row["specialization"].title()
-        })
+    location = {}
+    for field in ("area", "city"):
+        value = source.get(field)
+        if isinstance(value, str) and value.strip():
+            location[field] = normalize_text(value)
 
-    return doctors
+    try:
+        lat, lon = float(source["lat"]), float(source["lon"])
+    except (KeyError, TypeError, ValueError):
+        lat = lon = None
+    if lat is not None and valid_coordinates(lat, lon):
+        location["lat"], location["lon"] = round(lat, 3), round(lon, 3)
 
-# ================= MYSQL =================
-app.config["MYSQL_HOST"] = "localhost"
-app.config["MYSQL_USER"] = "root"
-app.config["MYSQL_PASSWORD"] = ""
-app.config["MYSQL_DB"] = "ai_health"
-app.config["MYSQL_CURSORCLASS"] = "DictCursor"
+    return location or None
 
-mysql = MySQL(app)
+def location_key(location):
+    return tuple(location.items()) if location else None
+
+def get_doctors_by_specialization(kb, doctor_text, location=None):
+    with profiler.span("doctor_lookup", specialization=doctor_text):
+        return kb.doctor_directory.lookup(doctor_text, k=5, location=location, availability=availability)
+
+# ================= DATABASE =================
+# MySQL by default; STORAGE_BACKEND=sqlite for local runs (see storage.py)
+storage = create_storage()
+atexit.register(storage.close)
+print(f"✅ Storage ready ({storage.name})")
+
+# ================= METRICS =================
+# Served as Prometheus text on GET /metrics (see metrics.py). Recording is a
+# per-thread array add, so these stay on in production.
+metrics = MetricsRegistry()
+http_requests = metrics.counter("http_requests_total", "HTTP requests by route and status", ["route", "method", "status"])
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body", ["route", "method"]
+)
+http_in_flight = metrics.gauge("http_requests_in_flight", "Requests being handled or streamed", ["route"])
+triage_matches = metrics.counter("triage_match_total", "Triage messages by the tier that resolved them", ["tier"])
+db_statement_seconds = metrics.histogram(
+    "db_statement_duration_seconds", "Statement time from execute to commit", ["statement"]
+)
+history_queue_failures = metrics.counter(
+    "history_queue_update_failures_total", "History batches saved but not applied to the in-memory queue"
+)
+active_streams = metrics.gauge("triage_active_streams", "Open /triage advice streams", ["server"])
+
+TRIAGE_TIERS = {
+    tier: triage_matches.labels(tier) for tier in ("exact", "substring", "fuzzy", "model", "miss", "empty")
+}
+
+def observe_statement(label, seconds):
+    db_statement_seconds.labels(label).observe(seconds)
+    profiler.record(f"SQL {label}", seconds)
+
+storage.on_statement = observe_statement
+
+# Request count/latency are recorded by RequestMetrics around the whole WSGI
+# app, once the response body (including a stream) is closed
+app.wsgi_app = RequestMetrics(app.wsgi_app, http_requests, http_request_seconds, http_in_flight)
+app.wsgi_app = ProfileMiddleware(app.wsgi_app, profiler)
+
+@app.before_request
+def start_request_metrics():
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    request.environ[METRICS_ROUTE_KEY] = route
+    http_in_flight.labels(route).inc()
+
+# ================= TRIAGE CONFIG =================
+# Model predictions below this confidence are reported as "not found"
+app.config["MODEL_MIN_CONFIDENCE"] = float(os.environ.get("MODEL_MIN_CONFIDENCE", 0.4))
+app.config["TRIAGE_BATCH_MAX"] = int(os.environ.get("TRIAGE_BATCH_MAX", 1000))
+# Longest message /triage and /triage/batch accept. Symptoms fit in a few
+# sentences, and fuzzy matching costs grow with every extra word.
+app.config["TRIAGE_MAX_MESSAGE_CHARS"] = int(os.environ.get("TRIAGE_MAX_MESSAGE_CHARS", 2000))
+
+# Single-message model calls from concurrent /triage requests are grouped
+# into one vectorizer/model pass (see batcher.py)
+app.config["INFERENCE_BATCHING"] = os.environ.get("INFERENCE_BATCHING", "1") == "1"
+app.config["INFERENCE_BATCH_MAX_SIZE"] = int(os.environ.get("INFERENCE_BATCH_MAX_SIZE", 64))
+app.config["INFERENCE_BATCH_WAIT_MS"] = float(os.environ.get("INFERENCE_BATCH_WAIT_MS", 2))
+
+# Advice is streamed STREAM_CHUNK_SIZE characters at a time with
+# STREAM_CHUNK_DELAY_MS between chunks (0 disables pacing for everyone)
+app.config["STREAM_CHUNK_SIZE"] = int(os.environ.get("STREAM_CHUNK_SIZE", 5))
+app.config["STREAM_CHUNK_DELAY_MS"] = float(os.environ.get("STREAM_CHUNK_DELAY_MS", 50))
+
+# History rows are buffered and inserted in batches ("async"); "sync" writes
+# each row before the response starts, for read-your-writes on /history
+app.config["HISTORY_WRITE_MODE"] = os.environ.get("HISTORY_WRITE_MODE", "async")
+app.config["HISTORY_QUEUE_MAX"] = int(os.environ.get("HISTORY_QUEUE_MAX", 10000))
+app.config["HISTORY_BATCH_SIZE"] = int(os.environ.get("HISTORY_BATCH_SIZE", 200))
+app.config["HISTORY_FLUSH_MS"] = float(os.environ.get("HISTORY_FLUSH_MS", 200))
+
+# /history/<user_id> page size (default and upper bound)
+app.config["HISTORY_PAGE_SIZE"] = int(os.environ.get("HISTORY_PAGE_SIZE", 50))
+app.config["HISTORY_PAGE_MAX"] = int(os.environ.get("HISTORY_PAGE_MAX", 500))
+
+# /queue holds the QUEUE_SIZE most recent triage results in memory and
+# re-reads them from the database every QUEUE_RESYNC_SECONDS (0 = never)
+app.config["QUEUE_SIZE"] = int(os.environ.get("QUEUE_SIZE", 50))
+app.config["QUEUE_RESYNC_SECONDS"] = float(os.environ.get("QUEUE_RESYNC_SECONDS", 30))
+# Resolved /triage and /recommend results keyed on normalized text
+# (RESULT_CACHE_SIZE=0 disables the cache)
+app.config["RESULT_CACHE_SIZE"] = int(os.environ.get("RESULT_CACHE_SIZE", 10000))
+app.config["RESULT_CACHE_TTL"] = float(os.environ.get("RESULT_CACHE_TTL", 300))
+
+app.config["QUEUE_LONG_POLL_MAX_SECONDS"] = float(os.environ.get("QUEUE_LONG_POLL_MAX_SECONDS", 30))
+
+# Vitals: the last VITALS_BUFFER_SAMPLES readings and VITALS_HISTORY_BUCKETS
+# means of VITALS_BUCKET_SECONDS each are kept per patient (for at most
+# VITALS_MAX_PATIENTS patients); the means are also saved to the database.
+# POST /vitals takes at most VITALS_BATCH_MAX readings per request.
+app.config["VITALS_BUFFER_SAMPLES"] = int(os.environ.get("VITALS_BUFFER_SAMPLES", 600))
+app.config["VITALS_BUCKET_SECONDS"] = float(os.environ.get("VITALS_BUCKET_SECONDS", 60))
+app.config["VITALS_HISTORY_BUCKETS"] = int(os.environ.get("VITALS_HISTORY_BUCKETS", 720))
+app.config["VITALS_MAX_PATIENTS"] = int(os.environ.get("VITALS_MAX_PATIENTS", 2000))
+app.config["VITALS_BATCH_MAX"] = int(os.environ.get("VITALS_BATCH_MAX", 10000))
 
 # ================= HOME =================
 @app.route("/")
@@ -99,7 +306,7 @@ def home():
 # ================= SIGNUP =================
 @app.route("/signup", methods=["POST"])
 def signup():
-    data = request.get_json(silent=True) or {}
+    data = request_json()
 
     name = data.get("name")
     contact = data.get("contact")
@@ -111,41 +318,57 @@ def signup():
     if not all([name, contact, email, password]):
         return jsonify({"message": "All fields required"}), 400
 
-    cursor = mysql.connection.cursor()
-    cursor.execute("SELECT id FROM users WHERE email=%s", (email,))
-    if cursor.fetchone():
-        cursor.close()
-        return jsonify({"message": "Email already exists"}), 400
+    try:
+        with profiler.span("password_hash"):
+            password_hash = password_hasher.hash(password)
+    except HasherBusy:
+        return busy_response()
 
-    password_hash = generate_password_hash(password)
-    cursor.execute(
-        "INSERT INTO users (name, contact, email, password_hash, age, gender) VALUES (%s,%s,%s,%s,%s,%s)",
-        (name, contact, email, password_hash, age, gender)
-    )
-    mysql.connection.commit()
-    cursor.close()
+    # One INSERT; the UNIQUE(email) constraint catches duplicates
+    try:
+        user_id = storage.create_user(name, contact, email, password_hash, age, gender)
+    except storage.IntegrityError as e:
+        if not storage.is_duplicate(e):
+            raise
+        return jsonify({"message": "Email already exists"}), 400
+    triage_queue.remember_user({"id": user_id, "name": name, "age": age, "gender": gender})
 
     return jsonify({"message": "Signup successful"})
 
 # ================= LOGIN =================
 @app.route("/login", methods=["POST"])
 def login():
-    data = request.get_json(silent=True) or {}
+    data = request_json()
 
     email = data.get("email")
     password = data.get("password")
 
-    cursor = mysql.connection.cursor()
-    cursor.execute("SELECT * FROM users WHERE email=%s", (email,))
-    user = cursor.fetchone()
-    cursor.close()
+    user = storage.get_user_by_email(email)
 
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    if not check_password_hash(user["password_hash"], password):
+    try:
+        with profiler.span("password_verify"):
+            valid = bool(password) and password_hasher.verify(user["password_hash"], password)
+    except HasherBusy:
+        return busy_response()
+    if not valid:
         return jsonify({"message": "Invalid password"}), 401
 
+    # Stored with an older method/cost: upgrade it now that we have the
+    # password. Best effort, the login has already succeeded; a busy hasher
+    # or a failed write leaves it for the next login.
+    try:
+        if password_hasher.needs_rehash(user["password_hash"]):
+            storage.update_password_hash(user["id"], password_hasher.hash(password))
+    except HasherBusy:
+        pass
+    except Exception as e:
+        app.logger.error("Failed to rehash password for user %s: %s", user["id"], e)
+
+    triage_queue.remember_user(user)
+
     return jsonify({
         "message": "Login successful",
         "name": user["name"],
@@ -156,248 +379,735 @@ def login():
         "user_id": user["id"]
     })
 
+# ================= TRIAGE PIPELINE =================
+def phrase_result(kb, position, tier):
+    record = kb.training_records[position]
+    return {
+        "match": tier,
+        "text": record.text,
+        "severity": record.severity,
+        "risk": record.risk,
+        "doctor": record.doctor,
+        "doctor_title": record.doctor_title,
+        "advice": record.advice
+    }
+
+def model_result(text, prediction):
+    doctor = infer_doctor_type(text)
+    return {
+        "match": "model",
+        "confidence": prediction["confidence"],
+        "text": text,
+        "severity": prediction["severity"],
+        "risk": prediction["risk"],
+        "doctor": doctor,
+        "doctor_title": doctor.title(),
+        "advice": prediction["advice"]
+    }
+
+def match_phrase(kb, text):
+    # 🔍 EXACT MATCH -> LONGEST CONTAINED PHRASE (e.g. "high fever" before "fever")
+    position = kb.symptom_index.exact_match(text)
+    if position is not None:
+        return phrase_result(kb, position, "exact")
+
+    position = kb.symptom_index.longest_match(text)
+    if position is not None:
+        return phrase_result(kb, position, "substring")
+
+    # ✏️ CLOSEST PHRASE WITHIN A FEW TYPOS (e.g. "feaver", "chest pian")
+    found = fuzzy_match(kb, text)
+    if found is not None:
+        result = phrase_result(kb, found[0], "fuzzy")
+        result["confidence"] = found[1]
+        return result
+
+    return None
+
+# (position, confidence) of the closest phrase, if confident enough
+def fuzzy_match(kb, text):
+    found = kb.fuzzy_index.match(text)
+    if found is None or found[1] < app.config["FUZZY_MIN_CONFIDENCE"]:
+        return None
+    return found
+
+def predict_risk_batch(kb, texts):
+    return predict_risk(kb.scorer, texts, min_confidence=app.config["MODEL_MIN_CONFIDENCE"])
+
+# Batcher items are (kb, text); a batch that straddles a reload is scored
+# with one model pass per version
+def predict_risk_items(items):
+    predictions = [None] * len(items)
+    by_kb = {}
+    for i, (kb, _) in enumerate(items):
+        by_kb.setdefault(kb, []).append(i)
+    for kb, positions in by_kb.items():
+        for i, prediction in zip(positions, predict_risk_batch(kb, [items[i][1] for i in positions])):
+            predictions[i] = prediction
+    return predictions
+
+risk_batcher = None
+if app.config["INFERENCE_BATCHING"]:
+    risk_batcher = MicroBatcher(
+        predict_risk_items,
+        max_batch_size=app.config["INFERENCE_BATCH_MAX_SIZE"],
+        max_wait_ms=app.config["INFERENCE_BATCH_WAIT_MS"],
+        name="risk-model-batcher"
+    )
+
+def resolve_triage(kb, text):
+    with profiler.span("symptom_match"):
+        result = match_phrase(kb, text)
+    if result is not None:
+        return result
+
+    # 🤖 Shares a model pass with whatever other requests are waiting
+    with profiler.span("model_inference"):
+        if risk_batcher is not None:
+            prediction = risk_batcher.run((kb, text))
+        else:
+            prediction = predict_risk_batch(kb, [text])[0]
+    return model_result(text, prediction) if prediction else None
+
+def resolve_triage_batch(kb, texts):
+    with profiler.span("symptom_match", messages=len(texts)):
+        results = [match_phrase(kb, text) if text else None for text in texts]
+
+    # 🤖 Everything the phrase tiers missed is scored in a single model pass
+    missed = [i for i, result in enumerate(results) if result is None and texts[i]]
+    with profiler.span("model_inference", messages=len(missed)):
+        predictions = predict_risk_batch(kb, [texts[i] for i in missed])
+    for i, prediction in zip(missed, predictions):
+        if prediction:
+            results[i] = model_result(texts[i], prediction)
+
+    return results
+
+# ================= RESULT CACHE =================
+result_cache = ResultCache(app.config["RESULT_CACHE_SIZE"], app.config["RESULT_CACHE_TTL"])
+
+# Cached values are shared between requests and must not be mutated
+def compute_triage(kb, result, location=None):
+    if result is None:
+        return None
+    return result, get_doctors_by_specialization(kb, result["doctor"], location)
+
+# Keys carry the knowledge base version and the availability epoch, so a
+# reload or a rota change never serves old results
+def cached_triage(kb, text, location=None):
+    return result_cache.get_or_compute(
+        (kb.version, availability.epoch(), "triage", text, location_key(location)),
+        lambda: compute_triage(kb, resolve_triage(kb, text), location)
+    )
+
+def cached_triage_batch(kb, texts):
+    resolved = [None] * len(texts)
+    missed = []
+    epoch = availability.epoch()
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        found, value = result_cache.get((kb.version, epoch, "triage", text, None))
+        if found:
+            resolved[i] = value
+        else:
+            missed.append(i)
+
+    for i, result in zip(missed, resolve_triage_batch(kb, [texts[i] for i in missed])):
+        resolved[i] = compute_triage(kb, result)
+        result_cache.put((kb.version, epoch, "triage", texts[i], None), resolved[i])
+
+    return resolved
+
+def triage_metadata(kb, result, recommended_doctors):
+    metadata = {
+        "mode": "medical",
+        "kb_version": kb.version,
+        "match": result["match"],
+        "symptoms": [result["text"]],
+        "risk": result["risk"],
+        "doctor": result["doctor_title"],
+        "severity": result["severity"],
+        "recommended_doctors": recommended_doctors
+    }
+    if "confidence" in result:
+        metadata["confidence"] = result["confidence"]
+    return metadata
+
+# ================= VITALS STORE =================
+# Closed vitals buckets are saved write-behind, like history rows
+vitals_writer = HistoryWriter(storage.save_vitals, batch_size=500, flush_interval_ms=1000, name="vitals", logger=app.logger)
+
+def save_vitals(rows):
+    for row in rows:
+        vitals_writer.write(row)
+
+vitals_store = VitalsStore(
+    persist=save_vitals,
+    buffer_samples=app.config["VITALS_BUFFER_SAMPLES"],
+    bucket_seconds=app.config["VITALS_BUCKET_SECONDS"],
+    history_buckets=app.config["VITALS_HISTORY_BUCKETS"],
+    max_patients=app.config["VITALS_MAX_PATIENTS"]
+)
+# Runs first at exit (atexit is last in, first out): open buckets are saved,
+# then the writer drains
+atexit.register(vitals_writer.close)
+atexit.register(vitals_store.flush)
+
+# ================= TRIAGE QUEUE =================
+triage_queue = TriageQueue(
+    storage.recent_queue,
+    storage.get_users_by_ids,
+    render=app.json.dumps,
+    size=app.config["QUEUE_SIZE"],
+    resync_seconds=app.config["QUEUE_RESYNC_SECONDS"],
+    vitals=vitals_store
+)
+vitals_store.on_change = triage_queue.vitals_changed
+
+# Analytics rollups are counted per flushed batch and saved with it
+def insert_history_rows(records):
+    history_ids = storage.insert_history([
+        (r["user_id"], r["symptoms"], r["severity"], r["risk"], r["doctor"], r["advice"], r["created_at"])
+        for r in records
+    ], rollups=rollup_rows(records))
+    try:
+        triage_queue.add(history_ids, records)
+    except Exception as e:
+        # The rows are saved; the queue catches up at its next resync
+        history_queue_failures.inc()
+        app.logger.error("Failed to update triage queue: %s", e)
+
+history_writer = HistoryWriter(
+    insert_history_rows,
+    mode=app.config["HISTORY_WRITE_MODE"],
+    max_queue=app.config["HISTORY_QUEUE_MAX"],
+    batch_size=app.config["HISTORY_BATCH_SIZE"],
+    flush_interval_ms=app.config["HISTORY_FLUSH_MS"],
+    # A row for a deleted (or never created) user fails its foreign key;
+    # only that row is dropped, not the rest of its batch
+    row_errors=(storage.IntegrityError,),
+    logger=app.logger
+)
+# Buffered rows are written before the process exits
+atexit.register(history_writer.close)
+
+def is_user_id(value):
+    # users.id is an INT column
+    return isinstance(value, int) and not isinstance(value, bool) and 0 < value < 2 ** 31
+
+def save_history(user_id, result):
+    if not is_user_id(user_id):
+        app.logger.warning("Not saving history for invalid user_id %r", user_id)
+        return
+    history_writer.write({
+        "user_id": user_id,
+        "symptoms": result["text"],
+        "severity": result["severity"],
+        "risk": result["risk"],
+        "doctor": result["doctor"],
+        "advice": result["advice"],
+        # Arrival time, not flush time (MySQL TIMESTAMP keeps whole seconds)
+        "created_at": datetime.now().replace(microsecond=0)
+    })
+
+NOT_FOUND_REPLY = "I could not find this symptom in my database."
+
 # ================= TRIAGE =================
-@app.route("/triage", methods=["POST"])
-def triage():
-    data = request.get_json(silent=True) or {}
-    text = data.get("message", "").lower().strip()
+def prepare_triage(data):
+    # Does all the lookup / DB work up front and returns the NDJSON frames plus
+    # the delay to put between advice chunks. Shared by the Flask route below
+    # and the non-blocking ASGI route in asgi.py.
+    kb = current_kb()
+    text = normalize_text(data.get("message") or "")
     user_id = data.get("user_id")
 
-    # ================= STREAMING RESPONSE =================
-    from flask import Response, stream_with_context
-    import json
-    import time
-
-    def generate_error(message):
-        metadata = {"mode": "chat"}
-        yield json.dumps({"type": "metadata", "data": metadata}) + "\n"
-        yield json.dumps({"type": "chunk", "content": message}) + "\n"
-
-    def generate_medical(row, recommended_doctors):
-        # 1. Send metadata
-        metadata = {
-            "mode": "medical",
-            "symptoms": [row["text"]],
-            "risk": row["risk"],
-            "doctor": row["doctor"].title(),
-            "severity": int(row["severity_score"]),
-            "recommended_doctors": recommended_doctors
-        }
-        yield json.dumps({"type": "metadata", "data": metadata}) + "\n"
-
-        # 2. Stream the advice text
-        full_advice = row["advice"]
-        chunk_size = 5
-        
-        for i in range(0, len(full_advice), chunk_size):
-            chunk = full_advice[i:i+chunk_size]
-            yield json.dumps({"type": "chunk", "content": chunk}) + "\n"
-            time.sleep(0.05)
+    # API clients can opt out of the typing effect with {"pacing": false}
+    if data.get("pacing", True) is False:
+        chunk_size, delay = 0, 0.0
+    else:
+        chunk_size = app.config["STREAM_CHUNK_SIZE"]
+        delay = app.config["STREAM_CHUNK_DELAY_MS"] / 1000.0
 
     if not text:
-        return Response(stream_with_context(generate_error("Please enter symptoms.")), content_type='application/x-ndjson')
+        TRIAGE_TIERS["empty"].inc()
+        return error_frames("Please enter symptoms."), 0.0
 
-    # 🔍 EXACT MATCH -> PARTIAL MATCH
-    # First try exact match
-    matches = training_data[training_data["text"] == text]
-    
-    # If no exact match, try to find if the user text *contains* any of the training symptoms
-    if matches.empty:
-        # Sort by length descending to match longest phrases first (e.g. "high fever" before "fever")
-        sorted_symptoms = training_data["text"].sort_values(key=lambda x: x.str.len(), ascending=False)
-        for symptom in sorted_symptoms:
-            if symptom in text:
-                matches = training_data[training_data["text"] == symptom]
-                break
-    
-    # If still no match, try the reverse: if the training symptom is contained in the user text
-    # (Already covered above, but let's double check simple keywords if needed)
+    resolved = cached_triage(kb, text, parse_location(data))
 
-    if matches.empty:
-         return Response(stream_with_context(generate_error("I could not find this symptom in my database.")), content_type='application/x-ndjson')
+    if resolved is None:
+        TRIAGE_TIERS["miss"].inc()
+        return error_frames(NOT_FOUND_REPLY), 0.0
+    TRIAGE_TIERS[resolved[0]["match"]].inc()
 
-    row = matches.iloc[0]
-    recommended_doctors = get_doctors_by_specialization(row["doctor"])
+    result, recommended_doctors = resolved
 
-    # ================= SAVE HISTORY =================
     # ================= SAVE HISTORY =================
     if user_id:
+        save_history(user_id, result)
+
+    metadata = triage_metadata(kb, result, recommended_doctors)
+    return advice_frames(metadata, result["advice"], chunk_size), delay
+
+# Error reply (for a 413) when the message is too long to triage, else None.
+# Checked by the routes before prepare_triage, here and in asgi.py.
+def message_too_long(message):
+    limit = app.config["TRIAGE_MAX_MESSAGE_CHARS"]
+    if isinstance(message, str) and len(message) > limit:
+        return {"message": f"Messages are limited to {limit} characters"}
+    return None
+
+@app.route("/triage", methods=["POST"])
+def triage():
+    data = request_json()
+    too_long = message_too_long(data.get("message"))
+    if too_long is not None:
+        return jsonify(too_long), 413
+    frames, delay = prepare_triage(data)
+
+    # ================= STREAMING RESPONSE =================
+    # This blocks a worker thread between chunks; serve asgi.py (or send
+    # {"pacing": false}) when many concurrent streams are expected.
+    lines = tracked(paced(frames, delay), active_streams.labels("wsgi"))
+    return Response(stream_with_context(lines), content_type=NDJSON)
+
+# ================= TRIAGE BATCH =================
+@app.route("/triage/batch", methods=["POST"])
+def triage_batch():
+    data = request_json()
+    items = data.get("messages")
+
+    if not isinstance(items, list):
+        return jsonify({"message": "messages must be a list"}), 400
+    if len(items) > app.config["TRIAGE_BATCH_MAX"]:
+        return jsonify({"message": f"At most {app.config['TRIAGE_BATCH_MAX']} messages per batch"}), 400
+
+    # Each item is either a message string or {"message": ..., "user_id": ...}
+    texts = []
+    user_ids = []
+    for item in items:
+        message, user_id = (item.get("message"), item.get("user_id")) if isinstance(item, dict) else (item, None)
+        too_long = message_too_long(message)
+        if too_long is not None:
+            return jsonify(too_long), 413
+        texts.append(normalize_text(message or ""))
+        user_ids.append(user_id)
+
+    kb = current_kb()
+    responses = []
+    for text, user_id, resolved in zip(texts, user_ids, cached_triage_batch(kb, texts)):
+        if not text:
+            TRIAGE_TIERS["empty"].inc()
+            responses.append({"mode": "chat", "reply": "Please enter symptoms."})
+            continue
+        if resolved is None:
+            TRIAGE_TIERS["miss"].inc()
+            responses.append({"mode": "chat", "reply": NOT_FOUND_REPLY})
+            continue
+
+        result, recommended_doctors = resolved
+        TRIAGE_TIERS[result["match"]].inc()
+        response = triage_metadata(kb, result, recommended_doctors)
+        response["advice"] = result["advice"]
+        responses.append(response)
+
+        if user_id:
+            save_history(user_id, result)
+
+    return jsonify(responses)
+
+# ================= STATS =================
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "inference": risk_batcher.stats() if risk_batcher is not None else None,
+        "history_writer": history_writer.stats(),
+        "storage": storage.stats(),
+        "queue": triage_queue.stats(),
+        "result_cache": result_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "knowledge_base": registry.stats(),
+        "profiler": profiler.stats(),
+        "vitals": vitals_store.stats(),
+        "vitals_writer": vitals_writer.stats()
+    })
+
+# ================= METRICS ENDPOINT =================
+# Subsystem state that already lives in stats() is read at scrape time
+def collect_subsystems():
+    writer = history_writer.stats()
+    pool = storage.pool.stats()
+    cache = result_cache.stats()
+    hasher = password_hasher.stats()
+    kb = registry.stats()
+    vitals = vitals_store.stats()
+    collected = [
+        ("history_rows_written_total", "counter", "History rows inserted", [({}, writer["written"])]),
+        ("history_rows_failed_total", "counter", "History rows lost to failed inserts", [({}, writer["failed"])]),
+        ("history_rows_dropped_total", "counter", "History rows dropped because the write queue was full", [({}, writer["dropped"])]),
+        ("history_queue_depth", "gauge", "History rows waiting to be written", [({}, writer["queue_depth"])]),
+        ("db_pool_connections", "gauge", "Pooled database connections",
+         [({"state": "in_use"}, pool["in_use"]), ({"state": "idle"}, pool["idle"])]),
+        ("db_pool_waits_total", "counter", "Checkouts that waited for a free connection", [({}, pool["waits"])]),
+        ("db_pool_timeouts_total", "counter", "Checkouts that gave up waiting", [({}, pool["timeouts"])]),
+        ("result_cache_lookups_total", "counter", "Result cache lookups by outcome",
+         [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"]), ({"result": "coalesced"}, cache["coalesced"])]),
+        ("result_cache_entries", "gauge", "Entries in the result cache", [({}, cache["entries"])]),
+        ("password_hash_rejected_total", "counter", "Hashes refused because the pool was full", [({}, hasher["rejected"])]),
+        ("triage_queue_entries", "gauge", "Entries in the in-memory triage queue", [({}, triage_queue.stats()["entries"])]),
+        ("vitals_readings_total", "counter", "Vitals readings by outcome",
+         [({"result": "accepted"}, vitals["accepted"]), ({"result": "rejected"}, vitals["rejected"])]),
+        ("vitals_patients", "gauge", "Patients with vitals in memory", [({}, vitals["patients"])]),
+        ("knowledge_base_reloads_total", "counter", "Knowledge base versions swapped in", [({}, kb["reloads"])]),
+        ("knowledge_base_reload_failures_total", "counter", "Failed knowledge base reloads", [({}, kb["failures"])]),
+        ("knowledge_base_info", "gauge", "Active knowledge base version", [({"version": kb["version"], "source": kb["source"]}, 1)])
+    ]
+    if risk_batcher is not None:
+        inference = risk_batcher.stats()
+        collected.append(("inference_batches_total", "counter", "Model batches run", [({}, inference["batches"])]))
+        collected.append(("inference_items_total", "counter", "Messages scored by the model", [({}, inference["items"])]))
+    return collected
+
+metrics.add_collector(collect_subsystems)
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+# ================= ADMIN =================
+def require_admin(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config["ADMIN_TOKEN"]
+        if not token:
+            return jsonify({"message": "Admin routes are disabled"}), 404
+        if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+            return jsonify({"message": "Invalid admin token"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+# POST /admin/reload?force=1
+# Rebuilds the knowledge base from ARTIFACT_DIR and swaps it in; requests
+# already running finish on the version they started with
+@app.route("/admin/reload", methods=["POST"])
+@require_admin
+def admin_reload():
+    previous = registry.current.version
+    try:
+        changed = registry.reload(force=request.args.get("force") == "1")
+    except Exception as e:
+        return jsonify({"message": f"Reload failed: {e}", "version": previous}), 500
+
+    return jsonify({
+        "changed": changed,
+        "previous_version": previous,
+        "version": registry.current.version,
+        "build_ms": registry.build_ms
+    })
+
+# POST /admin/profiling {"sample_rate": 0.01, "slow_ms": 500, "capacity": 200}
+# Any field may be left out; 0 turns that trigger off. Returns the settings.
+@app.route("/admin/profiling", methods=["GET", "POST"])
+@require_admin
+def admin_profiling():
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
         try:
-            cursor = mysql.connection.cursor()
-            cursor.execute(
-                """
-                INSERT INTO history
-                (user_id, symptoms, severity, risk, doctor, advice)
-                VALUES (%s,%s,%s,%s,%s,%s)
-                """,
-                (
-                    user_id,
-                    row["text"],
-                    row["severity_score"],
-                    row["risk"],
-                    row["doctor"],
-                    row["advice"]
-                )
+            profiler.configure(
+                sample_rate=data.get("sample_rate"),
+                slow_ms=data.get("slow_ms"),
+                capacity=data.get("capacity")
             )
-            mysql.connection.commit()
-            cursor.close()
-        except Exception as e:
-            print(f"ERROR: Failed to save history: {e}")
+        except (TypeError, ValueError) as e:
+            return jsonify({"message": str(e)}), 400
+    return jsonify(profiler.stats())
+
+# GET /admin/profiles downloads the captured requests as Chrome trace JSON
+# (open in chrome://tracing, ui.perfetto.dev or speedscope); DELETE clears them
+@app.route("/admin/profiles", methods=["GET", "DELETE"])
+@require_admin
+def admin_profiles():
+    if request.method == "DELETE":
+        return jsonify({"cleared": profiler.clear()})
+
+    response = Response(json.dumps(chrome_trace(profiler.profiles())), mimetype="application/json")
+    response.headers["Content-Disposition"] = "attachment; filename=profiles.trace.json"
+    return response
+
+# GET /admin/export?format=csv&start=2024-01-01&end=2024-01-31&risk=HIGH&doctor=Cardiologist
+# Streams every matching history row joined to its user, oldest first, as
+# NDJSON (default) or CSV. Rows are read EXPORT_BATCH_SIZE at a time from an
+# unbuffered cursor and sent as they arrive; see history_export.py.
+app.config["EXPORT_BATCH_SIZE"] = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+@app.route("/admin/export", methods=["GET"])
+@require_admin
+def admin_export():
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        filters = parse_export_filters(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    progress = ExportProgress()
+    batches = storage.export_history(batch_size=max(1, app.config["EXPORT_BATCH_SIZE"]), **filters)
+    chunks = encode_export(fmt, storage.EXPORT_COLUMNS, progress.counted(batches))
+    # First chunk before the 200 goes out, so a database error is still a 500
+    first = next(chunks, "")
+
+    def body():
+        try:
+            yield first
+            yield from chunks
+        finally:
+            # Client gone or done: hand the connection back now, not at GC
+            chunks.close()
+            batches.close()
+            print(f"📤 History export ({fmt}): {progress.summary()}")
 
-    return Response(stream_with_context(generate_medical(row, recommended_doctors)), content_type='application/x-ndjson')
+    response = Response(body(), mimetype=EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename=history.{fmt}"
+    return response
 
 # ================= HISTORY =================
+def encode_history_cursor(row):
+    created_at = row["created_at"]
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat(" ")
+    raw = json.dumps([created_at, row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_history_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    created_at, row_id = json.loads(raw)
+    # Validate the timestamp before it goes anywhere near SQL
+    datetime.fromisoformat(created_at)
+    return created_at, int(row_id)
+
+# GET /history/<user_id>?limit=50&cursor=...&fields=symptoms,risk
+# Returns one page (newest first); the cursor for the next page is sent in
+# the X-Next-Cursor and Link headers and is absent on the last page.
 @app.route("/history/<int:user_id>")
 def history(user_id):
-    cursor = mysql.connection.cursor()
-    cursor.execute(
-        """
-        SELECT symptoms, severity, risk, doctor, advice, created_at
-        FROM history
-        WHERE user_id=%s
-        ORDER BY created_at DESC
-        """,
-        (user_id,)
-    )
-    data = cursor.fetchall()
-    cursor.close()
-    return jsonify(data)
+    try:
+        limit = int(request.args.get("limit", app.config["HISTORY_PAGE_SIZE"]))
+    except ValueError:
+        return jsonify({"message": "limit must be a number"}), 400
+    limit = max(1, min(limit, app.config["HISTORY_PAGE_MAX"]))
+
+    before = None
+    if request.args.get("cursor"):
+        try:
+            before = decode_history_cursor(request.args["cursor"])
+        except (ValueError, TypeError):
+            return jsonify({"message": "Invalid cursor"}), 400
+
+    fields = storage.HISTORY_FIELDS
+    if request.args.get("fields"):
+        fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in storage.HISTORY_FIELDS]
+        if unknown:
+            return jsonify({"message": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    rows = storage.list_history(user_id, limit=limit + 1, before=before, fields=fields)
+    page = rows[:limit]
+
+    data = [{field: row[field] for field in fields} for row in page]
+    response = jsonify(data)
+
+    if len(rows) > limit:
+        next_cursor = encode_history_cursor(page[-1])
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.path}?limit={limit}&cursor={next_cursor}>; rel="next"'
+
+    return response
+
 
+def find_specialists(kb, symptoms, location=None):
+    with profiler.span("symptom_match"):
+        # 1. Try to find exact match in training data
+        position = kb.symptom_index.exact_match(symptoms)
+        if position is None:
+            # ... or the closest one within a few typos
+            found = fuzzy_match(kb, symptoms)
+            if found is not None:
+                position = found[0]
 
+        if position is not None:
+            doctor_type = kb.training_records[position].doctor
+        else:
+            # 2. Key-word / specialist name mapping (Simple NLP)
+            doctor_type = infer_doctor_type(symptoms)
+
+    # 4. Rank doctors of that specialization (falls back to general
+    # physicians, then the whole directory, so the list is never empty)
+    return get_doctors_by_specialization(kb, doctor_type, location)
+
+# POST /recommend {"symptoms": "...", "location": {"area": "Gota"}}
+# Ranked doctors with a deterministic matchScore, availability, rating and a
+# stable id; the optional location (area / city / lat / lon, see
+# parse_location) ranks the nearest doctors and adds their distance_km
 @app.route("/recommend", methods=["POST"])
 def recommend_doctors():
-    data = request.get_json(silent=True) or {}
+    data = request_json()
     symptoms = data.get("symptoms", "")
     
     if isinstance(symptoms, list):
         symptoms = " ".join(symptoms)
         
-    symptoms = symptoms.lower().strip()
+    symptoms = normalize_text(symptoms)
     
     if not symptoms:
         return jsonify([])
 
-    # 1. Try to find exact match in training data
-    matches = training_data[training_data["text"] == symptoms]
-    
-    doctor_type = None
-    
-    if not matches.empty:
-        doctor_type = matches.iloc[0]["doctor"]
-    else:
-        # 2. Key-word based mapping (Simple NLP)
-        # We define a fallback map for common symptoms -> specialists
-        SYMPTOM_KEYWORD_MAP = {
-            "heart": "cardiologist", "chest": "cardiologist", "breath": "cardiologist", "palpitation": "cardiologist",
-            "head": "neurologist", "dizzy": "neurologist", "faint": "neurologist", "seizure": "neurologist", "stroke": "neurologist",
-            "bone": "orthopedic", "joint": "orthopedic", "fracture": "orthopedic", "knee": "orthopedic", "back": "orthopedic",
-            "skin": "dermatologist", "rash": "dermatologist", "itch": "dermatologist", "acne": "dermatologist",
-            "stomach": "gastroenterologist", "abdominal": "gastroenterologist", "vomit": "gastroenterologist", "diarrhea": "gastroenterologist",
-            "throat": "ent", "ear": "ent", "nose": "ent", "cold": "general physician", "flu": "general physician", "fever": "general physician",
-            "lung": "pulmonologist", "cough": "pulmonologist", "asthma": "pulmonologist",
-            "tooth": "dentist", "gum": "dentist",
-            "child": "pediatrician", "baby": "pediatrician",
-            "mood": "psychiatrist", "anxiety": "psychiatrist", "depression": "psychiatrist",
-            "kidney": "nephrologist", "urine": "nephrologist"
-        }
-        
-        for keyword, specialist in SYMPTOM_KEYWORD_MAP.items():
-            if keyword in symptoms:
-                doctor_type = specialist
-                break
-        
-        # 3. If still no match, check if the symptom string itself contains a specialist name
-        if not doctor_type:
-            for key, value in SPECIALIZATION_MAP.items():
-                if key in symptoms:
-                    doctor_type = value
-                    break
-
-    # Default if nothing found: General Physician
-    if not doctor_type:
-        doctor_type = "general physician"
+    location = parse_location(data)
 
-    # 4. Get doctors by specialization
-    recommended = get_doctors_by_specialization(doctor_type)
-    
-    # 5. If specific specialization yielded no results, return some random doctors instead of empty
-    # so the frontend shows *some* real data instead of static mocks
-    if not recommended:
-        # Fallback to general physicians or just any top doctors
-        recommended = get_doctors_by_specialization("general physician")
-        if not recommended: # If even that fails, specific hardcoded fallback or random sample from DB
-             # Just sample 3 random rows from doctors_data
-            sample = doctors_data.sample(3)
-            for _, row in sample.iterrows():
-                recommended.append({
-                    "name": row["doctor_name"],
-                    "hospital": row["hospital"],
-                    "area": row["area"],
-                    "contact": str(row["contact"]),
-                    "experience": int(row["experience_years"]),
-                    "specialization": row["specialization"].title()
-                })
-
-    # 6. Enhance with mock live data (availability, score)
-    import random
-    for doc in recommended:
-        doc["matchScore"] = random.randint(85, 99)
-        doc["availability"] = random.choice(["Available Now", "In Surgery (1h)", "On Call", "Available in 30m"])
-        doc["rating"] = round(random.uniform(4.5, 5.0), 1)
-        doc["id"] = str(random.randint(1000, 9999))
+    kb = current_kb()
+    recommended = result_cache.get_or_compute(
+        (kb.version, availability.epoch(), "recommend", symptoms, location_key(location)),
+        lambda: find_specialists(kb, symptoms, location)
+    )
 
     return jsonify(recommended)
 
 # ================= QUEUE =================
+# Served from the in-process TriageQueue, highest clinical priority first
 @app.route("/queue", methods=["GET"])
 def get_queue():
-    cursor = mysql.connection.cursor()
-    cursor.execute(
-        """
-        SELECT 
-            h.id, 
-            u.name, 
-            u.contact, 
-            u.age,
-            u.gender,
-            h.symptoms, 
-            h.severity, 
-            h.risk, 
-            h.doctor, 
-            h.created_at
-        FROM history h
-        JOIN users u ON h.user_id = u.id
-        ORDER BY h.created_at DESC
-        LIMIT 50
-        """
-    )
-    rows = cursor.fetchall()
-    cursor.close()
+    triage_queue.ensure_fresh()
+    version, body = triage_queue.snapshot()
 
-    queue_data = []
-    for row in rows:
-        # Parse symptoms string if it looks like a list or keep as is
-        # The history table might store symptoms as raw string from user input
-        symptoms_list = [s.strip() for s in row["symptoms"].split(',')] if row["symptoms"] else []
-
-        queue_data.append({
-            "id": str(row["id"]),
-            "name": row["name"],
-            # Use real age/gender if available, otherwise fallback to defaults
-            "age": row.get("age") or 30, 
-            "gender": row.get("gender") or "Unknown", 
-            "severity": row["risk"].lower().strip() if row["risk"] else "medium",
-            "symptoms": symptoms_list,
-            "vitals": { # Mock vitals for now as we don't track them yet
-                "heartRate": 80,
-                "temperature": 98.6,
-                "bloodPressure": "120/80",
-                "oxygenLevel": 98,
-            },
-            "timestamp": row["created_at"]
-        })
-
-    return jsonify(queue_data)
+    response = Response(body, mimetype="application/json")
+    response.set_etag(f"queue-{triage_queue.generation}-{version}")
+    response.headers["X-Queue-Version"] = str(version)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+# GET /queue/changes?since=<version>&generation=<gen>&timeout=25
+# Long-poll: returns the entries changed after `since` as soon as there are
+# any, or 204 once `timeout` seconds pass without a change. Under asgi.py
+# this route and the /queue/stream SSE feed are served on the event loop.
+@app.route("/queue/changes", methods=["GET"])
+def queue_changes():
+    triage_queue.ensure_fresh()
+    since = request.args.get("since", type=int)
+    generation = request.args.get("generation")
+    # Unusable timeouts (not a number, nan, inf) wait the default, as in asgi.py
+    timeout = float_arg("timeout", 25)
+    timeout = max(0.0, min(25.0 if timeout is None else timeout, app.config["QUEUE_LONG_POLL_MAX_SECONDS"]))
+
+    changes = triage_queue.changes_since(since, generation)
+    if changes is None:
+        triage_queue.wait_for_change(since, timeout)
+        changes = triage_queue.changes_since(since, generation)
+    if changes is None:
+        return "", 204
+
+    return Response(app.json.dumps(changes), mimetype="application/json")
+
+# ================= VITALS =================
+# POST /vitals from bedside devices or a gateway, any number of patients:
+#   {"readings": [{"user_id": 7, "t": 1717000000.5, "heartRate": 82, "temperature": 98.9,
+#                  "bloodPressure": "121/79", "oxygenLevel": 97}, ...]}
+# or {"user_id": 7, "samples": [{...}, ...]} for one patient. "t" is epoch
+# seconds (default: now); fields may be left out. Answers with how many
+# readings were kept and how many were dropped (implausible, duplicate,
+# older than ones already received).
+@app.route("/vitals", methods=["POST"])
+def ingest_vitals():
+    data = request_json()
+    if isinstance(data.get("samples"), list):
+        readings = [(data.get("user_id"), sample) for sample in data["samples"]]
+    elif isinstance(data.get("readings"), list):
+        # Entries that aren't objects have no user id, so count as rejected
+        readings = [(reading.get("user_id") if isinstance(reading, dict) else None, reading) for reading in data["readings"]]
+    else:
+        return jsonify({"message": "Send readings: [...] or user_id with samples: [...]"}), 400
+
+    if len(readings) > app.config["VITALS_BATCH_MAX"]:
+        return jsonify({"message": f"At most {app.config['VITALS_BATCH_MAX']} readings per request"}), 413
+
+    known = [(user_id, reading) for user_id, reading in readings if is_user_id(user_id)]
+    with profiler.span("vitals_ingest", readings=len(readings)):
+        accepted, dropped = vitals_store.ingest(known)
+    return jsonify({"accepted": accepted, "rejected": len(readings) - len(known) + dropped})
+
+# GET /vitals/<user_id>?seconds=300&step=5
+# Latest vitals plus the last `seconds` averaged per `step` seconds, from
+# memory. Steps of a bucket (VITALS_BUCKET_SECONDS) or more use the
+# per-bucket means, which reach back VITALS_HISTORY_BUCKETS buckets.
+@app.route("/vitals/<int:user_id>", methods=["GET"])
+def get_vitals(user_id):
+    longest = app.config["VITALS_BUCKET_SECONDS"] * app.config["VITALS_HISTORY_BUCKETS"]
+    seconds = float_arg("seconds", 300)
+    step = float_arg("step", 5)
+    if seconds is None or step is None:
+        return jsonify({"message": "seconds and step must be finite numbers"}), 400
+    seconds = min(max(seconds, 1.0), longest)
+    step = min(max(step, 1.0), longest)
+
+    series = vitals_store.series(user_id, seconds, step)
+    if series is None:
+        return jsonify({"message": "No vitals for this patient"}), 404
+    return jsonify({
+        "user_id": user_id,
+        "latest": vitals_store.latest(user_id),
+        "seconds": seconds,
+        "step": series["step"],
+        "points": series["points"]
+    })
+
+# ================= ANALYTICS =================
+# GET /analytics?granularity=hour&start=2024-05-01&end=2024-05-01&top=10
+# Risk counts, specialist demand and top symptoms per hour or day, served from
+# the triage_rollups table (see rollups.py) rather than scanning history.
+# Without start/end: the last ANALYTICS_DEFAULT_BUCKETS buckets up to now.
+ANALYTICS_DEFAULT_BUCKETS = {"hour": 24, "day": 30}
+
+@app.route("/analytics", methods=["GET"])
+def analytics():
+    granularity = request.args.get("granularity", "hour")
+    if granularity not in GRANULARITIES:
+        return jsonify({"message": f"granularity must be one of: {', '.join(GRANULARITIES)}"}), 400
+    step = GRANULARITIES[granularity]
+
+    try:
+        end = parse_time(request.args["end"], end=True) if request.args.get("end") else datetime.now()
+        start = parse_time(request.args["start"]) if request.args.get("start") else None
+    except (ValueError, OverflowError):
+        return jsonify({"message": "start and end must be dates (YYYY-MM-DD) or timestamps"}), 400
+
+    # Whole buckets: the one holding `end` is included unless end is its start.
+    # Dates at the ends of the calendar (9999-12-31) have no bucket after them.
+    try:
+        if floor_time(end, granularity) != end:
+            end = floor_time(end, granularity) + step
+        start = floor_time(start, granularity) if start else end - ANALYTICS_DEFAULT_BUCKETS[granularity] * step
+    except OverflowError:
+        return jsonify({"message": "start and end are out of range"}), 400
+    if start >= end:
+        return jsonify({"message": "start must be before end"}), 400
+    if (end - start) / step > MAX_BUCKETS[granularity]:
+        return jsonify({"message": f"At most {MAX_BUCKETS[granularity]} {granularity} buckets per request"}), 400
+
+    top = max(1, min(request.args.get("top", 10, type=int), 50))
+    rows = storage.read_rollups(granularity, start, end)
+    return jsonify(dashboard(rows, granularity, start, end, top))
+
+# ================= SHUTDOWN =================
+# What the atexit hooks above do, in the order they run, for servers with a
+# shutdown hook of their own (asgi.py's lifespan). Running it twice is fine.
+def shutdown():
+    history_writer.close()
+    vitals_store.flush()
+    vitals_writer.close()
+    if risk_batcher is not None:
+        risk_batcher.close()
+    storage.close()
+    registry.stop()
+    password_hasher.close()
 
 # ================= RUN =================
 if __name__ == "__main__":
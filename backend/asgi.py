@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (
+    app as flask_app, current_kb, message_too_long, prepare_triage, registry, shutdown, triage_queue,
+    active_streams, http_in_flight, http_request_seconds, http_requests, metrics, profiler
+)
+from queue_feed import QueueBroadcaster
+from streaming import NDJSON, paced_async
+
+# ================= ASGI ENTRYPOINT =================
+# Run with:  uvicorn asgi:application --host 0.0.0.0 --port 5000
+#
+# POST /triage is served natively on the event loop: the lookup runs once in a
+# worker thread and the advice chunks are paced with asyncio timers, so an idle
+# stream costs a coroutine instead of a blocked thread. The queue feeds
+# (/queue/stream SSE and /queue/changes long-poll) are served the same way,
+# see queue_feed.py. Every other route is handed to the Flask app unchanged.
+
+wsgi_app = WsgiToAsgi(flask_app)
+queue_broadcaster = QueueBroadcaster(
+    triage_queue,
+    render=flask_app.json.dumps,
+    long_poll_max_seconds=flask_app.config["QUEUE_LONG_POLL_MAX_SECONDS"]
+)
+metrics.add_collector(lambda: [
+    ("queue_feed_subscribers", "gauge", "Open /queue/stream and /queue/changes clients",
+     [({}, queue_broadcaster.subscribers)])
+])
+asgi_streams = active_streams.labels("asgi")
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+# -> (frames, delay, version of the knowledge base that answered)
+def run_prepare_triage(data):
+    with flask_app.app_context():
+        frames, delay = prepare_triage(data)
+        # Build the frames while the app context is still open
+        return list(frames), delay, current_kb().version
+
+
+async def triage_stream(scope, receive, send):
+    body = await read_body(receive)
+    if body is None:
+        return
+
+    with profiler.span("json_parse"):
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = {}
+    if not isinstance(data, dict):
+        data = {}
+
+    too_long = message_too_long(data.get("message"))
+    if too_long is not None:
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"access-control-allow-origin", b"*"),
+                (b"x-kb-version", registry.current.version.encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": json.dumps(too_long).encode()})
+        return
+
+    frames, delay, kb_version = await asyncio.to_thread(run_prepare_triage, data)
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", NDJSON.encode()),
+            (b"access-control-allow-origin", b"*"),
+            (b"cache-control", b"no-cache"),
+            (b"x-kb-version", kb_version.encode())
+        ]
+    })
+    asgi_streams.inc()
+    try:
+        async for line in paced_async(frames, delay):
+            await send({"type": "http.response.body", "body": line.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        asgi_streams.dec()
+
+
+# Same request metrics (and profiling) the Flask app records, for the routes
+# served here. 499 = the client went away before a response was started;
+# 500 = the handler raised before starting one.
+async def observed(route, handler, scope, receive, send):
+    status = 499
+    responded = False
+    # Each request runs in its own task, so the profile stays with it
+    profile = profiler.begin(scope["method"], scope["path"])
+
+    async def send_and_record(message):
+        nonlocal status, responded
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            responded = True
+        elif profile is not None and message.get("body"):
+            profile.chunk_sent()
+        await send(message)
+
+    in_flight = http_in_flight.labels(route)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        await handler(scope, receive, send_and_record)
+    except Exception:
+        if not responded:
+            status = 500
+        raise
+    finally:
+        http_request_seconds.labels(route, scope["method"]).observe(time.perf_counter() - started)
+        http_requests.labels(route, scope["method"], str(status)).inc()
+        in_flight.dec()
+        if profile is not None:
+            profiler.finish(profile, status)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.to_thread(shutdown)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/triage":
+        await observed("/triage", triage_stream, scope, receive, send)
+        return
+
+    if scope["type"] == "http" and scope["method"] == "GET":
+        if scope["path"] == "/queue/stream":
+            await observed("/queue/stream", queue_broadcaster.stream, scope, receive, send)
+            return
+        if scope["path"] == "/queue/changes":
+            await observed("/queue/changes", queue_broadcaster.long_poll, scope, receive, send)
+            return
+
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,48 @@
+import time
+
+import numpy as np
+
+# ================= DOCTOR AVAILABILITY =================
+# Availability is one of the /recommend ranking signals (see
+# DoctorDirectory.lookup). A provider answers for a whole directory at once:
+#
+#   provider.epoch()                 -> changes whenever the answers may change
+#   provider.statuses(directory)     -> (score per doctor in [0, 1], label per doctor)
+#
+# The directory keeps the last answer until the epoch moves, and the app puts
+# the epoch in its cache keys, so cached recommendations never outlive it.
+# Swap RotaAvailability for a provider backed by the hospitals' scheduling
+# feed when there is one.
+
+
+# Stand-in rota: each doctor cycles through the states, shifted by their id,
+# changing every `slot_minutes`. Same answer for everyone within a slot.
+class RotaAvailability:
+    STATES = (
+        ("Available Now", 1.0),
+        ("Available in 30m", 0.75),
+        ("On Call", 0.5),
+        ("In Surgery (1h)", 0.2)
+    )
+
+    def __init__(self, slot_minutes=30):
+        self.slot_seconds = max(1.0, float(slot_minutes) * 60.0)
+        self._labels = np.array([label for label, _ in self.STATES], dtype=object)
+        self._scores = np.array([score for _, score in self.STATES])
+
+    def epoch(self):
+        return int(time.time() // self.slot_seconds)
+
+    def statuses(self, directory):
+        state = (directory.id_hashes + self.epoch()) % len(self.STATES)
+        return self._scores[state], self._labels[state]
+
+
+# Everyone available; for deployments that don't want a rota shown
+class AlwaysAvailable:
+    def epoch(self):
+        return 0
+
+    def statuses(self, directory):
+        count = len(directory)
+        return np.ones(count), np.full(count, "Available Now", dtype=object)
@@ -0,0 +1,35 @@
+import argparse
+
+from history_export import ExportProgress
+from rollups import count_batches
+from storage import create_storage
+
+# ================= ROLLUP BACKFILL =================
+# One-off: rebuilds triage_rollups (see rollups.py) from the whole history
+# table, e.g. after migrate_db.py adds it. Safe to re-run. The recount goes
+# into a shadow table that is swapped in at the end (Storage.rebuild_rollups),
+# so the server can keep running: results it saves meanwhile are carried over,
+# and its writes only wait for the swap itself.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the triage analytics rollups from history")
+    parser.add_argument("--batch-size", type=int, default=5000, help="history rows fetched per round trip")
+    args = parser.parse_args()
+
+    storage = create_storage()
+    progress = ExportProgress()
+    try:
+        print("⏳ Counting history...")
+        written = storage.rebuild_rollups(
+            lambda batches: count_batches(progress.counted(batches)),
+            batch_size=max(1, args.batch_size)
+        )
+    finally:
+        storage.close()
+
+    print(f"✅ Rolled up {progress.summary()} into {written:,} counters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# ================= MICRO BATCHER =================
+# Collects single-item calls from concurrent requests and runs them through
+# `handler` as one list, so the per-call overhead of the vectorizer and model
+# is paid once per batch instead of once per request. A batch is dispatched
+# when it reaches `max_batch_size` items or when its oldest item has waited
+# `max_wait_ms`, whichever comes first.
+
+
+class MicroBatcher:
+    def __init__(self, handler, max_batch_size=64, max_wait_ms=2.0, name="micro-batcher", stats_window=1024):
+        self.handler = handler
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Totals since start plus a sliding window for percentiles
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._max_batch_seen = 0
+        self._batch_sizes = deque(maxlen=stats_window)
+        self._queue_waits = deque(maxlen=stats_window)
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append((item, future, time.perf_counter()))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch_size:
+                self._cond.notify()
+        return future
+
+    def run(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+    # ================= WORKER =================
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            size = min(len(self._pending), self.max_batch_size)
+            return [self._pending.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.handler(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"handler returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                with self._cond:
+                    self._errors += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        with self._cond:
+            self._batches += 1
+            self._items += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._batch_sizes.append(len(batch))
+            for _, _, enqueued in batch:
+                self._queue_waits.append((started - enqueued) * 1000.0)
+
+    # ================= STATS =================
+    def stats(self):
+        with self._cond:
+            sizes = sorted(self._batch_sizes)
+            waits = sorted(self._queue_waits)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": len(self._pending),
+            "batches": self._batches,
+            "items": self._items,
+            "errors": self._errors,
+            "batch_size": {
+                "mean": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "max": self._max_batch_seen,
+                "p50": _percentile(sizes, 50),
+                "p99": _percentile(sizes, 99)
+            },
+            "queue_wait_ms": {
+                "p50": round(_percentile(waits, 50), 3),
+                "p95": round(_percentile(waits, 95), 3),
+                "p99": round(_percentile(waits, 99), 3),
+                "max": round(waits[-1], 3) if waits else 0.0
+            }
+        }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
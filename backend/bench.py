@@ -0,0 +1,345 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from knowledge_base import SOURCE_FILES, source_paths
+from rollups import count_batches
+
+# ================= LOAD BENCHMARK =================
+# Drives every backend endpoint through the Flask test client against a
+# throwaway SQLite database, so it runs offline with no MySQL server:
+#
+#   python bench.py                                  # 10x, 100x, 1000x datasets
+#   python bench.py --scales 1,10 --requests 500 --concurrency 8 --json bench.json
+#
+# For each scale the training and doctor CSVs are blown up synthetically
+# (the risk model is reused as is), compiled with build_kb.py and served by a
+# fresh interpreter, so module-level state and peak RSS are per scale. Every
+# scenario reports p50/p95/p99 latency and requests/s; the JSON output also
+# records the commit so runs can be compared.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = [
+    "triage_exact", "triage_substring", "triage_miss",
+    "recommend", "history", "queue", "analytics", "signup", "login"
+]
+
+FILLER = ["since yesterday", "and it is getting worse", "for two days", "after lunch", "at night"]
+NONSENSE = ["blorf", "quaxing", "zindle", "vromp", "plinth", "glarb", "snoof", "wuggle"]
+
+
+# ================= SYNTHETIC DATA =================
+def read_csv(path):
+    with open(path, newline="", encoding="latin1") as f:
+        return list(csv.DictReader(f))
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="latin1") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# The original rows plus (scale - 1) numbered copies of each, so a 100x
+# knowledge base has 100x the phrases and doctors with the same shape
+def scaled_rows(rows, scale, vary):
+    out = [dict(row) for row in rows]
+    for copy in range(1, scale):
+        for i, row in enumerate(rows):
+            out.append(vary(dict(row), copy, i))
+    return out
+
+
+def build_dataset(source_dir, target_dir, scale):
+    os.makedirs(target_dir)
+    for name in (SOURCE_FILES["model"], SOURCE_FILES["vectorizer"]):
+        shutil.copy2(os.path.join(source_dir, name), target_dir)
+
+    training = [row for row in read_csv(os.path.join(source_dir, SOURCE_FILES["training"])) if row["text"].strip()]
+
+    def vary_training(row, copy, i):
+        row["text"] = f"{row['text'].strip()} variant {copy}"
+        return row
+
+    def vary_doctor(row, copy, i):
+        row["doctor_name"] = f"{row['doctor_name']} {copy}"
+        row["contact"] = str(int(row["contact"]) + copy * 1000 + i)
+        return row
+
+    write_csv(os.path.join(target_dir, SOURCE_FILES["training"]), scaled_rows(training, scale, vary_training))
+    doctors = read_csv(os.path.join(source_dir, SOURCE_FILES["doctors"]))
+    write_csv(os.path.join(target_dir, SOURCE_FILES["doctors"]), scaled_rows(doctors, scale, vary_doctor))
+
+    # Other cities' doctors scale the same way; area coordinates are copied
+    for key, path in source_paths(source_dir).items():
+        if key.startswith("doctors:"):
+            target = os.path.join(target_dir, os.path.basename(path))
+            write_csv(target, scaled_rows(read_csv(path), scale, vary_doctor))
+        elif key.startswith("areas:"):
+            shutil.copy2(path, target_dir)
+
+    subprocess.run(
+        [sys.executable, "build_kb.py", "--dir", target_dir],
+        cwd=BASE_DIR, check=True, stdout=subprocess.DEVNULL
+    )
+
+
+# ================= STATS =================
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, errors, wall):
+    ordered = sorted(latencies)
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+        "requests_per_s": round(len(latencies) / wall, 1) if wall else 0.0
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0, 1)
+
+
+# ================= WORKER =================
+# Runs inside the fresh interpreter for one scale and prints one JSON line
+def run_worker(args):
+    started = time.perf_counter()
+    import app
+    startup_ms = (time.perf_counter() - started) * 1000.0
+
+    rng = random.Random(args.seed)
+    kb = app.registry.current
+    phrases = [record.normalized for record in kb.training_records if record.normalized]
+
+    # ---- seed users and history ----
+    password = "bench-password"
+    users = []
+    seeder = app.app.test_client()
+    for i in range(args.users):
+        email = f"bench{i}@example.com"
+        seeder.post("/signup", json={
+            "name": f"Bench User {i}", "contact": "9000000000", "email": email,
+            "password": password, "age": 20 + i % 60, "gender": "Other"
+        })
+        users.append((app.storage.get_user_by_email(email)["id"], email))
+
+    now = datetime.now().replace(microsecond=0)
+    history_rows = []
+    for i in range(args.history_rows):
+        record = kb.training_records[rng.randrange(len(kb.training_records))]
+        history_rows.append((
+            users[i % len(users)][0], record.text, record.severity, record.risk,
+            record.doctor, record.advice, now - timedelta(seconds=i)
+        ))
+    for i in range(0, len(history_rows), 1000):
+        chunk = history_rows[i:i + 1000]
+        # Rolled up like the history writer does, so /analytics has data
+        app.storage.insert_history(chunk, rollups=count_batches([[(r[3], r[1], r[4], r[6]) for r in chunk]]))
+
+    signup_counter = iter(range(10 ** 9))
+
+    def request_for(name):
+        if name == "triage_exact":
+            return "post", "/triage", {"message": rng.choice(phrases), "user_id": rng.choice(users)[0]}
+        if name == "triage_substring":
+            return "post", "/triage", {"message": f"i have {rng.choice(phrases)} {rng.choice(FILLER)}"}
+        if name == "triage_miss":
+            words = " ".join(rng.choice(NONSENSE) for _ in range(3))
+            return "post", "/triage", {"message": f"{words} {rng.randrange(10 ** 6)}"}
+        if name == "recommend":
+            return "post", "/recommend", {"symptoms": rng.choice(phrases)}
+        if name == "history":
+            return "get", f"/history/{rng.choice(users)[0]}?limit=50", None
+        if name == "queue":
+            return "get", "/queue", None
+        if name == "analytics":
+            return "get", f"/analytics?granularity={rng.choice(['hour', 'day'])}", None
+        if name == "signup":
+            n = next(signup_counter)
+            return "post", "/signup", {
+                "name": f"New User {n}", "contact": "9000000001", "email": f"new{n}-{args.seed}@example.com",
+                "password": password, "age": 30, "gender": "Other"
+            }
+        if name == "login":
+            return "post", "/login", {"email": rng.choice(users)[1], "password": password}
+        raise ValueError(name)
+
+    def scenario(name):
+        # Requests are drawn up front so the RNG isn't shared across threads
+        planned = [request_for(name) for _ in range(args.requests)]
+        chunks = [planned[i::args.concurrency] for i in range(args.concurrency)]
+
+        def run_chunk(chunk):
+            client = app.app.test_client()
+            latencies, errors = [], 0
+            for method, path, body in chunk:
+                t0 = time.perf_counter()
+                if method == "post":
+                    response = client.post(path, json=body)
+                else:
+                    response = client.get(path)
+                response.get_data()  # read streamed bodies to the end
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                if response.status_code >= 400:
+                    errors += 1
+            return latencies, errors
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(run_chunk, chunks))
+        wall = time.perf_counter() - t0
+
+        latencies = [ms for chunk_latencies, _ in results for ms in chunk_latencies]
+        return summarize(name, latencies, sum(errors for _, errors in results), wall)
+
+    results = [scenario(name) for name in args.scenarios]
+    app.history_writer.flush()
+
+    print(json.dumps({
+        "startup_ms": round(startup_ms, 1),
+        "kb_version": kb.version,
+        "training_rows": len(kb.training_records),
+        "doctors": len(kb.doctor_directory),
+        "history_rows": args.history_rows,
+        "peak_rss_mb": peak_rss_mb(),
+        "scenarios": results
+    }))
+
+
+# ================= DRIVER =================
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(args, scale, workdir):
+    artifact_dir = os.path.join(workdir, f"kb-{scale}x")
+    build_dataset(args.dir, artifact_dir, scale)
+
+    env = dict(
+        os.environ,
+        ARTIFACT_DIR=artifact_dir,
+        ARTIFACT_WATCH_SECONDS="0",
+        STORAGE_BACKEND="sqlite",
+        SQLITE_PATH=os.path.join(workdir, f"bench-{scale}x.db"),
+        STREAM_CHUNK_DELAY_MS=str(args.stream_delay_ms),
+        PASSWORD_HASH_METHOD=args.password_method,
+        QUEUE_RESYNC_SECONDS="0"
+    )
+    if args.no_cache:
+        env["RESULT_CACHE_SIZE"] = "0"
+
+    command = [
+        sys.executable, os.path.abspath(__file__), "--worker",
+        "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+        "--users", str(args.users), "--history-rows", str(args.history_per_scale * scale),
+        "--seed", str(args.seed), "--scenarios", ",".join(args.scenarios)
+    ]
+    completed = subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(f"❌ Benchmark worker failed at {scale}x")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["scale"] = scale
+    return result
+
+
+def print_report(run):
+    for result in run["results"]:
+        print(f"\n== {result['scale']}x: {result['training_rows']} phrases, {result['doctors']} doctors, "
+              f"{result['history_rows']} history rows | startup {result['startup_ms']} ms, "
+              f"peak RSS {result['peak_rss_mb']} MB")
+        print(f"{'scenario':<18}{'req':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+        for s in result["scenarios"]:
+            print(f"{s['scenario']:<18}{s['requests']:>7}{s['errors']:>6}{s['p50_ms']:>10.2f}"
+                  f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['requests_per_s']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmark for the backend")
+    parser.add_argument("--dir", default=BASE_DIR, help="directory with the source CSVs and pickles")
+    parser.add_argument("--scales", default="10,100,1000", help="dataset multipliers, comma separated")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads per scenario")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--history-per-scale", type=int, default=100, help="history rows per 1x of scale")
+    parser.add_argument("--stream-delay-ms", type=float, default=0, help="STREAM_CHUNK_DELAY_MS for /triage")
+    parser.add_argument("--password-method", default=os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1"))
+    parser.add_argument("--no-cache", action="store_true", help="disable the result cache")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--history-rows", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    args.concurrency = max(1, args.concurrency)
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    run = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "stream_delay_ms": args.stream_delay_ms,
+            "password_method": args.password_method,
+            "result_cache": not args.no_cache,
+            "seed": args.seed
+        },
+        "results": []
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in [int(s) for s in args.scales.split(",") if s]:
+            print(f"⏱️  Running {scale}x ...", flush=True)
+            run["results"].append(run_scale(args, scale, workdir))
+
+    print_report(run)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"\n📦 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from knowledge_base import source_paths
+
+# ================= STARTUP BENCHMARK =================
+# Times a cold `import app` (everything a worker does before it can serve the
+# first request) in fresh interpreters, once loading the CSVs and pickles and
+# once loading the compiled knowledge base:
+#
+#   python bench_startup.py --runs 5
+#   python bench_startup.py --json startup.json --max-ms 500   # fail CI above 500 ms (compiled)
+#
+# Uses a throwaway SQLite database, so no MySQL server is needed.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - started) * 1000.0
+print(json.dumps({
+    "import_ms": elapsed,
+    "kb_ms": app.registry.build_ms,
+    "source": app.registry.current.source,
+    "pandas": "pandas" in sys.modules,
+    "sklearn": "sklearn" in sys.modules
+}))
+"""
+
+
+def run_once(artifact_dir, workdir):
+    env = dict(
+        os.environ,
+        ARTIFACT_DIR=artifact_dir,
+        ARTIFACT_WATCH_SECONDS="0",
+        STORAGE_BACKEND="sqlite",
+        SQLITE_PATH=os.path.join(workdir, "startup.db"),
+        INFERENCE_BATCHING="0"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(name, artifact_dir, workdir, runs):
+    samples = [run_once(artifact_dir, workdir) for _ in range(runs)]
+    import_ms = sorted(s["import_ms"] for s in samples)
+    kb_ms = sorted(s["kb_ms"] for s in samples)
+    return {
+        "mode": name,
+        "source": samples[-1]["source"],
+        "runs": runs,
+        "import_ms_min": round(import_ms[0], 1),
+        "import_ms_median": round(statistics.median(import_ms), 1),
+        "kb_load_ms_median": round(statistics.median(kb_ms), 1),
+        "imports_pandas": samples[-1]["pandas"],
+        "imports_sklearn": samples[-1]["sklearn"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start of the backend")
+    parser.add_argument("--dir", default=BASE_DIR, help="directory with the CSVs and pickles")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--max-ms", type=float, help="exit non-zero if the compiled median exceeds this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sources_dir = os.path.join(workdir, "sources")
+        compiled_dir = os.path.join(workdir, "compiled")
+        os.makedirs(sources_dir)
+        for path in source_paths(args.dir).values():
+            shutil.copy2(path, sources_dir)
+        shutil.copytree(sources_dir, compiled_dir)
+        subprocess.run(
+            [sys.executable, "build_kb.py", "--dir", compiled_dir],
+            cwd=BASE_DIR, check=True, stdout=subprocess.DEVNULL
+        )
+
+        results = [
+            measure("sources", sources_dir, workdir, args.runs),
+            measure("compiled", compiled_dir, workdir, args.runs)
+        ]
+
+    for r in results:
+        print(f"{r['mode']:>9}: import {r['import_ms_median']:7.1f} ms median ({r['import_ms_min']:.1f} min), "
+              f"knowledge base {r['kb_load_ms_median']:.1f} ms, "
+              f"pandas={'yes' if r['imports_pandas'] else 'no'} sklearn={'yes' if r['imports_sklearn'] else 'no'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_ms is not None and results[-1]["import_ms_median"] > args.max_ms:
+        print(f"❌ Compiled startup {results[-1]['import_ms_median']} ms is over the {args.max_ms} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
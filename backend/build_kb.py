@@ -0,0 +1,106 @@
+import argparse
+import os
+import time
+
+from knowledge_base import COMPILED_FILE, read_sources
+from inference import LinearTextModel, SklearnScorer
+from kb_artifact import read_artifact, write_artifact
+
+# ================= BUILD KNOWLEDGE BASE =================
+# Compiles training_data.csv, the doctors_*.csv / areas_*.csv city files and
+# the pickled model into the single binary file the server loads at startup
+# (see kb_artifact.py):
+#
+#   python build_kb.py                       # writes knowledge_base.kb next to the sources
+#   python build_kb.py --dir /srv/kb --output /srv/kb/knowledge_base.kb
+#
+# Re-run it whenever the CSVs or the model change; the server falls back to
+# the (slower) sources while the compiled file is older than any of them.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def export_model(model, vectorizer):
+    if not hasattr(vectorizer, "vocabulary_"):
+        raise SystemExit("❌ Only TF-IDF models can be compiled; serve hashing models from the pickles")
+    params = vectorizer.get_params()
+    if params["analyzer"] != "word" or params["tokenizer"] or params["preprocessor"] or params["strip_accents"]:
+        raise SystemExit("❌ Only the default word analyzer can be compiled")
+    if not params["use_idf"]:
+        raise SystemExit("❌ Vectorizers without idf weighting are not supported")
+
+    coef = model.coef_.tolist()
+    if len(model.classes_) == 2:
+        mode = "binary"
+    else:
+        # LogisticRegression is multinomial unless explicitly trained one-vs-rest
+        mode = "ovr" if getattr(model, "multi_class", "auto") == "ovr" else "multinomial"
+
+    return {
+        "classes": [str(label) for label in model.classes_],
+        "vocabulary": {term: int(column) for term, column in vectorizer.vocabulary_.items()},
+        "idf": vectorizer.idf_.tolist(),
+        "coef": coef,
+        "intercept": model.intercept_.tolist(),
+        "stop_words": sorted(vectorizer.get_stop_words() or ()),
+        "token_pattern": params["token_pattern"],
+        "ngram_range": list(params["ngram_range"]),
+        "lowercase": params["lowercase"],
+        "sublinear_tf": params["sublinear_tf"],
+        "norm": params["norm"],
+        "mode": mode
+    }
+
+
+# The compiled model must give the same probabilities as sklearn does
+def check_parity(exported, model, vectorizer, texts, tolerance=1e-9):
+    compiled = LinearTextModel(**exported)
+    expected, expected_known = SklearnScorer(model, vectorizer).predict_proba(texts)
+    actual, actual_known = compiled.predict_proba(texts)
+
+    worst = 0.0
+    for text, want, got, want_known, got_known in zip(texts, expected, actual, expected_known, actual_known):
+        if want_known != got_known:
+            raise SystemExit(f"❌ Feature mismatch for {text!r}: sklearn {want_known}, compiled {got_known}")
+        worst = max([worst] + [abs(a - b) for a, b in zip(want, got)])
+    if worst > tolerance:
+        raise SystemExit(f"❌ Compiled model differs from sklearn by {worst:.3g}")
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the knowledge base into one binary artifact")
+    parser.add_argument("--dir", default=BASE_DIR, help="directory with the CSVs and pickles")
+    parser.add_argument("--output", help=f"artifact path (default: <dir>/{COMPILED_FILE})")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(args.dir, COMPILED_FILE)
+
+    started = time.perf_counter()
+    version, model, vectorizer, training_rows, doctor_rows, area_rows = read_sources(args.dir)
+    exported = export_model(model, vectorizer)
+
+    texts = [row["text"] for row in training_rows if row["text"]]
+    texts += ["", "no known words here", "severe chest pain and shortness of breath"]
+    worst = check_parity(exported, model, vectorizer, texts)
+
+    # Write next to the target and rename, so a watching server never reads
+    # a half-written file
+    partial = output + ".tmp"
+    checksum = write_artifact(partial, version, training_rows, doctor_rows, exported, area_rows)
+    os.replace(partial, output)
+    built_ms = (time.perf_counter() - started) * 1000.0
+
+    started = time.perf_counter()
+    compiled = read_artifact(output)
+    load_ms = (time.perf_counter() - started) * 1000.0
+
+    print(f"✅ Knowledge base {version} compiled to {output}")
+    print(f"📦 {os.path.getsize(output)} bytes, sha256 {checksum[:16]}…")
+    print(f"   {len(compiled.training_rows)} training rows, {len(compiled.doctor_rows)} doctors, "
+          f"{len(compiled.area_rows)} areas, {len(exported['vocabulary'])} terms, max model drift {worst:.1e}")
+    print(f"   built in {built_ms:.0f} ms, loads in {load_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,18 @@
-import mysql.connector
-
-DB_CONFIG = {
-    "host": "127.0.0.1",
-    "user": "root",
-    "password": "",
-    "database": "ai_health"
-}
+from storage import create_storage
 
 try:
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    
-    cursor.execute("SHOW TABLES")
-    tables = cursor.fetchall()
+    storage = create_storage()
+
+    if storage.name == "sqlite":
+        rows = storage.fetchall("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+    else:
+        rows = storage.fetchall("SHOW TABLES")
     
-    print("Tables in 'ai_health':")
-    for (table_name,) in tables:
-        print(f"- {table_name}")
+    print(f"Tables in '{storage.name}' database:")
+    for row in rows:
+        print(f"- {list(row.values())[0]}")
         
-    cursor.close()
-    conn.close()
+    storage.close()
     
-except mysql.connector.Error as err:
+except Exception as err:
     print(f"Error: {err}")
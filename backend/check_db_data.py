@@ -1,32 +1,20 @@
-import mysql.connector
-
-DB_CONFIG = {
-    "host": "127.0.0.1",
-    "user": "root",
-    "password": "",
-    "database": "ai_health"
-}
+from storage import create_storage
 
 try:
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT COUNT(*) FROM users")
-    user_count = cursor.fetchone()[0]
+    storage = create_storage()
     
-    cursor.execute("SELECT COUNT(*) FROM history")
-    history_count = cursor.fetchone()[0]
+    user_count = storage.fetchone("SELECT COUNT(*) AS n FROM users")["n"]
+    history_count = storage.fetchone("SELECT COUNT(*) AS n FROM history")["n"]
     
     print(f"Users count: {user_count}")
     print(f"History count: {history_count}")
     
     if user_count > 0:
-        cursor.execute("SELECT id, name, email FROM users LIMIT 5")
         print("\nRecent Users:")
-        for r in cursor.fetchall():
+        for r in storage.fetchall("SELECT id, name, email FROM users LIMIT 5"):
             print(r)
 
-    conn.close()
+    storage.close()
     
-except mysql.connector.Error as err:
+except Exception as err:
     print(f"Error: {err}")
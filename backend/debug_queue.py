@@ -1,35 +1,10 @@
-import mysql.connector
-
-DB_CONFIG = {
-    "host": "127.0.0.1",
-    "user": "root",
-    "password": "",
-    "database": "ai_health"
-}
+from storage import create_storage
 
 try:
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    
-    query = """
-        SELECT 
-            h.id, 
-            u.name, 
-            u.contact, 
-            h.symptoms, 
-            h.severity, 
-            h.risk, 
-            h.doctor, 
-            h.created_at
-        FROM history h
-        JOIN users u ON h.user_id = u.id
-        ORDER BY h.created_at DESC
-        LIMIT 50
-    """
+    storage = create_storage()
     
     print("Executing JOIN query...")
-    cursor.execute(query)
-    rows = cursor.fetchall()
+    rows = storage.recent_queue(limit=50)
     
     print(f"Rows found: {len(rows)}")
     for row in rows[:5]:
@@ -37,15 +12,13 @@ try:
         
     if len(rows) == 0:
         print("\nChecking raw history user_ids:")
-        cursor.execute("SELECT DISTINCT user_id FROM history")
-        history_user_ids = [r[0] for r in cursor.fetchall()]
+        history_user_ids = [r["user_id"] for r in storage.fetchall("SELECT DISTINCT user_id FROM history")]
         print(f"History user_ids: {history_user_ids}")
         
-        cursor.execute("SELECT id FROM users")
-        user_ids = [r[0] for r in cursor.fetchall()]
+        user_ids = [r["id"] for r in storage.fetchall("SELECT id FROM users")]
         print(f"Users user_ids: {user_ids}")
 
-    conn.close()
+    storage.close()
     
-except mysql.connector.Error as err:
+except Exception as err:
     print(f"Error: {err}")
@@ -0,0 +1,299 @@
+import hashlib
+import sys
+
+import numpy as np
+
+from geo_index import GridIndex, distances_km
+from result_cache import normalize_text
+
+# ================= DOCTOR DIRECTORY =================
+# Built once when the doctors CSV is loaded: every canonical specialization
+# maps to its candidate doctors, and the ranking signals are precomputed as
+# NumPy columns. A lookup scores the candidates in a few vector operations and
+# picks the top k with argpartition, so the request path never touches pandas
+# and never sorts the whole directory.
+#
+# Rankings are deterministic: the same request against the same directory
+# (and availability epoch, see availability.py) always returns the same
+# doctors, scores and ids, which is what lets the app cache them.
+#
+# The directory may span several cities. Doctors are placed at their area's
+# coordinates (the areas_<city>.csv tables); given a patient location, only
+# the nearest candidates of the specialization (per-specialization grid, see
+# geo_index.py) are ranked, with proximity as a signal.
+
+# Share of the match score each signal contributes; proximity only counts when
+# the patient gave a location, availability only when a provider is passed
+RANK_WEIGHTS = {
+    "specialization": 0.45,
+    "experience": 0.25,
+    "proximity": 0.15,
+    "availability": 0.15
+}
+
+# Specialization strength: listed under exactly this specialization, listed
+# under it among others ("Emergency / Cardiologist"), or shown as a general
+# physician because nobody with the requested one is in the directory
+EXACT_SPECIALIZATION = 1.0
+PARTIAL_SPECIALIZATION = 0.8
+FALLBACK_SPECIALIZATION = 0.4
+
+# With a location, the nearest max(k * NEAREST_FACTOR, NEAREST_MIN) candidates
+# are ranked; proximity halves every PROXIMITY_KM
+NEAREST_FACTOR = 4
+NEAREST_MIN = 20
+PROXIMITY_KM = 5.0
+
+
+# Stable across restarts and reloads, unlike a row number
+def doctor_id(name, hospital, contact):
+    key = f"{name}|{hospital}|{contact}".lower().encode("utf-8")
+    return hashlib.blake2b(key, digest_size=6).hexdigest()
+
+
+# One doctor, with the fields the API shows already formatted
+class DoctorRecord:
+    __slots__ = (
+        "id", "name", "hospital", "area", "city", "contact", "experience", "rating",
+        "specialization", "specialization_title"
+    )
+
+    def __init__(self, row):
+        self.name = row["doctor_name"]
+        self.hospital = sys.intern(str(row["hospital"]))
+        self.area = sys.intern(str(row["area"]))
+        self.city = sys.intern(str(row.get("city") or "").title())
+        self.contact = str(row["contact"])
+        self.experience = int(row["experience_years"])
+        self.specialization = sys.intern(str(row["specialization"]).lower().strip())
+        self.specialization_title = sys.intern(self.specialization.title())
+        self.id = doctor_id(self.name, self.hospital, self.contact)
+        self.rating = _rating(row.get("rating"))
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "hospital": self.hospital,
+            "area": self.area,
+            "city": self.city,
+            "contact": self.contact,
+            "experience": self.experience,
+            "rating": self.rating,
+            "specialization": self.specialization_title
+        }
+
+
+# The CSV's rating when it has one; None (shown as null) otherwise. It is
+# not a ranking signal.
+def _rating(value):
+    try:
+        rating = float(value)
+    except (TypeError, ValueError):
+        return None
+    return round(rating, 1) if rating == rating else None
+
+
+class DoctorDirectory:
+    def __init__(self, rows, specialization_map, default="general physician", area_rows=()):
+        self.specialization_map = specialization_map
+        self.default = default
+        self.records = tuple(DoctorRecord(row) for row in rows)
+
+        # ================= FEATURE COLUMNS =================
+        experience = np.array([record.experience for record in self.records], dtype=np.float64).clip(min=0)
+        top = np.log1p(experience.max()) if len(experience) else 0.0
+        # Log scale: 5 -> 15 years matters more than 25 -> 35
+        self.experience_score = np.log1p(experience) / top if top else np.zeros(len(self.records))
+
+        # Few distinct areas and cities: normalize each spelling once
+        normalized = {}
+
+        def key(text):
+            found = normalized.get(text)
+            if found is None:
+                found = normalized[text] = normalize_text(text)
+            return found
+
+        self.area_ids = {}
+        self.areas = np.array(
+            [self.area_ids.setdefault(key(record.area), len(self.area_ids)) for record in self.records],
+            dtype=np.int32
+        )
+        self.city_ids = {}
+        self.cities = np.array(
+            [self.city_ids.setdefault(key(record.city), len(self.city_ids)) for record in self.records],
+            dtype=np.int32
+        )
+
+        # ================= LOCATIONS =================
+        # (city, area) -> (lat, lon), and area -> [(city, lat, lon)] for
+        # requests that don't name a city
+        self.area_coordinates = {}
+        self.areas_by_name = {}
+        for row in area_rows:
+            city, area = normalize_text(row["city"]), normalize_text(row["area"])
+            point = (float(row["lat"]), float(row["lon"]))
+            if (city, area) not in self.area_coordinates:
+                self.area_coordinates[(city, area)] = point
+                self.areas_by_name.setdefault(area, []).append((city,) + point)
+
+        unplaced = (float("nan"), float("nan"))
+        points = [self.area_coordinates.get((key(record.city), key(record.area)), unplaced) for record in self.records]
+        self.lats = np.array([lat for lat, _ in points], dtype=np.float64)
+        self.lons = np.array([lon for _, lon in points], dtype=np.float64)
+
+        # For availability providers that derive a status from the id
+        self.id_hashes = np.array([int(record.id, 16) for record in self.records], dtype=np.int64)
+
+        # Same rule as the old str.contains filter: a doctor belongs to every
+        # canonical specialization that appears in their specialization text.
+        # canonical -> (doctor positions, specialization strength, grid over
+        # those positions' coordinates)
+        self.candidates = {}
+        for canonical in set(specialization_map.values()) | {default}:
+            positions = [i for i, record in enumerate(self.records) if canonical in record.specialization]
+            strength = [
+                EXACT_SPECIALIZATION if self.records[i].specialization == canonical else PARTIAL_SPECIALIZATION
+                for i in positions
+            ]
+            self.candidates[canonical] = self._candidate_set(np.array(positions, dtype=np.int64), np.array(strength))
+        self._everyone = None
+
+        # doctor text -> canonical specialization (inputs come from a small set)
+        self._resolved = {}
+        # (provider, epoch, scores, labels) from the last availability lookup
+        self._availability = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def _candidate_set(self, positions, strength):
+        grid = GridIndex(np.arange(len(positions)), self.lats[positions], self.lons[positions])
+        return positions, strength, grid
+
+    # Patient location as (lat, lon): the coordinates when given, else the
+    # area's (in `city` when given, else the first city that has that area)
+    def locate(self, area=None, city=None, lat=None, lon=None):
+        if lat is not None and lon is not None:
+            return lat, lon
+        if not area:
+            return None
+        area = normalize_text(area)
+        if city:
+            point = self.area_coordinates.get((normalize_text(city), area))
+            if point is not None:
+                return point
+        matches = self.areas_by_name.get(area)
+        return matches[0][1:] if matches else None
+
+    def resolve(self, doctor_text):
+        canonical = self._resolved.get(doctor_text)
+        if canonical is not None:
+            return canonical
+
+        normalized = doctor_text.lower().strip()
+        canonical = self.default
+        for key, value in self.specialization_map.items():
+            if key in normalized:
+                canonical = value
+                break
+
+        if len(self._resolved) < 4096:
+            self._resolved[doctor_text] = canonical
+        return canonical
+
+    def availability(self, provider):
+        epoch = provider.epoch()
+        cached = self._availability
+        if cached is None or cached[0] is not provider or cached[1] != epoch:
+            scores, labels = provider.statuses(self)
+            cached = self._availability = (provider, epoch, scores, labels)
+        return cached[2], cached[3]
+
+    # Falls back to general physicians, then to the whole directory, so the
+    # frontend always has real doctors to show
+    def _candidates_for(self, canonical):
+        found = self.candidates.get(canonical)
+        if found is not None and len(found[0]):
+            return found
+        positions, strength, grid = self.candidates[self.default]
+        if len(positions):
+            return positions, strength * FALLBACK_SPECIALIZATION, grid
+        if self._everyone is None:
+            self._everyone = self._candidate_set(np.arange(len(self.records)), np.zeros(len(self.records)))
+        return self._everyone
+
+    # Narrows the candidates to the nearest ones when the location is known
+    # (or to its city when only that is); returns positions, strength and the
+    # distance of each in km (NaN where unknown) or None without a location
+    def _near(self, positions, strength, grid, location, k):
+        point = self.locate(**location)
+        if point is None:
+            city_id = self.city_ids.get(normalize_text(location.get("city") or ""))
+            if city_id is not None:
+                in_city = self.cities[positions] == city_id
+                if in_city.any():
+                    return positions[in_city], strength[in_city], None
+            return positions, strength, None
+
+        wanted = max(k * NEAREST_FACTOR, NEAREST_MIN)
+        if len(grid) <= wanted:
+            # Few placed doctors: rank them all, unplaced ones get no proximity
+            return positions, strength, distances_km(point[0], point[1], self.lats[positions], self.lons[positions])
+        local, distance = grid.nearest(point[0], point[1], wanted)
+        return positions[local], strength[local], distance
+
+    # ================= RANKING =================
+    # Top k for a doctor type as fresh dicts with matchScore (0-100), the
+    # distance when a location is given and, when a provider is given, the
+    # availability label. location: dict of area / city / lat / lon.
+    def lookup(self, doctor_text, k=5, location=None, availability=None):
+        if not self.records or k <= 0:
+            return []
+        positions, strength, grid = self._candidates_for(self.resolve(doctor_text))
+        distance = None
+        if location:
+            positions, strength, distance = self._near(positions, strength, grid, location, k)
+
+        score = RANK_WEIGHTS["specialization"] * strength + RANK_WEIGHTS["experience"] * self.experience_score[positions]
+        attainable = RANK_WEIGHTS["specialization"] + RANK_WEIGHTS["experience"]
+
+        if distance is not None:
+            score += RANK_WEIGHTS["proximity"] * np.nan_to_num(1.0 / (1.0 + distance / PROXIMITY_KM))
+            attainable += RANK_WEIGHTS["proximity"]
+        elif location and location.get("area"):
+            # An area without coordinates still favours doctors in it
+            area_id = self.area_ids.get(normalize_text(location["area"]))
+            if area_id is not None:
+                score += RANK_WEIGHTS["proximity"] * (self.areas[positions] == area_id)
+                attainable += RANK_WEIGHTS["proximity"]
+
+        labels = None
+        if availability is not None:
+            available, labels = self.availability(availability)
+            score += RANK_WEIGHTS["availability"] * available[positions]
+            attainable += RANK_WEIGHTS["availability"]
+
+        top = self._top(score, positions, k)
+        ranked = []
+        for i in top:
+            doctor = self.records[positions[i]].as_dict()
+            doctor["matchScore"] = int(round(100.0 * score[i] / attainable))
+            if distance is not None and distance[i] == distance[i]:
+                doctor["distance_km"] = round(float(distance[i]), 1)
+            if labels is not None:
+                doctor["availability"] = labels[positions[i]]
+            ranked.append(doctor)
+        return ranked
+
+    # Partial selection of the k-th best score, then a sort of just the
+    # candidates at or above it (best score first, file order on ties)
+    @staticmethod
+    def _top(score, positions, k):
+        if k < len(score):
+            kth = np.partition(score, len(score) - k)[len(score) - k]
+            top = np.flatnonzero(score >= kth)
+        else:
+            top = np.arange(len(score))
+        return top[np.lexsort((positions[top], -score[top]))][:k]
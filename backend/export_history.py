@@ -0,0 +1,60 @@
+import argparse
+import sys
+import time
+
+from history_export import FORMATS, ExportProgress, encode, parse_filters
+from storage import create_storage
+
+# ================= HISTORY EXPORT CLI =================
+# Same export as GET /admin/export, straight from the database (uses the
+# STORAGE_BACKEND / MYSQL_* / SQLITE_PATH settings the server uses):
+#
+#   python export_history.py --format csv --start 2024-01-01 --end 2024-03-31 -o audit.csv
+#   python export_history.py --risk HIGH --doctor cardiologist | gzip > high.ndjson.gz
+#
+# Progress and the final rows/s go to stderr, so stdout can be piped.
+
+PROGRESS_SECONDS = 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream triage history (joined to users) as NDJSON or CSV")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--start", help="first day or timestamp to include (YYYY-MM-DD[ HH:MM:SS])")
+    parser.add_argument("--end", help="last day to include, or timestamp to stop before")
+    parser.add_argument("--risk", help="only this risk level (LOW, MEDIUM, HIGH)")
+    parser.add_argument("--doctor", help="only this doctor type, e.g. Cardiologist")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows fetched per round trip")
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        filters = parse_filters(vars(args))
+    except ValueError as e:
+        parser.error(str(e))
+
+    storage = create_storage()
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    progress = ExportProgress()
+    reported = time.perf_counter()
+    try:
+        batches = storage.export_history(batch_size=max(1, args.batch_size), **filters)
+        for chunk in encode(args.format, storage.EXPORT_COLUMNS, progress.counted(batches)):
+            out.write(chunk)
+            if time.perf_counter() - reported >= PROGRESS_SECONDS:
+                reported = time.perf_counter()
+                print(f"⏳ {progress.summary()}", file=sys.stderr)
+        out.flush()
+    except BrokenPipeError:
+        # Reader went away (e.g. `| head`); nothing more to do
+        pass
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        storage.close()
+
+    print(f"✅ Exported {progress.summary()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# ================= FUZZY SYMPTOM INDEX =================
+# Typo-tolerant phrase lookup ("feaver", "chest pian", "head ache") for
+# messages the exact and substring tiers miss. Built once per knowledge base,
+# SymSpell style: every phrase is stored under the strings left after
+# deleting up to `max_distance` characters from it, so a lookup only
+# generates the deletes of its own (short) input and does dict hits. Request
+# cost depends on the message, not on how many phrases there are.
+#
+# Phrases and message words are compared with spaces removed, so spacing
+# mistakes cost nothing. Only the first `prefix_length` characters are
+# indexed (which keeps the dictionary small); candidates are then checked
+# against the whole phrase with the optimal-string-alignment distance
+# (Damerau-Levenshtein where adjacent swaps like "pian" -> "pain" cost 1).
+#
+# Short words allow fewer edits, on both sides: at one edit "ear" would also
+# be "eye", and "could" would be "cold".
+
+# Key length -> edits allowed (capped at max_distance)
+def allowed_distance(length, max_distance):
+    if length < 5:
+        return 0
+    if length < 9:
+        return min(1, max_distance)
+    return max_distance
+
+
+def deletes(word, distance):
+    found = set()
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    found.discard(word)
+    return found
+
+
+def osa_distance(a, b, limit):
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_best = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            if value < row_best:
+                row_best = value
+        if row_best > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    def __init__(self, phrases, max_distance=2, prefix_length=7):
+        self.max_distance = max(0, int(max_distance))
+        self.prefix_length = prefix_length
+
+        # compact phrase (no spaces) -> position of its first row
+        self.terms = {}
+        # prefix, or a delete of it -> lists of compact phrases (one per prefix)
+        self._keys = {}
+        self.max_words = 0
+        self.max_length = 0
+        prefixes = {}
+
+        for position, phrase in enumerate(phrases):
+            if not isinstance(phrase, str) or not phrase:
+                continue
+            term = phrase.replace(" ", "")
+            if not term or term in self.terms:
+                continue
+            self.terms[term] = position
+            self.max_words = max(self.max_words, len(phrase.split()))
+            self.max_length = max(self.max_length, len(term))
+
+            prefix = term[:prefix_length]
+            terms = prefixes.get(prefix)
+            if terms is None:
+                # First phrase with this prefix: the keys all share one list
+                terms = prefixes[prefix] = []
+                for key in deletes(prefix, self.max_distance) | {prefix}:
+                    self._keys.setdefault(key, []).append(terms)
+            terms.append(term)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def lookup(self, word, distance):
+        prefix = word[:self.prefix_length]
+        seen = set()
+        best = None
+        for key in deletes(prefix, distance) | {prefix}:
+            for terms in self._keys.get(key, ()):
+                if id(terms) in seen:
+                    continue
+                seen.add(id(terms))
+                for term in terms:
+                    limit = min(distance, allowed_distance(len(term), self.max_distance))
+                    found = osa_distance(word, term, limit)
+                    if found > limit:
+                        continue
+                    # Fewest edits, then the longer phrase, then the earlier row
+                    rank = (found, -len(term), self.terms[term])
+                    if best is None or rank < best:
+                        best = rank
+        return best
+
+    # Best phrase within reach of any run of words in the message, as
+    # (position, confidence) with confidence = 1 - edits / length, or None.
+    # A run may be one word longer than the longest phrase ("head ache").
+    def match(self, text):
+        if not self.terms:
+            return None
+        words = text.split()
+        best = None
+        for start in range(len(words)):
+            word = ""
+            for end in range(start, min(len(words), start + self.max_words + 1)):
+                word += words[end]
+                if len(word) > self.max_length + self.max_distance:
+                    break
+                distance = allowed_distance(len(word), self.max_distance)
+                found = self.lookup(word, distance)
+                if found is None:
+                    continue
+                edits, negative_length, position = found
+                confidence = 1.0 - edits / max(len(word), -negative_length)
+                rank = (-confidence, negative_length, position)
+                if best is None or rank < best:
+                    best = rank
+        if best is None:
+            return None
+        return best[2], round(-best[0], 4)
@@ -0,0 +1,138 @@
+import math
+
+import numpy as np
+
+# ================= SPATIAL INDEX =================
+# Nearest-k lookups over a fixed set of points (doctors of one
+# specialization), built once per knowledge base. Points are bucketed into a
+# grid of roughly `cell_km` square cells; a query scans rings of cells
+# outwards from the patient's cell and stops once no unscanned cell can hold
+# anything closer than the k-th best so far. Cost depends on how many doctors
+# are near the patient, not on how many are in the directory, so a statewide
+# directory answers as fast as a single city. Patients outside the grid (or so
+# far from everyone that the rings would cost more) get a plain scan of every
+# point instead.
+#
+# Longitude cells are sized at the points' mean latitude, which is accurate
+# enough for a city or state; distances themselves are exact haversine.
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def distances_km(lat, lon, lats, lons):
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons) - math.radians(lon)
+    a = np.sin(dlat / 2.0) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def valid_coordinates(lat, lon):
+    return -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0
+
+
+class GridIndex:
+    # `ids` are whatever the caller wants back (e.g. positions in a candidate
+    # list); points with NaN coordinates are left out
+    def __init__(self, ids, lats, lons, cell_km=5.0):
+        ids = np.asarray(ids)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        known = ~(np.isnan(lats) | np.isnan(lons))
+        self.ids = ids[known]
+        self.lats = lats[known]
+        self.lons = lons[known]
+        self.cell_km = float(cell_km)
+
+        reference = float(self.lats.mean()) if len(self.lats) else 0.0
+        self.lat_step = self.cell_km / KM_PER_DEGREE
+        self.lon_step = self.cell_km / (KM_PER_DEGREE * max(math.cos(math.radians(reference)), 0.01))
+
+        rows = np.floor(self.lats / self.lat_step).astype(np.int64)
+        cols = np.floor(self.lons / self.lon_step).astype(np.int64)
+        # cell -> indexes into ids/lats/lons (grouped with one sort)
+        order = np.lexsort((cols, rows))
+        starts = np.flatnonzero(np.diff(rows[order]) | np.diff(cols[order])) + 1
+        self.cells = {
+            (int(rows[members[0]]), int(cols[members[0]])): members
+            for members in np.split(order, starts)
+            if len(members)
+        }
+
+        if self.cells:
+            self.row_range = (int(rows.min()), int(rows.max()))
+            self.col_range = (int(cols.min()), int(cols.max()))
+            # Narrowest a cell gets: longitude cells shrink towards the poles,
+            # so use the grid's most poleward latitude
+            poleward = min(90.0, max(abs(self.row_range[0]), abs(self.row_range[1] + 1)) * self.lat_step)
+            self.min_cell_km = min(self.cell_km, self.lon_step * KM_PER_DEGREE * math.cos(math.radians(poleward)))
+            # Beyond this many cell lookups a plain scan of every point is cheaper
+            self.max_lookups = 4 * len(self.cells) + 64
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _ring(self, row, col, radius):
+        if radius == 0:
+            yield row, col
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield row - radius, c
+            yield row + radius, c
+        for r in range(row - radius + 1, row + radius):
+            yield r, col - radius
+            yield r, col + radius
+
+    # (ids, distances in km) of the k closest points, closest first
+    def nearest(self, lat, lon, k):
+        if not self.cells or k <= 0:
+            return self.ids[:0], np.zeros(0)
+        row = math.floor(lat / self.lat_step)
+        col = math.floor(lon / self.lon_step)
+        # Outside the grid the rings would mostly be empty: scan every point
+        if not (self.row_range[0] <= row <= self.row_range[1] and self.col_range[0] <= col <= self.col_range[1]):
+            return self._closest(np.arange(len(self.ids)), lat, lon, k)
+        # Rings needed to reach the far corner of the grid from here
+        last = max(
+            abs(row - self.row_range[0]), abs(row - self.row_range[1]),
+            abs(col - self.col_range[0]), abs(col - self.col_range[1])
+        )
+
+        found = []
+        best = np.zeros(0)   # the k smallest distances so far
+        kth = math.inf
+        lookups = 0
+        for radius in range(last + 1):
+            # Anything in this ring or beyond is at least (radius - 1) cells away
+            if len(best) >= k and (radius - 1) * self.min_cell_km > kth:
+                break
+            if lookups > self.max_lookups:
+                return self._closest(np.arange(len(self.ids)), lat, lon, k)
+            added = []
+            for cell in self._ring(row, col, radius):
+                lookups += 1
+                members = self.cells.get(cell)
+                if members is not None:
+                    added.append(members)
+            if added:
+                found.extend(added)
+                added = np.concatenate(added)
+                best = np.concatenate((best, distances_km(lat, lon, self.lats[added], self.lons[added])))
+                if len(best) > k:
+                    best = np.partition(best, k - 1)[:k]
+                if len(best) >= k:
+                    kth = best.max()
+
+        members = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+        return self._closest(members, lat, lon, k)
+
+    def _closest(self, members, lat, lon, k):
+        distance = distances_km(lat, lon, self.lats[members], self.lons[members])
+        if k < len(members):
+            # Only sort what can make the cut (ties at the k-th all stay in)
+            near = distance <= np.partition(distance, k - 1)[k - 1]
+            members, distance = members[near], distance[near]
+        order = np.lexsort((members, distance))[:k]
+        return self.ids[members[order]], distance[order]
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime, timedelta
+
+from streaming import NDJSON
+
+# ================= HISTORY EXPORT =================
+# Shared by GET /admin/export and export_history.py. Rows come from
+# Storage.export_history in batches off an unbuffered cursor and are encoded
+# one batch at a time, so memory use is the same for a thousand rows or fifty
+# million. Each batch becomes one chunk of output.
+
+FORMATS = {
+    "ndjson": NDJSON,
+    "csv": "text/csv"
+}
+
+
+# ================= FILTERS =================
+# "2024-01-31" or "2024-01-31 18:00[:00]"; a bare date as `end` covers that
+# whole day
+def parse_time(value, end=False):
+    parsed = datetime.fromisoformat(value.strip())
+    if end and len(value.strip()) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+# Query arguments (or CLI options) -> keyword arguments for
+# Storage.export_history; raises ValueError on a bad date
+def parse_filters(args):
+    filters = {}
+    for name in ("start", "end"):
+        value = args.get(name)
+        if value:
+            try:
+                filters[name] = parse_time(value, end=name == "end")
+            except ValueError:
+                raise ValueError(f"{name} must be a date (YYYY-MM-DD) or a timestamp")
+    for name in ("risk", "doctor"):
+        value = args.get(name)
+        if value and value.strip():
+            filters[name] = value.strip()
+    return filters
+
+
+# ================= ENCODING =================
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    return value
+
+
+def ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, map(_plain, row)))) + "\n" for row in rows)
+
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode(fmt, columns, batches):
+    if fmt == "csv":
+        return csv_chunks(columns, batches)
+    return ndjson_chunks(columns, batches)
+
+
+# ================= PROGRESS =================
+class ExportProgress:
+    def __init__(self):
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        seconds = self.seconds
+        return self.rows / seconds if seconds > 0 else 0.0
+
+    def summary(self):
+        return f"{self.rows:,} rows in {self.seconds:.1f}s ({self.rate:,.0f} rows/s)"
+
+    # Passes the batches through, counting rows
+    def counted(self, batches):
+        for rows in batches:
+            self.rows += len(rows)
+            yield rows
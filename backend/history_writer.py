@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from collections import deque
+
+# ================= HISTORY WRITER =================
+# Write-behind buffer for triage history. Requests enqueue a row and return
+# straight away; a background flusher hands rows to `flush_rows` in batches
+# (one multi-row INSERT + commit) whenever `batch_size` rows are waiting or
+# the oldest row has waited `flush_interval_ms`. When the queue is full new
+# rows are dropped and counted rather than blocking the request.
+#
+# mode="sync" skips the buffer and writes each row on the calling thread, for
+# deployments that need a row to be visible in /history as soon as /triage
+# returns.
+#
+# Also used for other write-behind rows (vitals); `name` labels its thread and
+# log messages.
+#
+# `row_errors` are the exceptions that mean a row itself is bad (e.g. a
+# foreign key naming a deleted user) rather than the database being down.
+# A batch failing with one is retried one row at a time, so only the bad
+# rows are dropped and counted as failed.
+
+
+class HistoryWriter:
+    def __init__(self, flush_rows, mode="async", max_queue=10000, batch_size=200, flush_interval_ms=200, name="history", row_errors=(), logger=None):
+        if mode not in ("async", "sync"):
+            raise ValueError(f"Unknown history write mode: {mode}")
+
+        self.flush_rows = flush_rows
+        self.mode = mode
+        self.name = name
+        self.row_errors = tuple(row_errors)
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._flushes = 0
+        self._flush_ms_total = 0.0
+        self._flush_ms_last = 0.0
+        self._flush_ms_max = 0.0
+
+        self._worker = None
+        if mode == "async":
+            self._worker = threading.Thread(target=self._run, name=f"{name}-writer", daemon=True)
+            self._worker.start()
+
+    def write(self, row):
+        if self.mode == "sync":
+            self._write_batch([row])
+            return True
+
+        with self._cond:
+            if self._closed or len(self._queue) >= self.max_queue:
+                self._dropped += 1
+                return False
+            self._queue.append((row, time.monotonic()))
+            self._enqueued += 1
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def flush(self):
+        # Drain everything that is queued right now on the calling thread
+        while True:
+            with self._cond:
+                batch = self._take(self.batch_size)
+            if not batch:
+                return
+            self._write_batch(batch)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join()
+        self.flush()
+
+    # ================= FLUSHER =================
+    def _take(self, limit):
+        size = min(limit, len(self._queue))
+        return [self._queue.popleft()[0] for _ in range(size)]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+                deadline = self._queue[0][1] + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._take(self.batch_size)
+
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        started = time.perf_counter()
+        with self._flush_lock:
+            written = self._flush(batch)
+        elapsed = (time.perf_counter() - started) * 1000.0
+
+        with self._cond:
+            self._failed += len(batch) - written
+            if not written:
+                return
+            self._written += written
+            self._flushes += 1
+            self._flush_ms_total += elapsed
+            self._flush_ms_last = elapsed
+            self._flush_ms_max = max(self._flush_ms_max, elapsed)
+
+    # Returns how many of the rows were saved
+    def _flush(self, batch):
+        try:
+            self.flush_rows(batch)
+            return len(batch)
+        except self.row_errors as e:
+            if len(batch) == 1:
+                self.logger.error("Dropped %s row %r: %s", self.name, batch[0], e)
+                return 0
+            self.logger.warning("Failed to save %s (%d rows), retrying one row at a time: %s", self.name, len(batch), e)
+            return sum(self._flush([row]) for row in batch)
+        except Exception as e:
+            self.logger.error("Failed to save %s (%d rows): %s", self.name, len(batch), e)
+            return 0
+
+    # ================= STATS =================
+    def stats(self):
+        with self._cond:
+            return {
+                "mode": self.mode,
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "flushes": self._flushes,
+                "flush_ms": {
+                    "last": round(self._flush_ms_last, 3),
+                    "mean": round(self._flush_ms_total / self._flushes, 3) if self._flushes else 0.0,
+                    "max": round(self._flush_ms_max, 3)
+                }
+            }
@@ -0,0 +1,167 @@
+import math
+import re
+
+# ================= RISK MODEL TIER =================
+# Fallback for messages that no training phrase matches. Everything here works
+# on lists of messages so a batch costs one vectorizer.transform and one
+# predict_proba call, however many messages it holds.
+
+# Severity reported for model predictions (typical score of each risk band)
+RISK_SEVERITY = {
+    "LOW": 1,
+    "MEDIUM": 4,
+    "HIGH": 9
+}
+
+RISK_ADVICE = {
+    "LOW": "Your symptoms look mild. Rest, stay hydrated and consult a doctor if they persist.",
+    "MEDIUM": "Please consult a doctor within 24-48 hours for a proper check-up.",
+    "HIGH": "Your symptoms may be serious. Please seek medical attention immediately."
+}
+
+
+def predict_risk(scorer, texts, min_confidence=0.0):
+    if not texts:
+        return []
+
+    classes = scorer.classes
+    predictions = []
+    for probabilities, known_terms in zip(*scorer.predict_proba(texts)):
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        confidence = float(probabilities[best])
+        # Rows with no known vocabulary only see the intercept, so don't trust them
+        if not known_terms or confidence < min_confidence:
+            predictions.append(None)
+            continue
+        risk = str(classes[best]).strip().upper()
+        predictions.append({
+            "risk": risk,
+            "confidence": round(confidence, 4),
+            "severity": RISK_SEVERITY.get(risk, 1),
+            "advice": RISK_ADVICE.get(risk, RISK_ADVICE["MEDIUM"])
+        })
+
+    return predictions
+
+
+# ================= SCORERS =================
+# predict_proba(texts) -> (probability rows, known term count per row), with
+# the columns in `classes` order.
+
+# Raises ValueError when the vectorizer's columns are not the ones the model
+# was trained on (e.g. a new vectorizer next to the previous model), so the
+# pair is rejected at load time instead of failing every request
+def check_pair(model, vectorizer):
+    width = vectorizer.transform([""]).shape[1]
+    expected = getattr(model, "n_features_in_", model.coef_.shape[1])
+    if width != expected:
+        raise ValueError(f"Vectorizer gives {width} features but the model expects {expected}; they are not from the same training run")
+
+
+# The pickled vectorizer and model, as train_model.py saves them
+class SklearnScorer:
+    def __init__(self, model, vectorizer):
+        check_pair(model, vectorizer)
+        self.model = model
+        self.vectorizer = vectorizer
+        self.classes = [str(label) for label in model.classes_]
+        # A HashingVectorizer (train_model.py --vectorizer hashing) gives every
+        # token a column, so only columns the model learned a weight for count
+        # as known terms
+        self.trained_columns = None
+        if not hasattr(vectorizer, "vocabulary_"):
+            self.trained_columns = (model.coef_ != 0).any(axis=0).nonzero()[0]
+
+    def predict_proba(self, texts):
+        X = self.vectorizer.transform(texts)
+        known = X if self.trained_columns is None else X[:, self.trained_columns]
+        return self.model.predict_proba(X).tolist(), known.getnnz(axis=1).tolist()
+
+
+# The same TF-IDF + logistic regression evaluated from the weights stored in
+# a compiled knowledge base (build_kb.py), in plain Python. Inputs are a few
+# words long, so a sparse dot product per message beats loading sklearn.
+class LinearTextModel:
+    def __init__(self, classes, vocabulary, idf, coef, intercept, stop_words, token_pattern=r"(?u)\b\w\w+\b",
+                 ngram_range=(1, 2), lowercase=True, sublinear_tf=False, norm="l2", mode="multinomial"):
+        self.classes = list(classes)
+        self.vocabulary = vocabulary    # term -> column
+        self.idf = idf                  # per column
+        self.coef = coef                # per class, per column
+        self.intercept = intercept      # per class
+        self.stop_words = frozenset(stop_words)
+        self.token_pattern = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.mode = mode
+
+    # Same tokens as sklearn's word analyzer: stop words are removed before
+    # n-grams are formed
+    def terms(self, text):
+        if self.lowercase:
+            text = text.lower()
+        tokens = [t for t in self.token_pattern.findall(text) if t not in self.stop_words]
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(tokens) - n + 1):
+                yield " ".join(tokens[i:i + n])
+
+    def features(self, text):
+        counts = {}
+        vocabulary = self.vocabulary
+        for term in self.terms(text):
+            column = vocabulary.get(term)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+
+        idf = self.idf
+        weights = {}
+        for column, count in counts.items():
+            tf = 1.0 + math.log(count) if self.sublinear_tf else float(count)
+            weights[column] = tf * idf[column]
+
+        if self.norm == "l2":
+            length = math.sqrt(sum(w * w for w in weights.values()))
+        elif self.norm == "l1":
+            length = sum(abs(w) for w in weights.values())
+        else:
+            length = 0.0
+        if length:
+            weights = {column: w / length for column, w in weights.items()}
+        return weights
+
+    def decision(self, weights):
+        return [
+            intercept + sum(w * coef[column] for column, w in weights.items())
+            for coef, intercept in zip(self.coef, self.intercept)
+        ]
+
+    def predict_proba(self, texts):
+        rows = []
+        known = []
+        for text in texts:
+            weights = self.features(text)
+            scores = self.decision(weights)
+            if self.mode == "binary":
+                positive = _sigmoid(scores[0])
+                rows.append([1.0 - positive, positive])
+            elif self.mode == "ovr":
+                scores = [_sigmoid(score) for score in scores]
+                total = sum(scores)
+                rows.append([score / total for score in scores])
+            else:
+                top = max(scores)
+                scores = [math.exp(score - top) for score in scores]
+                total = sum(scores)
+                rows.append([score / total for score in scores])
+            known.append(len(weights))
+        return rows, known
+
+
+def _sigmoid(x):
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
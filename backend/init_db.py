@@ -1,21 +1,27 @@
 import os
 import mysql.connector
 
-# Database config (matching app.py)
-DB_CONFIG = {
-    "host": "127.0.0.1",
-    "user": "root",
-    "password": "",
-    "database": "ai_health" # We'll check/create this
-}
+from storage import load_config, create_storage
+
+# Database config (shared with app.py, see storage.py)
+CONFIG = load_config()
+DB_CONFIG = CONFIG["mysql"]
 
 def init_db():
     print("🚀 Initializing Database...")
+
+    # SQLite applies database/schema_sqlite.sql itself when it is opened
+    if CONFIG["backend"] == "sqlite":
+        storage = create_storage(CONFIG)
+        storage.close()
+        print(f"\n✨ SQLite database initialized at {CONFIG['sqlite_path']}")
+        return
     
     # 1. Connect to MySQL Server (no DB selected yet)
     try:
         conn = mysql.connector.connect(
             host=DB_CONFIG["host"],
+            port=DB_CONFIG["port"],
             user=DB_CONFIG["user"],
             password=DB_CONFIG["password"]
         )
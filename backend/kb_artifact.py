@@ -0,0 +1,252 @@
+import hashlib
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+
+from inference import LinearTextModel
+
+# ================= COMPILED KNOWLEDGE BASE =================
+# One binary file holding everything knowledge_base.py otherwise builds from
+# the CSVs and pickles: the training rows (with the normalized symptom text
+# the index is built on), the doctor rows of every city, the area coordinates
+# and the risk model weights. Written by build_kb.py; read at startup with
+# mmap and no pandas or sklearn.
+#
+#   header   magic, format version, payload length, sha256 of the payload
+#   payload  u32 manifest length, JSON manifest, then 8-byte aligned
+#            little-endian arrays (offsets in the manifest)
+#
+# Strings are interned into one table (u32 offsets + UTF-8 blob) and columns
+# refer to them by id, so repeated advice/risk/doctor text is stored and
+# decoded once.
+
+MAGIC = b"AIKB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHQ32s")
+NONE_ID = 0xFFFFFFFF
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, value):
+        if value is None:
+            return NONE_ID
+        value = str(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def _column(values, strings):
+    # Whole-number columns stay numbers, numeric columns with fractions (e.g.
+    # coordinates; None / NaN -> NaN) are doubles, everything else goes
+    # through the string table (None / NaN -> NONE_ID)
+    present = [v for v in values if v is not None and v == v]
+    if present and len(present) == len(values) and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "int", array("q", values)
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "float", array("d", [float(v) if v is not None else float("nan") for v in values])
+    return "str", array("I", [strings.add(v if v is not None and v == v else None) for v in values])
+
+
+# ================= WRITE =================
+# model: dict from inference parameters (classes, vocabulary, idf, coef,
+# intercept, stop_words and the analyzer settings); area_rows: the area ->
+# coordinate table (files written before it existed read back as no areas)
+def write_artifact(path, version, training_rows, doctor_rows, model, area_rows=()):
+    strings = _StringTable()
+    sections = {}
+
+    def table(prefix, rows):
+        columns = []
+        for name in (rows[0].keys() if rows else []):
+            kind, sections[f"{prefix}.{name}"] = _column([row.get(name) for row in rows], strings)
+            columns.append([name, kind])
+        return {"rows": len(rows), "columns": columns}
+
+    training = table("training", training_rows)
+    doctors = table("doctors", doctor_rows)
+    areas = table("areas", list(area_rows))
+
+    vocabulary = sorted(model["vocabulary"].items(), key=lambda item: item[1])
+    if [column for _, column in vocabulary] != list(range(len(vocabulary))):
+        raise ArtifactError("Vocabulary columns must be 0..n-1")
+    n_features = len(vocabulary)
+    sections["vocabulary"] = array("I", [strings.add(term) for term, _ in vocabulary])
+    sections["stop_words"] = array("I", [strings.add(word) for word in sorted(model["stop_words"])])
+    sections["idf"] = array("d", model["idf"])
+    sections["coef"] = array("d", [value for row in model["coef"] for value in row])
+    sections["intercept"] = array("d", model["intercept"])
+
+    encoded = [s.encode("utf-8") for s in strings.strings]
+    offsets = array("I", [0])
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw))
+    sections["string_offsets"] = offsets
+    sections["string_blob"] = array("B", b"".join(encoded))
+
+    manifest = {
+        "version": version,
+        "built_at": time.time(),
+        "training": training,
+        "doctors": doctors,
+        "areas": areas,
+        "strings": len(encoded),
+        "model": {
+            "classes": list(model["classes"]),
+            "n_features": n_features,
+            "token_pattern": model["token_pattern"],
+            "ngram_range": list(model["ngram_range"]),
+            "lowercase": model["lowercase"],
+            "sublinear_tf": model["sublinear_tf"],
+            "norm": model["norm"],
+            "mode": model["mode"]
+        },
+        "sections": {}
+    }
+
+    # Section offsets are relative to the (aligned) end of the manifest
+    names = sorted(sections)
+    layout = {}
+    position = 0
+    for name in names:
+        values = sections[name]
+        layout[name] = [position, values.typecode, len(values)]
+        position = _align(position + len(values) * values.itemsize)
+    manifest["sections"] = layout
+
+    raw_manifest = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+    data_start = _align(4 + len(raw_manifest))
+
+    payload = bytearray(data_start + position)
+    struct.pack_into("<I", payload, 0, len(raw_manifest))
+    payload[4:4 + len(raw_manifest)] = raw_manifest
+    for name in names:
+        offset = data_start + layout[name][0]
+        raw = _little_endian(sections[name]).tobytes()
+        payload[offset:offset + len(raw)] = raw
+
+    digest = hashlib.sha256(payload).digest()
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(payload), digest))
+        f.write(payload)
+    return digest.hex()
+
+
+# ================= READ =================
+class CompiledKnowledgeBase:
+    def __init__(self, version, built_at, training_rows, doctor_rows, scorer, checksum, area_rows=()):
+        self.version = version
+        self.built_at = built_at
+        self.training_rows = training_rows
+        self.doctor_rows = doctor_rows
+        self.area_rows = area_rows
+        self.scorer = scorer
+        self.checksum = checksum
+
+
+def read_artifact(path, verify=True):
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        # Everything is copied into Python objects before returning
+        return _read(memoryview(mapped), verify)
+    finally:
+        try:
+            mapped.close()
+        except BufferError:
+            pass  # views held by a traceback; unmapped when they are collected
+
+
+def _read(view, verify):
+    if len(view) < HEADER.size:
+        raise ArtifactError("Truncated knowledge base artifact")
+    magic, format_version, _, payload_length, digest = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ArtifactError("Not a knowledge base artifact")
+    if format_version != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact format {format_version} (expected {FORMAT_VERSION})")
+
+    payload = view[HEADER.size:HEADER.size + payload_length]
+    if len(payload) != payload_length:
+        raise ArtifactError("Truncated knowledge base artifact")
+    if verify and hashlib.sha256(payload).digest() != digest:
+        raise ArtifactError("Knowledge base artifact checksum mismatch")
+
+    manifest_length = struct.unpack_from("<I", payload, 0)[0]
+    manifest = json.loads(bytes(payload[4:4 + manifest_length]))
+    data = payload[_align(4 + manifest_length):]
+
+    def section(name):
+        offset, typecode, count = manifest["sections"][name]
+        itemsize = array(typecode).itemsize
+        raw = data[offset:offset + count * itemsize]
+        if sys.byteorder == "big":
+            values = array(typecode, bytes(raw))
+            values.byteswap()
+            return values
+        return raw.cast(typecode)
+
+    offsets = section("string_offsets")
+    blob = bytes(section("string_blob"))
+    strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(manifest["strings"])]
+
+    def resolve(string_id):
+        return None if string_id == NONE_ID else strings[string_id]
+
+    def rows(prefix):
+        spec = manifest[prefix]
+        columns = []
+        for name, kind in spec["columns"]:
+            values = section(f"{prefix}.{name}")
+            columns.append((name, values.tolist() if kind in ("int", "float") else [resolve(i) for i in values]))
+        return [
+            {name: values[i] for name, values in columns}
+            for i in range(spec["rows"])
+        ]
+
+    meta = manifest["model"]
+    n_features = meta["n_features"]
+    coef = section("coef").tolist()
+    scorer = LinearTextModel(
+        classes=meta["classes"],
+        vocabulary={strings[string_id]: column for column, string_id in enumerate(section("vocabulary"))},
+        idf=section("idf").tolist(),
+        coef=[coef[i:i + n_features] for i in range(0, len(coef), n_features)],
+        intercept=section("intercept").tolist(),
+        stop_words=[strings[string_id] for string_id in section("stop_words")],
+        token_pattern=meta["token_pattern"],
+        ngram_range=meta["ngram_range"],
+        lowercase=meta["lowercase"],
+        sublinear_tf=meta["sublinear_tf"],
+        norm=meta["norm"],
+        mode=meta["mode"]
+    )
+
+    return CompiledKnowledgeBase(
+        manifest["version"], manifest["built_at"], rows("training"), rows("doctors"), scorer, digest.hex(),
+        area_rows=rows("areas") if "areas" in manifest else []
+    )
@@ -0,0 +1,327 @@
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+from fuzzy_index import FuzzyIndex
+from symptom_index import SymptomIndex
+from doctor_directory import DoctorDirectory
+from result_cache import normalize_text
+from inference import SklearnScorer, check_pair
+from kb_artifact import ArtifactError, read_artifact
+
+# ================= KNOWLEDGE BASE =================
+# Everything /triage and /recommend read from disk, built into one immutable
+# object: the risk model, the training rows with their symptom index and the
+# doctor directory. `version` is a fingerprint of the source files and ends
+# up in cache keys, responses and /stats.
+#
+# Loaded from the compiled artifact (build_kb.py) when there is one that is
+# not older than the sources; that path needs neither pandas nor sklearn.
+# Otherwise the CSVs and pickles are read directly, importing pandas and
+# sklearn on first use.
+
+SOURCE_FILES = {
+    "model": "risk_model.pkl",
+    "vectorizer": "vectorizer.pkl",
+    "training": "training_data.csv",
+    "doctors": "doctors_ahmedabad.csv"
+}
+COMPILED_FILE = "knowledge_base.kb"
+# Written last by train_model.py's promote(), naming the model and vectorizer
+# it put in place by digest (optional: hand-placed pickles have none)
+MODEL_MANIFEST = "model_metadata.json"
+# Cities load side by side: every doctors_<city>.csv next to the sources is
+# part of the directory, and areas_<city>.csv (area, lat, lon) places that
+# city's areas for location-aware search
+CITY_FILE_KINDS = ("doctors", "areas")
+
+
+# One training phrase. Risk, doctor and advice repeat across many rows, so
+# they are interned and shared; `doctor_title` is the form the API shows.
+class TriageRecord:
+    __slots__ = ("text", "normalized", "severity", "risk", "doctor", "doctor_title", "advice")
+
+    def __init__(self, row):
+        self.text = row["text"]
+        self.normalized = row["normalized"]
+        self.severity = _int_or_none(row["severity_score"])
+        self.risk = _intern(row["risk"])
+        self.doctor = _intern(row["doctor"])
+        self.doctor_title = _intern(self.doctor.title() if self.doctor else self.doctor)
+        self.advice = _intern(row["advice"])
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Only the records and indexes stay resident; the row dicts (and, on the
+# sources path, the DataFrames) are dropped once these are built
+class KnowledgeBase:
+    def __init__(self, version, scorer, training_rows, doctor_rows, specialization_map, source,
+                 fuzzy_max_distance=2, area_rows=()):
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+        self.scorer = scorer
+        self.training_records = tuple(TriageRecord(row) for row in training_rows)
+
+        phrases = [record.normalized for record in self.training_records]
+        self.symptom_index = SymptomIndex(phrases)
+        self.fuzzy_index = FuzzyIndex(phrases, max_distance=fuzzy_max_distance)
+        self.doctor_directory = DoctorDirectory(doctor_rows, specialization_map, area_rows=area_rows)
+
+
+def city_of(filename):
+    return filename.split("_", 1)[1].rsplit(".", 1)[0].replace("_", " ").lower()
+
+
+# SOURCE_FILES plus "doctors:<city>" / "areas:<city>" for the city files
+# present right now (listed again on every watcher check)
+def source_paths(artifact_dir):
+    paths = {key: os.path.join(artifact_dir, name) for key, name in SOURCE_FILES.items()}
+    try:
+        names = sorted(os.listdir(artifact_dir))
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        kind = name.split("_", 1)[0]
+        if kind in CITY_FILE_KINDS and "_" in name and name.endswith(".csv") and name != SOURCE_FILES["doctors"]:
+            paths[f"{kind}:{city_of(name)}"] = os.path.join(artifact_dir, name)
+    if MODEL_MANIFEST in names:
+        paths["manifest"] = os.path.join(artifact_dir, MODEL_MANIFEST)
+    return paths
+
+
+def artifact_paths(artifact_dir):
+    paths = source_paths(artifact_dir)
+    paths["compiled"] = os.path.join(artifact_dir, COMPILED_FILE)
+    return paths
+
+
+# Cheap change detector for the watcher (no file reads)
+def artifact_signature(paths):
+    signature = []
+    for key in sorted(paths):
+        try:
+            stat = os.stat(paths[key])
+        except FileNotFoundError:
+            signature.append((key, None, None))
+            continue
+        signature.append((key, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def artifact_fingerprint(paths):
+    digest = hashlib.sha1()
+    for key in sorted(paths):
+        with open(paths[key], "rb") as f:
+            digest.update(hashlib.sha1(f.read()).digest())
+    return digest.hexdigest()[:12]
+
+
+# ================= SOURCES =================
+# Rows as plain dicts; `normalized` is the symptom text in the form requests
+# are looked up in
+def read_sources(artifact_dir):
+    import joblib
+    import pandas as pd
+
+    paths = source_paths(artifact_dir)
+    version = artifact_fingerprint(paths)
+
+    pickles = {}
+    for key in ("model", "vectorizer"):
+        with open(paths[key], "rb") as f:
+            pickles[key] = f.read()
+    check_manifest(paths, pickles)
+    model = joblib.load(io.BytesIO(pickles["model"]))
+    vectorizer = joblib.load(io.BytesIO(pickles["vectorizer"]))
+    # Also guards build_kb.py from compiling a mismatched pair
+    check_pair(model, vectorizer)
+
+    training_data = pd.read_csv(paths["training"], encoding="latin1")
+    training_data["text"] = training_data["text"].str.lower().str.strip()
+    training_data["doctor"] = training_data["doctor"].str.lower().str.strip()
+    training_data["risk"] = training_data["risk"].str.strip()
+    training_data["normalized"] = [
+        normalize_text(text) if isinstance(text, str) else None for text in training_data["text"]
+    ]
+
+    # The primary city first, then the others in name order
+    doctor_frames = []
+    area_rows = []
+    for key in sorted(paths):
+        kind = key.split(":", 1)[0]
+        if kind == "doctors":
+            frame = pd.read_csv(paths[key], encoding="latin1")
+            frame["city"] = city_of(os.path.basename(paths[key]))
+            doctor_frames.append(frame)
+        elif kind == "areas":
+            areas = pd.read_csv(paths[key], encoding="latin1")
+            areas.columns = areas.columns.str.strip().str.lower()
+            city = city_of(os.path.basename(paths[key]))
+            for area, lat, lon in zip(areas["area"], areas["lat"], areas["lon"]):
+                if isinstance(area, str) and area.strip() and lat == lat and lon == lon:
+                    area_rows.append({"city": city, "area": area.strip(), "lat": float(lat), "lon": float(lon)})
+
+    doctors_data = pd.concat(doctor_frames, ignore_index=True)
+    doctors_data["specialization"] = doctors_data["specialization"].str.lower().str.strip()
+
+    training_rows = training_data.astype(object).where(training_data.notna(), None).to_dict("records")
+    doctor_rows = doctors_data.astype(object).where(doctors_data.notna(), None).to_dict("records")
+    return version, model, vectorizer, training_rows, doctor_rows, area_rows
+
+
+# promote() renames the two pickles into place one at a time and the manifest
+# last, so a reload between the renames (or before the manifest lands) sees
+# a pair the manifest does not name. It fails, the active version keeps
+# serving, and the next check picks up the finished promotion.
+def check_manifest(paths, pickles):
+    if "manifest" not in paths:
+        return
+    with open(paths["manifest"]) as f:
+        files = json.load(f).get("files") or {}
+    for key, data in pickles.items():
+        name = SOURCE_FILES[key]
+        if name in files and hashlib.sha1(data).hexdigest() != files[name]:
+            raise ValueError(f"{name} does not match {MODEL_MANIFEST} (promotion in progress, or remove the manifest)")
+
+
+def compiled_is_current(paths):
+    try:
+        compiled = os.stat(paths["compiled"]).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    for key in paths:
+        if key == "compiled":
+            continue
+        try:
+            if os.stat(paths[key]).st_mtime_ns > compiled:
+                print(f"⚠️ {paths[key]} is newer than {COMPILED_FILE}; loading the sources (re-run build_kb.py)")
+                return False
+        except FileNotFoundError:
+            continue  # deployments may ship only the compiled file
+    return True
+
+
+def load_knowledge_base(artifact_dir, specialization_map, fuzzy_max_distance=2):
+    paths = artifact_paths(artifact_dir)
+
+    if compiled_is_current(paths):
+        try:
+            compiled = read_artifact(paths["compiled"])
+        except (ArtifactError, OSError, ValueError) as e:
+            print(f"ERROR: Could not read {COMPILED_FILE}, loading the sources instead: {e}")
+        else:
+            return KnowledgeBase(
+                compiled.version, compiled.scorer, compiled.training_rows, compiled.doctor_rows,
+                specialization_map, source="compiled", fuzzy_max_distance=fuzzy_max_distance,
+                area_rows=compiled.area_rows
+            )
+
+    version, model, vectorizer, training_rows, doctor_rows, area_rows = read_sources(artifact_dir)
+    return KnowledgeBase(
+        version, SklearnScorer(model, vectorizer), training_rows, doctor_rows,
+        specialization_map, source="sources", fuzzy_max_distance=fuzzy_max_distance, area_rows=area_rows
+    )
+
+
+# ================= ARTIFACT REGISTRY =================
+# Holds the active KnowledgeBase. A reload builds the replacement on the
+# calling thread (admin request or watcher), away from the request path, then
+# swaps `current` in one assignment. Requests read `current` once and keep
+# that object, so in-flight work finishes on the version it started with. A
+# failed build leaves the active version in place.
+class ArtifactRegistry:
+    def __init__(self, artifact_dir, specialization_map, fuzzy_max_distance=2):
+        self.artifact_dir = artifact_dir
+        self.specialization_map = specialization_map
+        self.fuzzy_max_distance = fuzzy_max_distance
+        self.paths = artifact_paths(artifact_dir)
+
+        self._build_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.build_ms = 0.0
+
+        self._signature = artifact_signature(self.paths)
+        self.current = self._build()
+
+    def _build(self):
+        started = time.perf_counter()
+        kb = load_knowledge_base(self.artifact_dir, self.specialization_map, self.fuzzy_max_distance)
+        self.build_ms = round((time.perf_counter() - started) * 1000.0, 3)
+        print(f"✅ Knowledge base {kb.version} loaded from {kb.source} in {self.build_ms} ms "
+              f"({len(kb.symptom_index)} phrases, {len(kb.doctor_directory)} doctors)")
+        return kb
+
+    def reload(self, force=False):
+        with self._build_lock:
+            try:
+                # Re-listed so a newly added city file counts as a change
+                self.paths = artifact_paths(self.artifact_dir)
+                signature = artifact_signature(self.paths)
+                if not force and signature == self._signature:
+                    return False
+                kb = self._build()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"ERROR: Knowledge base reload failed, keeping {self.current.version}: {e}")
+                raise
+
+            self._signature = signature
+            changed = kb.version != self.current.version
+            if changed:
+                self.current = kb
+                self.reloads += 1
+            self.last_error = None
+            return changed
+
+    # ================= WATCHER =================
+    def watch(self, interval_seconds):
+        if interval_seconds <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval_seconds,), name="artifact-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self, interval_seconds):
+        while not self._stop.wait(interval_seconds):
+            try:
+                self.reload()
+            except Exception:
+                pass  # already counted and logged; try again next round
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        kb = self.current
+        return {
+            "version": kb.version,
+            "source": kb.source,
+            "loaded_at": kb.loaded_at,
+            "build_ms": self.build_ms,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "watching": self._watcher is not None
+        }
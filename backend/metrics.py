@@ -0,0 +1,264 @@
+import bisect
+import math
+import threading
+import time
+from array import array
+
+from werkzeug.wsgi import ClosingIterator
+
+# ================= METRICS =================
+# Prometheus text-format metrics that are cheap enough to leave on. Every
+# metric keeps one small array per thread that touches it: recording is an
+# in-place add on the calling thread's own array (no lock, no new objects),
+# and a scrape sums the arrays. Arrays of threads that have exited are folded
+# into a base array so thread-per-request servers don't grow the list.
+#
+#   registry = MetricsRegistry()
+#   requests = registry.counter("http_requests_total", "Requests", ["route"])
+#   requests.labels("/triage").inc()
+#   registry.render()   # -> text for GET /metrics
+#
+# Labelled children are created once per label combination; hold on to the
+# child where the labels are fixed.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cache hits (sub-ms) up to paced streams (seconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Shards:
+    def __init__(self, width):
+        self.width = width
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []                   # [(thread, array)]
+        self._base = array("d", [0.0] * width)
+
+    def mine(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = array("d", [0.0] * self.width)
+            with self._lock:
+                if len(self._shards) >= 32:
+                    self._fold_dead()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+            return shard
+
+    def _fold_dead(self):
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for i, value in enumerate(shard):
+                    self._base[i] += value
+        self._shards = alive
+
+    def totals(self):
+        with self._lock:
+            self._fold_dead()
+            totals = list(self._base)
+            for _, shard in self._shards:
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return totals
+
+
+class Counter:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1.0):
+        self._shards.mine()[0] += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self._shards.totals()[0])]
+
+
+class Gauge:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1.0):
+        self._shards.mine()[0] += amount
+
+    def dec(self, amount=1.0):
+        self._shards.mine()[0] -= amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self._shards.totals()[0])]
+
+
+# Per-thread layout: one slot per bucket (+Inf last), then the sum
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        self._shards = _Shards(len(self.bounds) + 2)
+        self._sum_slot = len(self.bounds) + 1
+
+    def observe(self, value):
+        shard = self._shards.mine()
+        shard[bisect.bisect_left(self.bounds, value)] += 1
+        shard[self._sum_slot] += value
+
+    def samples(self, name, labels):
+        totals = self._shards.totals()
+        out = []
+        cumulative = 0.0
+        for bound, count in zip(self.bounds + (math.inf,), totals):
+            cumulative += count
+            out.append((name + "_bucket", labels + (("le", _format_bound(bound)),), cumulative))
+        out.append((name + "_sum", labels, totals[self._sum_slot]))
+        out.append((name + "_count", labels, cumulative))
+        return out
+
+
+class Family:
+    def __init__(self, name, help_text, kind, labelnames, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = factory()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._factory()
+        return child
+
+    # Unlabelled families act as their only child
+    def inc(self, amount=1.0):
+        self._children[()].inc(amount)
+
+    def dec(self, amount=1.0):
+        self._children[()].dec(amount)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def samples(self):
+        out = []
+        for values, child in sorted(self._children.items()):
+            out.extend(child.samples(self.name, tuple(zip(self.labelnames, values))))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families = []
+        self._collectors = []
+
+    def _add(self, family):
+        self._families.append(family)
+        return family
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Family(name, help_text, "counter", labelnames, Counter))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Family(name, help_text, "gauge", labelnames, Gauge))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Family(name, help_text, "histogram", labelnames, lambda: Histogram(buckets)))
+
+    # collect() -> [(name, kind, help, [(labels dict, value)])], called at
+    # scrape time; for values that already live elsewhere (e.g. stats())
+    def add_collector(self, collect):
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for family in self._families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collect in self._collectors:
+            try:
+                collected = collect()
+            except Exception as e:
+                print(f"ERROR: Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in collected:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels.items()))} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# ================= WSGI =================
+# Times each request until its response body is closed, so streamed
+# responses count their full length. The app puts the matched route in
+# environ[ROUTE_KEY] (and bumps in_flight for it) once routing is done;
+# requests that never get that far are labelled "unmatched".
+ROUTE_KEY = "metrics.route"
+
+
+class RequestMetrics:
+    def __init__(self, wsgi_app, requests, seconds, in_flight):
+        self.wsgi_app = wsgi_app
+        self.requests = requests
+        self.seconds = seconds
+        self.in_flight = in_flight
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        status = ["500"]
+
+        def recording_start_response(status_line, headers, exc_info=None):
+            status[0] = status_line.split(" ", 1)[0]
+            return start_response(status_line, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, recording_start_response)
+        except BaseException:
+            self._record(environ, started, status[0])
+            raise
+        return ClosingIterator(body, lambda: self._record(environ, started, status[0]))
+
+    def _record(self, environ, started, status):
+        route = environ.get(ROUTE_KEY)
+        method = environ.get("REQUEST_METHOD", "")
+        if route is None:
+            route = "unmatched"
+        else:
+            self.in_flight.labels(route).dec()
+        self.seconds.labels(route, method).observe(time.perf_counter() - started)
+        self.requests.labels(route, method, status).inc()
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    value = float(value)
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
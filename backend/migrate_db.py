@@ -1,42 +1,69 @@
-import mysql.connector
+from storage import create_storage
 
-def migrate_db():
+def add_column(storage, table, column, definition):
+    print(f"Adding '{column}' column...")
     try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",
-            database="ai_health"
-        )
-        cursor = conn.cursor()
-        
-        print("Adding 'age' column...")
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN age INT")
-            print("✅ Added 'age' column.")
-        except mysql.connector.Error as err:
-            if "Duplicate column name" in str(err):
-                print("⚠️ 'age' column already exists.")
-            else:
-                print(f"❌ Failed to add 'age': {err}")
+        storage.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        print(f"✅ Added '{column}' column.")
+    except Exception as err:
+        if "duplicate column" in str(err).lower():
+            print(f"⚠️ '{column}' column already exists.")
+        else:
+            print(f"❌ Failed to add '{column}': {err}")
 
-        print("Adding 'gender' column...")
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN gender VARCHAR(20)")
-            print("✅ Added 'gender' column.")
-        except mysql.connector.Error as err:
-            if "Duplicate column name" in str(err):
-                print("⚠️ 'gender' column already exists.")
-            else:
-                print(f"❌ Failed to add 'gender': {err}")
+def add_index(storage, table, name, columns):
+    print(f"Adding '{name}' index...")
+    try:
+        storage.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+        print(f"✅ Added '{name}' index.")
+    except Exception as err:
+        if "duplicate key name" in str(err).lower() or "already exists" in str(err).lower():
+            print(f"⚠️ '{name}' index already exists.")
+        else:
+            print(f"❌ Failed to add '{name}': {err}")
 
-        conn.commit()
-        cursor.close()
-        conn.close()
-        print("Migration complete.")
+def create_table(storage, name, definition):
+    print(f"Creating '{name}' table...")
+    try:
+        storage.execute(f"CREATE TABLE IF NOT EXISTS {name} ({definition})")
+        print(f"✅ '{name}' table ready.")
+    except Exception as err:
+        print(f"❌ Failed to create '{name}': {err}")
 
-    except mysql.connector.Error as err:
+def migrate_db():
+    try:
+        storage = create_storage()
+        storage.ping()
+    except Exception as err:
         print(f"Database connection failed: {err}")
+        return
+
+    add_column(storage, "users", "age", "INT")
+    add_column(storage, "users", "gender", "VARCHAR(20)")
+    add_index(storage, "history", "idx_history_user_created", "user_id, created_at, id")
+    # Fill it afterwards with backfill_rollups.py
+    create_table(storage, "triage_rollups", """
+        granularity VARCHAR(8) NOT NULL,
+        bucket_start DATETIME NOT NULL,
+        dimension VARCHAR(16) NOT NULL,
+        label VARCHAR(255) NOT NULL,
+        total INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket_start, dimension, label)
+    """)
+    create_table(storage, "vitals", """
+        user_id INT NOT NULL,
+        bucket_start DATETIME NOT NULL,
+        heart_rate FLOAT,
+        temperature FLOAT,
+        systolic FLOAT,
+        diastolic FLOAT,
+        oxygen_level FLOAT,
+        samples INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, bucket_start)
+    """)
+
+    storage.close()
+    print("Migration complete.")
 
 if __name__ == "__main__":
     migrate_db()
@@ -0,0 +1,108 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# ================= PASSWORD HASHER =================
+# Password hashing is deliberately slow, so /signup and /login hand it to a
+# small process pool instead of burning the request thread (and the GIL)
+# that /triage and /queue need. At most `max_pending` hashes are queued or
+# running; beyond that callers get HasherBusy straight away rather than
+# piling up behind a login burst. A hash not done within `timeout` seconds
+# raises HasherBusy too.
+#
+# `method` is a werkzeug method string and carries the cost, e.g.
+# "scrypt:32768:8:1" or "pbkdf2:sha256:600000". Hashes made with any other
+# method verify as before and report needs_rehash(), so raising the cost
+# upgrades each account at its next login.
+#
+# workers=0 hashes inline on the calling thread.
+
+
+class HasherBusy(Exception):
+    pass
+
+
+# Fork (where available) so workers don't re-import the app's entrypoint
+def _start_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+
+class PasswordHasher:
+    def __init__(self, method="scrypt:32768:8:1", workers=2, max_pending=16, timeout=30.0):
+        self.method = method
+        self.workers = max(0, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._prefix = None
+
+        self._hashed = 0
+        self._verified = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    def start(self):
+        if not self.workers or self._pool is not None:
+            return
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_start_context())
+                # Launch the workers now, before the app starts its own threads
+                self._pool.submit(int).result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._rejected += 1
+            raise HasherBusy("Too many password hashes in flight")
+        try:
+            if not self.workers:
+                return fn(*args)
+            self.start()
+            future = self._pool.submit(fn, *args)
+            try:
+                return future.result(self.timeout)
+            except FutureTimeout:
+                # Drop it if it hasn't started; a running one finishes unread
+                future.cancel()
+                self._timeouts += 1
+                raise HasherBusy(f"Password hash took over {self.timeout}s")
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        password_hash = self._run(generate_password_hash, password, self.method)
+        self._hashed += 1
+        return password_hash
+
+    def verify(self, password_hash, password):
+        valid = self._run(check_password_hash, password_hash, password)
+        self._verified += 1
+        return valid
+
+    # Werkzeug stores "<method>$<salt>$<hash>" with the defaults filled in,
+    # so compare against what the configured method actually produces
+    def needs_rehash(self, password_hash):
+        if self._prefix is None:
+            self._prefix = self._run(generate_password_hash, "", self.method).split("$", 1)[0]
+        return password_hash.split("$", 1)[0] != self._prefix
+
+    def stats(self):
+        return {
+            "method": self.method,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "hashed": self._hashed,
+            "verified": self._verified,
+            "rejected": self._rejected,
+            "timeouts": self._timeouts
+        }
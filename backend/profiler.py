@@ -0,0 +1,287 @@
+import contextvars
+import itertools
+import random
+import threading
+import time
+from collections import deque
+
+# ================= REQUEST PROFILER =================
+# Opt-in span timings for individual requests, for finding where the time
+# went when p99 spikes. Off by default; switched at runtime with
+# configure() (POST /admin/profiling):
+#
+#   sample_rate  fraction of requests to keep (0.01 = 1 in 100)
+#   slow_ms      also keep any request that takes at least this long
+#
+# While either is set, each request records its spans (a list append each);
+# it is kept if it was sampled or turned out slow. Kept profiles go into a
+# ring buffer of `capacity` and are exported as Chrome Trace Event JSON,
+# which chrome://tracing, Perfetto and speedscope all open.
+#
+#   with profiler.span("symptom_match"):
+#       ...
+#   profiler.record("SQL SELECT history", seconds)   # already timed elsewhere
+#
+# The current profile lives in a context variable, so spans recorded from
+# asyncio.to_thread() land in the request that started the work, and
+# background threads (history writer, batcher) record nothing.
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class Profile:
+    __slots__ = (
+        "id", "method", "path", "sampled", "started", "started_wall",
+        "spans", "first_chunk", "ended", "status"
+    )
+
+    def __init__(self, profile_id, method, path, sampled):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.spans = []                     # [(name, start, seconds, args)]
+        self.first_chunk = None
+        self.ended = None
+        self.status = None
+
+    @property
+    def seconds(self):
+        return (self.ended or time.perf_counter()) - self.started
+
+    def chunk_sent(self):
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter()
+
+
+class _Span:
+    __slots__ = ("profile", "name", "args", "started")
+
+    def __init__(self, profile, name, args):
+        self.profile = profile
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        args = self.args
+        if exc_type is not None:
+            args = dict(args or {}, error=exc_type.__name__)
+        self.profile.spans.append((self.name, self.started, time.perf_counter() - self.started, args))
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Profiler:
+    def __init__(self, sample_rate=0.0, slow_ms=0.0, capacity=200):
+        self.sample_rate = 0.0
+        self.slow_ms = 0.0
+        self._lock = threading.Lock()
+        self._profiles = deque(maxlen=max(1, int(capacity)))
+        self._ids = itertools.count(1)
+
+        self._started = 0
+        self._captured = 0
+        self.configure(sample_rate=sample_rate, slow_ms=slow_ms)
+
+    @property
+    def active(self):
+        return self.sample_rate > 0 or self.slow_ms > 0
+
+    def configure(self, sample_rate=None, slow_ms=None, capacity=None):
+        if sample_rate is not None:
+            sample_rate = float(sample_rate)
+            if not 0.0 <= sample_rate <= 1.0:
+                raise ValueError("sample_rate must be between 0 and 1")
+            self.sample_rate = sample_rate
+        if slow_ms is not None:
+            slow_ms = float(slow_ms)
+            if slow_ms < 0:
+                raise ValueError("slow_ms must not be negative")
+            self.slow_ms = slow_ms
+        if capacity is not None:
+            capacity = int(capacity)
+            if capacity < 1:
+                raise ValueError("capacity must be at least 1")
+            with self._lock:
+                self._profiles = deque(self._profiles, maxlen=capacity)
+
+    # ================= REQUEST LIFECYCLE =================
+    # begin() returns None when this request isn't being profiled
+    def begin(self, method, path):
+        if not self.active:
+            return None
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and self.slow_ms <= 0:
+            return None
+
+        profile = Profile(next(self._ids), method, path, sampled)
+        self._started += 1
+        _current.set(profile)
+        return profile
+
+    def finish(self, profile, status=None):
+        if profile.ended is not None:
+            return
+        profile.ended = time.perf_counter()
+        profile.status = status
+        if _current.get() is profile:
+            _current.set(None)
+
+        if profile.sampled or (self.slow_ms > 0 and profile.seconds * 1000.0 >= self.slow_ms):
+            with self._lock:
+                self._profiles.append(profile)
+            self._captured += 1
+
+    # ================= SPANS =================
+    def span(self, name, **args):
+        profile = _current.get()
+        if profile is None:
+            return _NO_SPAN
+        return _Span(profile, name, args or None)
+
+    # For work timed by someone else that just finished (e.g. SQL statements)
+    def record(self, name, seconds, **args):
+        profile = _current.get()
+        if profile is not None:
+            profile.spans.append((name, time.perf_counter() - seconds, seconds, args or None))
+
+    # ================= BUFFER =================
+    def profiles(self):
+        with self._lock:
+            return list(self._profiles)
+
+    def clear(self):
+        with self._lock:
+            cleared = len(self._profiles)
+            self._profiles.clear()
+        return cleared
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "capacity": self._profiles.maxlen,
+            "buffered": len(self._profiles),
+            "profiled": self._started,
+            "captured": self._captured
+        }
+
+
+# ================= CHROME TRACE EXPORT =================
+# Trace Event Format: one "thread" row per request, holding the request as a
+# complete ("X") event with its spans nested inside by time. Timestamps are
+# wall-clock microseconds so rows from different requests line up.
+def chrome_trace(profiles, process_name="ai-triage-backend"):
+    events = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": process_name}}]
+
+    for profile in profiles:
+        def ts(at):
+            return (profile.started_wall + (at - profile.started)) * 1e6
+
+        label = f"{profile.method} {profile.path}"
+        ended = profile.ended or time.perf_counter()
+        request_args = {
+            "status": profile.status,
+            "reason": "sampled" if profile.sampled else "slow",
+            "total_ms": round((ended - profile.started) * 1000.0, 3)
+        }
+
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": profile.id, "args": {"name": f"#{profile.id} {label}"}})
+        events.append({
+            "name": label, "cat": "request", "ph": "X", "pid": 1, "tid": profile.id,
+            "ts": ts(profile.started), "dur": (ended - profile.started) * 1e6, "args": request_args
+        })
+
+        # Time to first chunk vs the rest of the body (the paced stream)
+        if profile.first_chunk is not None:
+            request_args["first_chunk_ms"] = round((profile.first_chunk - profile.started) * 1000.0, 3)
+            request_args["stream_ms"] = round((ended - profile.first_chunk) * 1000.0, 3)
+            events.append({
+                "name": "time_to_first_chunk", "cat": "response", "ph": "X", "pid": 1, "tid": profile.id,
+                "ts": ts(profile.started), "dur": (profile.first_chunk - profile.started) * 1e6
+            })
+            events.append({
+                "name": "stream", "cat": "response", "ph": "X", "pid": 1, "tid": profile.id,
+                "ts": ts(profile.first_chunk), "dur": (ended - profile.first_chunk) * 1e6
+            })
+
+        for name, started, seconds, args in profile.spans:
+            event = {
+                "name": name, "cat": "sql" if name.startswith("SQL ") else "span", "ph": "X",
+                "pid": 1, "tid": profile.id, "ts": ts(started), "dur": seconds * 1e6
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+# ================= WSGI =================
+# Starts a profile per request (when the profiler is active) and finishes it
+# when the response body is closed, noting when the first chunk went out.
+class ProfileMiddleware:
+    def __init__(self, wsgi_app, profiler):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        if not self.profiler.active:
+            return self.wsgi_app(environ, start_response)
+
+        profile = self.profiler.begin(environ.get("REQUEST_METHOD", ""), environ.get("PATH_INFO", ""))
+        if profile is None:
+            return self.wsgi_app(environ, start_response)
+
+        def recording_start_response(status_line, headers, exc_info=None):
+            profile.status = int(status_line.split(" ", 1)[0])
+            return start_response(status_line, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, recording_start_response)
+        except BaseException:
+            self.profiler.finish(profile, 500)
+            raise
+        return _ProfiledBody(body, self.profiler, profile)
+
+
+class _ProfiledBody:
+    def __init__(self, body, profiler, profile):
+        self.body = body
+        self.chunks = iter(body)
+        self.profiler = profiler
+        self.profile = profile
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        chunk = next(self.chunks)
+        if chunk:
+            self.profile.chunk_sent()
+        return chunk
+
+    def close(self):
+        try:
+            close = getattr(self.body, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self.profiler.finish(self.profile, self.profile.status)
@@ -0,0 +1,180 @@
+import asyncio
+import math
+from urllib.parse import parse_qs
+
+# ================= QUEUE FEED =================
+# Push side of the staff queue for the ASGI entrypoint. One broadcaster per
+# process listens to the TriageQueue and wakes every waiting subscriber
+# through a single shared future, so an idle dashboard costs one suspended
+# coroutine rather than a thread. Subscribers then read what changed with
+# TriageQueue.changes_since and send only that.
+#
+#   GET /queue/stream?since=<version>&generation=<gen>   Server-Sent Events
+#   GET /queue/changes?since=<version>&generation=<gen>&timeout=25   long-poll
+
+
+class QueueBroadcaster:
+    def __init__(self, queue, render, heartbeat_seconds=15.0, long_poll_max_seconds=30.0):
+        self.queue = queue
+        self.render = render
+        self.heartbeat_seconds = heartbeat_seconds
+        self.long_poll_max_seconds = long_poll_max_seconds
+        self.subscribers = 0
+
+        self._loop = None
+        self._changed = None
+        self._resync_task = None
+
+    def start(self, loop):
+        if self._loop is not None:
+            return
+        self._loop = loop
+        self._changed = loop.create_future()
+        self.queue.add_listener(self._on_change)
+
+    # Runs on whatever thread changed the queue (usually the history writer)
+    def _on_change(self, version):
+        self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        changed, self._changed = self._changed, self._loop.create_future()
+        if not changed.done():
+            changed.set_result(None)
+
+    def next_change(self):
+        return asyncio.shield(self._changed)
+
+    # Other processes' rows only arrive through a resync, so keep resyncing
+    # while anyone is listening (TriageQueue rate-limits the actual reload)
+    async def _resync_loop(self):
+        interval = self.queue.resync_seconds
+        while self.subscribers and interval:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.queue.ensure_fresh)
+            except Exception as e:
+                print(f"ERROR: Queue resync failed: {e}")
+        self._resync_task = None
+
+    def _subscribe(self):
+        self.start(asyncio.get_running_loop())
+        self.subscribers += 1
+        if self._resync_task is None:
+            self._resync_task = asyncio.ensure_future(self._resync_loop())
+
+    def _unsubscribe(self):
+        self.subscribers -= 1
+
+    # ================= SSE =================
+    async def stream(self, scope, receive, send):
+        since, generation = _position(scope)
+        await asyncio.to_thread(self.queue.ensure_fresh)
+        self._subscribe()
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"access-control-allow-origin", b"*"),
+                (b"x-accel-buffering", b"no")
+            ]
+        })
+
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            while not disconnected.done():
+                changes = self.queue.changes_since(since, generation)
+                if changes is not None:
+                    since, generation = changes["version"], changes["generation"]
+                    event = (
+                        f"event: queue\nid: {generation}-{since}\n"
+                        f"data: {self.render(changes)}\n\n"
+                    )
+                    await send({"type": "http.response.body", "body": event.encode(), "more_body": True})
+                    continue
+
+                done, _ = await asyncio.wait(
+                    {self.next_change(), disconnected},
+                    timeout=self.heartbeat_seconds,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Comment line keeps proxies from closing an idle stream
+                    await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+        finally:
+            disconnected.cancel()
+            self._unsubscribe()
+
+    # ================= LONG POLL =================
+    async def long_poll(self, scope, receive, send):
+        since, generation = _position(scope)
+        try:
+            timeout = float(_query(scope).get("timeout", 25))
+        except ValueError:
+            timeout = 25.0
+        if not math.isfinite(timeout):
+            timeout = 25.0
+        timeout = max(0.0, min(timeout, self.long_poll_max_seconds))
+
+        await asyncio.to_thread(self.queue.ensure_fresh)
+        self._subscribe()
+        try:
+            changes = self.queue.changes_since(since, generation)
+            if changes is None and timeout:
+                disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+                try:
+                    await asyncio.wait(
+                        {self.next_change(), disconnected},
+                        timeout=timeout,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    disconnected.cancel()
+                changes = self.queue.changes_since(since, generation)
+        finally:
+            self._unsubscribe()
+
+        if changes is None:
+            await _respond(send, 204, b"")
+        else:
+            await _respond(send, 200, self.render(changes).encode(), b"application/json")
+
+
+def _query(scope):
+    return {key: values[-1] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+
+
+# Position from ?since=&generation= or, on an EventSource reconnect, from the
+# Last-Event-ID header ("<generation>-<version>")
+def _position(scope):
+    query = _query(scope)
+    since, generation = query.get("since"), query.get("generation")
+    for name, value in scope.get("headers", []):
+        if name == b"last-event-id" and value:
+            generation, _, since = value.decode().rpartition("-")
+    try:
+        return int(since), generation or None
+    except (TypeError, ValueError):
+        return None, None
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _respond(send, status, body, content_type=b"text/plain"):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"cache-control", b"no-cache"),
+            (b"access-control-allow-origin", b"*")
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
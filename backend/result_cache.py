@@ -0,0 +1,126 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# ================= RESULT CACHE =================
+# Bounded LRU + TTL cache for resolved /triage and /recommend results. Keys
+# include the loaded dataset version, so results computed from older data are
+# never served after a reload. Concurrent misses on the same key are
+# coalesced: the first caller computes and everyone else waits for its result.
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r"\s+")
+
+
+# "  Chest-Pain!! " and "chest pain" share a cache entry (and a lookup)
+def normalize_text(text):
+    text = _NON_WORD.sub(" ", str(text).lower())
+    return _SPACES.sub(" ", text).strip(" '")
+
+
+class ResultCache:
+    def __init__(self, max_entries=10000, ttl_seconds=300):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self.enabled = self.max_entries > 0 and self.ttl > 0
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}            # key -> Future
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            del self._entries[key]
+            self._expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def _store(self, key, value, now):
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, key):
+        if not self.enabled:
+            return False, None
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return found, value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._store(key, value, time.monotonic())
+
+    def get_or_compute(self, key, compute):
+        if not self.enabled:
+            return compute()
+
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self._hits += 1
+                return value
+
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                self._misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self._coalesced += 1
+
+        if waiting is not None:
+            return waiting.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(key, value, time.monotonic())
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,137 @@
+import heapq
+from collections import Counter
+from datetime import datetime, timedelta
+
+from result_cache import normalize_text
+
+# ================= TRIAGE ROLLUPS =================
+# Pre-aggregated counts for the analytics dashboard, kept in the
+# triage_rollups table: one row per (granularity, bucket_start, dimension,
+# label) holding how many triage results fell in it, e.g.
+#
+#   ("hour", "2024-05-01 14:00:00", "risk", "HIGH", 12)
+#   ("day",  "2024-05-01 00:00:00", "symptom", "chest pain", 40)
+#
+# The history writer adds each flushed batch's counts in the same transaction
+# as the history rows (Storage.insert_history), so the two never disagree.
+# /analytics reads a window of buckets by primary key: the cost depends on
+# the window asked for, not on how much history there is.
+# backfill_rollups.py rebuilds everything from history once.
+
+GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1)
+}
+# Most buckets one /analytics call may span
+MAX_BUCKETS = {
+    "hour": 24 * 31,
+    "day": 366
+}
+DIMENSIONS = ("risk", "symptom", "doctor")
+# Labels longer than this are cut (the column is VARCHAR(255))
+LABEL_LENGTH = 255
+
+
+def _label(dimension, value):
+    if value is None or value == "":
+        return "unknown"
+    if dimension == "risk":
+        return str(value).strip().upper() or "unknown"
+    return normalize_text(value)[:LABEL_LENGTH] or "unknown"
+
+
+# "2024-05-01 14:23:05" (or that datetime) -> its hour and day bucket starts
+def bucket_starts(created_at):
+    hour = str(created_at)[:13] + ":00:00"
+    return hour, hour[:10] + " 00:00:00"
+
+
+def floor_time(moment, granularity):
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+# ================= COUNTING =================
+class RollupCounter:
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, risk, symptoms, doctor, created_at):
+        hour, day = bucket_starts(created_at)
+        for dimension, value in (("risk", risk), ("symptom", symptoms), ("doctor", doctor)):
+            label = _label(dimension, value)
+            self.counts[("hour", hour, dimension, label)] += 1
+            self.counts[("day", day, dimension, label)] += 1
+
+    # (granularity, bucket_start, dimension, label, total) in key order; the
+    # fixed order keeps concurrent upserts from deadlocking on MySQL
+    def rows(self):
+        return [key + (total,) for key, total in sorted(self.counts.items())]
+
+
+# History writer records (dicts) -> rollup rows
+def rollup_rows(records):
+    counter = RollupCounter()
+    for record in records:
+        counter.add(record["risk"], record["symptoms"], record["doctor"], record["created_at"])
+    return counter.rows()
+
+
+# Batches of (risk, symptoms, doctor, created_at) tuples -> rollup rows
+def count_batches(batches):
+    counter = RollupCounter()
+    for rows in batches:
+        for row in rows:
+            counter.add(*row)
+    return counter.rows()
+
+
+# ================= DASHBOARD =================
+def _ranking(item):
+    return -item[1], item[0]
+
+
+# Most frequent first, then alphabetical; a heap, as symptoms run to thousands
+def _top(counts, top):
+    return [{"symptom": label, "count": total} for label, total in heapq.nsmallest(top, counts.items(), key=_ranking)]
+
+
+def _summary(counts, top):
+    risk = dict(sorted(counts["risk"].items()))
+    return {
+        "total": sum(risk.values()),
+        "risk": risk,
+        "doctors": {label.title(): total for label, total in sorted(counts["doctor"].items(), key=_ranking)},
+        "top_symptoms": _top(counts["symptom"], top)
+    }
+
+
+# Rollup rows (bucket_start, dimension, label, total) for [start, end) -> one
+# entry per bucket (empty ones included, so charts get a continuous axis) plus
+# totals over the whole window
+def dashboard(rows, granularity, start, end, top=10):
+    buckets = {}
+    moment = start
+    while moment < end:
+        buckets[moment] = {dimension: Counter() for dimension in DIMENSIONS}
+        moment += GRANULARITIES[granularity]
+
+    totals = {dimension: Counter() for dimension in DIMENSIONS}
+    for bucket_start, dimension, label, total in rows:
+        if not isinstance(bucket_start, datetime):
+            bucket_start = datetime.fromisoformat(str(bucket_start))
+        counts = buckets.get(bucket_start)
+        if counts is None:
+            continue
+        counts[dimension][label] += total
+        totals[dimension][label] += total
+
+    return {
+        "granularity": granularity,
+        "start": start.isoformat(" "),
+        "end": end.isoformat(" "),
+        "buckets": [dict(start=moment.isoformat(" "), **_summary(counts, top)) for moment, counts in buckets.items()],
+        "totals": _summary(totals, top)
+    }
@@ -0,0 +1,690 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ================= CONFIG =================
+# Shared by app.py and the helper scripts so credentials live in one place.
+# STORAGE_BACKEND=sqlite runs everything against a local file (WAL mode), no
+# MySQL server needed.
+def load_config():
+    return {
+        "backend": os.environ.get("STORAGE_BACKEND", "mysql"),
+        "mysql": {
+            "host": os.environ.get("MYSQL_HOST", "localhost"),
+            "port": int(os.environ.get("MYSQL_PORT", 3306)),
+            "user": os.environ.get("MYSQL_USER", "root"),
+            "password": os.environ.get("MYSQL_PASSWORD", ""),
+            "database": os.environ.get("MYSQL_DB", "ai_health")
+        },
+        "sqlite_path": os.environ.get("SQLITE_PATH", os.path.join(BASE_DIR, "ai_health.db")),
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+        "pool_recycle": float(os.environ.get("DB_POOL_RECYCLE", 3600)),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+    }
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+# ================= CONNECTION POOL =================
+# Fixed-size pool. Idle connections are reused newest-first, checked with a
+# ping before being handed out (pre_ping) and replaced once they are older
+# than `recycle` seconds. Callers wait up to `timeout` for a free connection
+# and get PoolExhausted after that.
+class ConnectionPool:
+    def __init__(self, connect, ping, size=10, timeout=5.0, recycle=3600.0, pre_ping=True):
+        self._connect = connect
+        self._ping = ping
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+        self.recycle = float(recycle)
+        self.pre_ping = pre_ping
+
+        self._idle = []  # (connection, created_at)
+        self._open = 0
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+        self._timeouts = 0
+        self._connects = 0
+        self._connect_ms_total = 0.0
+        self._recycled = 0
+        self._ping_failures = 0
+
+    def _new_connection(self):
+        started = time.perf_counter()
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        elapsed = (time.perf_counter() - started) * 1000.0
+        with self._cond:
+            self._connects += 1
+            self._connect_ms_total += elapsed
+        return conn, time.monotonic()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        started = time.perf_counter()
+        waited = False
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolExhausted(f"No database connection free after {self.timeout}s (pool size {self.size})")
+                self._cond.wait(remaining)
+
+            self._checkouts += 1
+            if waited:
+                elapsed = (time.perf_counter() - started) * 1000.0
+                self._waits += 1
+                self._wait_ms_total += elapsed
+                self._wait_ms_max = max(self._wait_ms_max, elapsed)
+
+            if self._idle:
+                conn, created_at = self._idle.pop()
+            else:
+                self._open += 1
+                conn = None
+
+        if conn is None:
+            return self._new_connection()
+
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            self._discard(conn)
+            with self._cond:
+                self._recycled += 1
+            return self._new_connection()
+
+        if self.pre_ping:
+            try:
+                self._ping(conn)
+            except Exception:
+                self._discard(conn)
+                with self._cond:
+                    self._ping_failures += 1
+                return self._new_connection()
+
+        return conn, created_at
+
+    def release(self, entry, discard=False):
+        conn, created_at = entry
+        if discard:
+            self._discard(conn)
+        with self._cond:
+            if discard:
+                self._open -= 1
+            else:
+                self._idle.append((conn, created_at))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        entry = self.acquire()
+        try:
+            yield entry[0]
+        except BaseException:
+            # The connection may be mid-transaction or broken; don't reuse it
+            self.release(entry, discard=True)
+            raise
+        else:
+            self.release(entry)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_ms_mean": round(self._wait_ms_total / self._waits, 3) if self._waits else 0.0,
+                "wait_ms_max": round(self._wait_ms_max, 3),
+                "timeouts": self._timeouts,
+                "connects": self._connects,
+                "connect_ms_mean": round(self._connect_ms_total / self._connects, 3) if self._connects else 0.0,
+                "recycled": self._recycled,
+                "ping_failures": self._ping_failures
+            }
+
+
+# ================= STORAGE =================
+# Every query the app runs lives here, written once with %s placeholders.
+# Backends only differ in how they connect and in their placeholder style.
+class Storage:
+    name = "base"
+    placeholder = "%s"
+    IntegrityError = Exception
+
+    def __init__(self, pool):
+        self.pool = pool
+        # on_statement(label, seconds) after each statement commits, e.g.
+        # ("SELECT history", 0.0012); see statement_label()
+        self.on_statement = None
+
+    def _sql(self, sql):
+        if self.placeholder != "%s":
+            return sql.replace("%s", self.placeholder)
+        return sql
+
+    # Each block is one transaction. Reads commit too, so a pooled MySQL
+    # connection never keeps an old REPEATABLE READ snapshot around. With
+    # `statement`, the block (execute through commit) is timed under it.
+    @contextmanager
+    def cursor(self, statement=None):
+        entry = self.pool.acquire()
+        conn = entry[0]
+        reusable = True
+        try:
+            cursor = conn.cursor()
+            try:
+                started = time.perf_counter()
+                yield cursor
+                conn.commit()
+                if statement is not None and self.on_statement is not None:
+                    self.on_statement(statement_label(statement), time.perf_counter() - started)
+            finally:
+                cursor.close()
+        except BaseException:
+            # A connection that can't even roll back is not handed out again
+            try:
+                conn.rollback()
+            except Exception:
+                reusable = False
+            raise
+        finally:
+            self.pool.release(entry, discard=not reusable)
+
+    def fetchall(self, sql, params=()):
+        with self.cursor(sql) as cursor:
+            cursor.execute(self._sql(sql), params)
+            return rows_as_dicts(cursor, cursor.fetchall())
+
+    def fetchone(self, sql, params=()):
+        with self.cursor(sql) as cursor:
+            cursor.execute(self._sql(sql), params)
+            row = cursor.fetchone()
+            return rows_as_dicts(cursor, [row])[0] if row is not None else None
+
+    def execute(self, sql, params=()):
+        with self.cursor(sql) as cursor:
+            cursor.execute(self._sql(sql), params)
+            return cursor.lastrowid
+
+    def executemany(self, sql, rows):
+        with self.cursor(sql) as cursor:
+            cursor.executemany(self._sql(sql), rows)
+            return cursor.rowcount
+
+    # Cursor that leaves the result on the server and reads it as fetched
+    def _stream_cursor(self, conn):
+        return conn.cursor()
+
+    # Yields the result in lists of up to `batch_size` row tuples, holding one
+    # pooled connection until the last row is read. Nothing is timed through
+    # on_statement: the duration is set by the reader, not the database. A
+    # reader that stops early leaves unread rows behind, so that connection
+    # is closed rather than drained (which could mean reading millions).
+    def stream(self, sql, params=(), batch_size=1000):
+        entry = self.pool.acquire()
+        finished = False
+        try:
+            cursor = self._stream_cursor(entry[0])
+            cursor.execute(self._sql(sql), params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+            cursor.close()
+            entry[0].commit()
+            finished = True
+        finally:
+            self.pool.release(entry, discard=not finished)
+
+    def ping(self):
+        with self.pool.connection():
+            return True
+
+    def close(self):
+        self.pool.close()
+
+    def stats(self):
+        return {"backend": self.name, "pool": self.pool.stats()}
+
+    # ================= USERS =================
+    def get_user_by_email(self, email):
+        return self.fetchone("SELECT * FROM users WHERE email=%s", (email,))
+
+    def get_users_by_ids(self, user_ids):
+        if not user_ids:
+            return []
+        placeholders = ",".join(["%s"] * len(user_ids))
+        return self.fetchall(
+            f"SELECT id, name, age, gender FROM users WHERE id IN ({placeholders})",
+            list(user_ids)
+        )
+
+    # Raises self.IntegrityError when the email is already registered (see
+    # is_duplicate)
+    def create_user(self, name, contact, email, password_hash, age, gender):
+        return self.execute(
+            "INSERT INTO users (name, contact, email, password_hash, age, gender) VALUES (%s,%s,%s,%s,%s,%s)",
+            (name, contact, email, password_hash, age, gender)
+        )
+
+    # Whether an IntegrityError is a UNIQUE / PRIMARY KEY clash (MySQL's
+    # ER_DUP_ENTRY) rather than, say, a NOT NULL or foreign key failure
+    def is_duplicate(self, error):
+        return getattr(error, "errno", None) == 1062
+
+    def update_password_hash(self, user_id, password_hash):
+        self.execute("UPDATE users SET password_hash=%s WHERE id=%s", (password_hash, user_id))
+
+    # ================= HISTORY =================
+    INSERT_HISTORY = """
+        INSERT INTO history
+        (user_id, symptoms, severity, risk, doctor, advice, created_at)
+        VALUES (%s,%s,%s,%s,%s,%s,%s)
+    """
+
+    # Returns the new history ids in row order. mysql-connector sends the
+    # rows as one multi-row INSERT. Its row count is known up front, so
+    # InnoDB reserves all its ids in one step, consecutive in every
+    # innodb_autoinc_lock_mode (2, MySQL 8's default, included), and they
+    # follow from the first id it reports. `rollups` (see rollups.py) are
+    # added in the same transaction.
+    def insert_history(self, rows, rollups=()):
+        if not rows:
+            return []
+        with self.cursor(self.INSERT_HISTORY) as cursor:
+            cursor.executemany(self._sql(self.INSERT_HISTORY), rows)
+            first_id = cursor.lastrowid
+            self._add_rollups(cursor, rollups)
+        return list(range(first_id, first_id + len(rows)))
+
+    HISTORY_FIELDS = ("symptoms", "severity", "risk", "doctor", "advice", "created_at")
+
+    # Keyset page over idx_history_user_created: newest first, strictly older
+    # than `before` = (created_at, id) when given. `fields` must come from
+    # HISTORY_FIELDS; id and created_at are always selected for the cursor.
+    def list_history(self, user_id, limit=50, before=None, fields=HISTORY_FIELDS):
+        columns = ["id"] + [f for f in fields if f in self.HISTORY_FIELDS and f != "created_at"] + ["created_at"]
+        sql = f"SELECT {', '.join(columns)} FROM history WHERE user_id=%s"
+        params = [user_id]
+
+        if before is not None:
+            created_at, row_id = before
+            sql += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+            params += [created_at, created_at, row_id]
+
+        sql += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        params.append(limit)
+        return self.fetchall(sql, params)
+
+    # ================= EXPORT =================
+    EXPORT_COLUMNS = (
+        "id", "user_id", "name", "contact", "age", "gender",
+        "symptoms", "severity", "risk", "doctor", "advice", "created_at"
+    )
+
+    # Every history row joined to its user, oldest first, as batches of
+    # tuples in EXPORT_COLUMNS order (see stream()). `start` is inclusive and
+    # `end` exclusive (sent as 'YYYY-MM-DD HH:MM:SS' text, which both backends
+    # compare as a timestamp); risk and doctor match case-insensitively.
+    def export_history(self, start=None, end=None, risk=None, doctor=None, batch_size=1000):
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("h.created_at >= %s")
+            params.append(sqlite_value(start))
+        if end is not None:
+            conditions.append("h.created_at < %s")
+            params.append(sqlite_value(end))
+        if risk:
+            conditions.append("UPPER(h.risk) = %s")
+            params.append(risk.upper())
+        if doctor:
+            conditions.append("LOWER(h.doctor) = %s")
+            params.append(doctor.lower())
+
+        columns = ", ".join(("u." if c in ("name", "contact", "age", "gender") else "h.") + c for c in self.EXPORT_COLUMNS)
+        sql = f"SELECT {columns} FROM history h JOIN users u ON h.user_id = u.id"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY h.id"
+        return self.stream(sql, params, batch_size)
+
+    # ================= ROLLUPS =================
+    # Adds to existing counters; backend specific upsert syntax
+    UPSERT_ROLLUP = """
+        INSERT INTO triage_rollups (granularity, bucket_start, dimension, label, total)
+        VALUES (%s,%s,%s,%s,%s)
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+    """
+
+    def _add_rollups(self, cursor, rollups):
+        if rollups:
+            cursor.executemany(self._sql(self.UPSERT_ROLLUP), rollups)
+
+    READ_ROLLUPS = """
+        SELECT bucket_start, dimension, label, total
+        FROM triage_rollups
+        WHERE granularity=%s AND bucket_start >= %s AND bucket_start < %s
+    """
+
+    # Primary key range: cost follows the window, not the size of history.
+    # Plain (bucket_start, dimension, label, total) tuples; there can be many.
+    def read_rollups(self, granularity, start, end):
+        with self.cursor(self.READ_ROLLUPS) as cursor:
+            cursor.execute(self._sql(self.READ_ROLLUPS), (granularity, sqlite_value(start), sqlite_value(end)))
+            return cursor.fetchall()
+
+    # ================= ROLLUP REBUILD =================
+    # rebuild_rollups() recounts into a shadow table and swaps it in, so the
+    # server keeps saving results throughout. Backends differ in how they take
+    # a snapshot, copy the table and swap it.
+    BEGIN_SNAPSHOT = "START TRANSACTION WITH CONSISTENT SNAPSHOT"
+    CREATE_ROLLUP_SHADOW = "CREATE TABLE triage_rollups_rebuild LIKE triage_rollups"
+    # Waits for writers mid-transaction, then keeps new ones waiting
+    LOCK_ROLLUPS = ("LOCK TABLES triage_rollups WRITE, triage_rollups_rebuild WRITE",)
+    SWAP_ROLLUPS = (
+        "RENAME TABLE triage_rollups TO triage_rollups_old, triage_rollups_rebuild TO triage_rollups",
+        "UNLOCK TABLES",
+        "DROP TABLE triage_rollups_old"
+    )
+
+    def _read_rollup_totals(self, conn, batch_size):
+        reader = self._stream_cursor(conn)
+        reader.execute("SELECT granularity, bucket_start, dimension, label, total FROM triage_rollups")
+        totals = {}
+        for rows in iter(lambda: reader.fetchmany(batch_size), []):
+            for granularity, bucket_start, dimension, label, total in rows:
+                totals[(granularity, bucket_start, dimension, label)] = total
+        reader.close()
+        return totals
+
+    # Replaces every rollup with counts recomputed from history by
+    # `count_batches` (batches of (risk, symptoms, doctor, created_at)):
+    #
+    #   1. in one snapshot, read the current rollups and recount history
+    #   2. write the recount into triage_rollups_rebuild, a chunk per commit
+    #   3. with the live table locked (a moment), add whatever was saved since
+    #      the snapshot (live now minus live then) and swap the tables
+    #
+    # Writers only ever wait for step 3, so none time out and lose a batch.
+    def rebuild_rollups(self, count_batches, batch_size=5000):
+        entry = self.pool.acquire()
+        conn = entry[0]
+        finished = False
+        try:
+            cursor = conn.cursor()
+            for statement in ("DROP TABLE IF EXISTS triage_rollups_rebuild", "DROP TABLE IF EXISTS triage_rollups_old"):
+                cursor.execute(statement)
+            cursor.execute(self.CREATE_ROLLUP_SHADOW)
+            conn.commit()
+
+            cursor.execute(self.BEGIN_SNAPSHOT)
+            before = self._read_rollup_totals(conn, batch_size)
+            reader = self._stream_cursor(conn)
+            reader.execute("SELECT risk, symptoms, doctor, created_at FROM history")
+            rollups = count_batches(iter(lambda: reader.fetchmany(batch_size), []))
+            reader.close()
+            conn.commit()
+
+            upsert = self._sql(self.UPSERT_ROLLUP.replace("triage_rollups", "triage_rollups_rebuild"))
+            for first in range(0, len(rollups), batch_size):
+                cursor.executemany(upsert, rollups[first:first + batch_size])
+                conn.commit()
+
+            for statement in self.LOCK_ROLLUPS:
+                cursor.execute(statement)
+            after = self._read_rollup_totals(conn, batch_size)
+            saved_since = [
+                key + (total - before.get(key, 0),)
+                for key, total in after.items()
+                if total != before.get(key, 0)
+            ]
+            if saved_since:
+                cursor.executemany(upsert, [[sqlite_value(v) for v in row] for row in saved_since])
+            for statement in self.SWAP_ROLLUPS:
+                cursor.execute(statement)
+            conn.commit()
+            cursor.close()
+            finished = True
+            return len(rollups)
+        finally:
+            if not finished:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            # A failed run may still hold table locks: never reuse it
+            self.pool.release(entry, discard=not finished)
+
+    # ================= VITALS =================
+    # Downsampled vitals (see vitals.py); a bucket sent twice is overwritten
+    SAVE_VITALS = """
+        REPLACE INTO vitals
+        (user_id, bucket_start, heart_rate, temperature, systolic, diastolic, oxygen_level, samples)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+    """
+
+    def save_vitals(self, rows):
+        if rows:
+            self.executemany(self.SAVE_VITALS, [[sqlite_value(v) for v in row] for row in rows])
+
+    # ================= QUEUE =================
+    def recent_queue(self, limit=50):
+        return self.fetchall(
+            """
+            SELECT
+                h.id,
+                h.user_id,
+                u.name,
+                u.contact,
+                u.age,
+                u.gender,
+                h.symptoms,
+                h.severity,
+                h.risk,
+                h.doctor,
+                h.created_at
+            FROM history h
+            JOIN users u ON h.user_id = u.id
+            ORDER BY h.created_at DESC
+            LIMIT %s
+            """,
+            (limit,)
+        )
+
+
+# "SELECT ... FROM history ..." -> "SELECT history"; a low-cardinality name
+# for timing. Queries are a fixed set of strings, so results are memoized.
+_statement_labels = {}
+
+def statement_label(sql):
+    label = _statement_labels.get(sql)
+    if label is None:
+        words = sql.split()
+        verb = words[0].upper() if words else "?"
+        table = None
+        if verb == "UPDATE" and len(words) > 1:
+            table = words[1]
+        else:
+            for i, word in enumerate(words[:-1]):
+                if word.upper() in ("FROM", "INTO"):
+                    table = words[i + 1]
+                    break
+        label = f"{verb} {table.strip('`(').split('(')[0]}" if table else verb
+        if len(_statement_labels) < 1024:
+            _statement_labels[sql] = label
+    return label
+
+
+def rows_as_dicts(cursor, rows):
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+# ================= MYSQL =================
+class MySQLStorage(Storage):
+    name = "mysql"
+
+    def __init__(self, config):
+        import mysql.connector
+
+        self.IntegrityError = mysql.connector.IntegrityError
+        settings = dict(config["mysql"])
+
+        def connect():
+            return mysql.connector.connect(autocommit=False, **settings)
+
+        def ping(conn):
+            conn.ping(reconnect=False)
+
+        super().__init__(ConnectionPool(
+            connect, ping,
+            size=config["pool_size"],
+            timeout=config["pool_timeout"],
+            recycle=config["pool_recycle"],
+            pre_ping=config["pool_pre_ping"]
+        ))
+
+    # mysql_use_result(): rows stay on the server until fetched instead of
+    # being copied into client memory by execute()
+    def _stream_cursor(self, conn):
+        return conn.cursor(buffered=False)
+
+
+# ================= SQLITE =================
+SQLITE_SCHEMA = os.path.join(BASE_DIR, "..", "database", "schema_sqlite.sql")
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_converter("TIMESTAMP", _parse_timestamp)
+
+
+# Store datetimes the way CURRENT_TIMESTAMP does (sqlite3's implicit adapter
+# is deprecated)
+def sqlite_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    return value
+
+
+class SQLiteStorage(Storage):
+    name = "sqlite"
+    placeholder = "?"
+    IntegrityError = sqlite3.IntegrityError
+
+    def __init__(self, config):
+        path = config["sqlite_path"]
+
+        def connect():
+            # The pool hands a connection to one thread at a time
+            conn = sqlite3.connect(path, timeout=30, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            return conn
+
+        def ping(conn):
+            conn.execute("SELECT 1")
+
+        super().__init__(ConnectionPool(
+            connect, ping,
+            size=config["pool_size"],
+            timeout=config["pool_timeout"],
+            recycle=config["pool_recycle"],
+            pre_ping=config["pool_pre_ping"]
+        ))
+
+    UPSERT_ROLLUP = """
+        INSERT INTO triage_rollups (granularity, bucket_start, dimension, label, total)
+        VALUES (%s,%s,%s,%s,%s)
+        ON CONFLICT (granularity, bucket_start, dimension, label) DO UPDATE SET total = total + excluded.total
+    """
+
+    def is_duplicate(self, error):
+        return "UNIQUE constraint failed" in str(error)
+
+    # A read transaction sees one WAL snapshot; BEGIN IMMEDIATE holds off
+    # writers, and DDL is transactional, so the swap is all or nothing
+    BEGIN_SNAPSHOT = "BEGIN"
+    CREATE_ROLLUP_SHADOW = """
+        CREATE TABLE triage_rollups_rebuild (
+            granularity VARCHAR(8) NOT NULL,
+            bucket_start TIMESTAMP NOT NULL,
+            dimension VARCHAR(16) NOT NULL,
+            label VARCHAR(255) NOT NULL,
+            total INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket_start, dimension, label)
+        )
+    """
+    LOCK_ROLLUPS = ("BEGIN IMMEDIATE",)
+    SWAP_ROLLUPS = (
+        "DROP TABLE triage_rollups",
+        "ALTER TABLE triage_rollups_rebuild RENAME TO triage_rollups"
+    )
+
+    # sqlite3 only reports lastrowid for execute(), and a loop inside one
+    # transaction costs nothing extra on a local file
+    def insert_history(self, rows, rollups=()):
+        ids = []
+        with self.cursor(self.INSERT_HISTORY) as cursor:
+            sql = self._sql(self.INSERT_HISTORY)
+            for row in rows:
+                cursor.execute(sql, [sqlite_value(v) for v in row])
+                ids.append(cursor.lastrowid)
+            self._add_rollups(cursor, rollups)
+        return ids
+
+    def init_schema(self, schema_path=SQLITE_SCHEMA):
+        with open(schema_path, "r") as f:
+            script = f.read()
+        with self.pool.connection() as conn:
+            conn.executescript(script)
+            conn.commit()
+
+
+def create_storage(config=None):
+    config = config or load_config()
+    if config["backend"] == "sqlite":
+        storage = SQLiteStorage(config)
+        storage.init_schema()
+        return storage
+    if config["backend"] == "mysql":
+        return MySQLStorage(config)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {config['backend']}")
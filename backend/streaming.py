@@ -0,0 +1,57 @@
+import asyncio
+import json
+import time
+
+# ================= NDJSON STREAMING =================
+# /triage answers with one JSON object per line: a "metadata" frame followed
+# by "chunk" frames carrying the advice text (see triageStream in the
+# frontend). Frames are built here once and then paced either by a blocking
+# generator (WSGI) or by event-loop timers (ASGI, see asgi.py).
+
+NDJSON = "application/x-ndjson"
+
+
+def frame(kind, payload):
+    if kind == "metadata":
+        return json.dumps({"type": "metadata", "data": payload}) + "\n"
+    return json.dumps({"type": "chunk", "content": payload}) + "\n"
+
+
+def error_frames(message):
+    return [frame("metadata", {"mode": "chat"}), frame("chunk", message)]
+
+
+def advice_frames(metadata, advice, chunk_size):
+    yield frame("metadata", metadata)
+
+    # chunk_size <= 0 sends the whole advice as a single chunk
+    if chunk_size <= 0:
+        chunk_size = max(len(advice), 1)
+
+    for i in range(0, len(advice), chunk_size):
+        yield frame("chunk", advice[i:i + chunk_size])
+
+
+# ================= PACING =================
+# The delay goes between chunk frames only, so metadata is sent immediately
+def paced(frames, delay):
+    for i, line in enumerate(frames):
+        if delay and i > 1:
+            time.sleep(delay)
+        yield line
+
+
+async def paced_async(frames, delay):
+    for i, line in enumerate(frames):
+        if delay and i > 1:
+            await asyncio.sleep(delay)
+        yield line
+
+
+# Keeps `gauge` (see metrics.py) at the number of streams being sent
+def tracked(lines, gauge):
+    gauge.inc()
+    try:
+        yield from lines
+    finally:
+        gauge.dec()
@@ -0,0 +1,84 @@
+from collections import deque
+
+# ================= SYMPTOM INDEX =================
+# Built once when the training data is loaded. Exact lookups are a dict hit and
+# substring lookups are a single Aho-Corasick pass over the message, so request
+# cost no longer grows with the number of phrases in the knowledge base.
+
+
+class SymptomIndex:
+    def __init__(self, phrases):
+        # phrase -> position of its first row in the training data
+        self.exact = {}
+
+        self._goto = [{}]
+        self._fail = [0]
+        # Best phrase ending at each state as (length, -position) so that
+        # max() picks the longest phrase and, on ties, the earliest row.
+        self._best = [None]
+
+        for position, phrase in enumerate(phrases):
+            # Blank CSV lines load as empty/NaN text and would match everything
+            if not isinstance(phrase, str) or not phrase:
+                continue
+            if phrase in self.exact:
+                continue
+            self.exact[phrase] = position
+            self._insert(phrase, position)
+
+        self._link()
+
+    def __len__(self):
+        return len(self.exact)
+
+    def _insert(self, phrase, position):
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            state = nxt
+        self._best[state] = (len(phrase), -position)
+
+    def _link(self):
+        # Breadth-first so every fail target is finished before its dependants
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+
+                inherited = self._best[self._fail[nxt]]
+                if inherited is not None and (self._best[nxt] is None or inherited > self._best[nxt]):
+                    self._best[nxt] = inherited
+                queue.append(nxt)
+
+    # ================= LOOKUPS =================
+    def exact_match(self, text):
+        return self.exact.get(text)
+
+    def longest_match(self, text):
+        goto, fail, best_at = self._goto, self._fail, self._best
+        state = 0
+        best = None
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found = best_at[state]
+            if found is not None and (best is None or found > best):
+                best = found
+        return -best[1] if best is not None else None
+
+    def match(self, text):
+        position = self.exact.get(text)
+        if position is None:
+            position = self.longest_match(text)
+        return position
@@ -1,17 +1,14 @@
-import MySQLdb
+from storage import load_config, create_storage
 
-print("Testing connection to 127.0.0.1...")
-try:
-    db = MySQLdb.connect(host="127.0.0.1", user="root", passwd="", db="ai_health")
-    print("SUCCESS: Connected to 127.0.0.1")
-    db.close()
-except Exception as e:
-    print(f"FAILED: 127.0.0.1 - {e}")
+config = load_config()
+target = config["sqlite_path"] if config["backend"] == "sqlite" else config["mysql"]["host"]
 
-print("\nTesting connection to localhost...")
+print(f"Testing {config['backend']} connection to {target}...")
 try:
-    db = MySQLdb.connect(host="localhost", user="root", passwd="", db="ai_health")
-    print("SUCCESS: Connected to localhost")
-    db.close()
+    storage = create_storage(config)
+    storage.ping()
+    print(f"SUCCESS: Connected to {target}")
+    print(storage.stats())
+    storage.close()
 except Exception as e:
-    print(f"FAILED: localhost - {e}")
+    print(f"FAILED: {target} - {e}")
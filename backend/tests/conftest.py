@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# Tests run in-process (python -m pytest tests, from backend/) against a
+# throwaway SQLite file, never the configured MySQL server. Set before
+# anything imports app.py, which reads its config at import time.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="triage-tests-"), "test.db")
+os.environ.setdefault("ARTIFACT_WATCH_SECONDS", "0")
+os.environ.setdefault("STREAM_CHUNK_DELAY_MS", "0")
+os.environ.setdefault("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+os.environ.setdefault("QUEUE_LONG_POLL_MAX_SECONDS", "1")
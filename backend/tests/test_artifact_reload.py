@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import time
+
+import joblib
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from inference import predict_risk
+from knowledge_base import SOURCE_FILES, ArtifactRegistry
+from train_model import promote
+
+# python -m pytest tests/test_artifact_reload.py (from backend/); needs the
+# trained risk_model.pkl / vectorizer.pkl next to app.py
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def copy_sources(target_dir):
+    for name in SOURCE_FILES.values():
+        shutil.copy2(os.path.join(BACKEND_DIR, name), target_dir)
+
+
+def save_version(version_dir, model, vectorizer):
+    os.makedirs(version_dir)
+    joblib.dump(model, os.path.join(version_dir, "risk_model.pkl"))
+    joblib.dump(vectorizer, os.path.join(version_dir, "vectorizer.pkl"))
+    with open(os.path.join(version_dir, "metadata.json"), "w") as f:
+        json.dump({"version": os.path.basename(version_dir)}, f)
+
+
+def small_model(texts, risks):
+    vectorizer = TfidfVectorizer()
+    model = LogisticRegression(max_iter=200).fit(vectorizer.fit_transform(texts), risks)
+    return model, vectorizer
+
+
+def test_promotion_swaps_in_whole_pairs(tmp_path):
+    artifact_dir = str(tmp_path / "artifacts")
+    os.makedirs(artifact_dir)
+    copy_sources(artifact_dir)
+    registry = ArtifactRegistry(artifact_dir, {})
+    first = registry.current.version
+
+    # Promoting through train_model writes the manifest
+    save_version(str(tmp_path / "v1"), *small_model(["chest pain", "mild cough", "headache"], ["HIGH", "LOW", "MEDIUM"]))
+    promote(str(tmp_path / "v1"), artifact_dir)
+    assert registry.reload()
+    v1 = registry.current.version
+    assert v1 != first
+    print("✅ A promoted model is picked up on reload")
+
+    # Half a promotion (new vectorizer, old model): the reload fails and
+    # the previous pair keeps serving
+    save_version(str(tmp_path / "v2"), *small_model(["severe bleeding now", "runny nose", "back ache", "fainting"], ["HIGH", "LOW", "MEDIUM", "HIGH"]))
+    shutil.copy2(str(tmp_path / "v2" / "vectorizer.pkl"), artifact_dir)
+    try:
+        registry.reload()
+    except ValueError as e:
+        assert "does not match" in str(e), e
+    else:
+        raise AssertionError("mismatched pair was loaded")
+    assert registry.current.version == v1 and registry.failures == 1
+    assert predict_risk(registry.current.scorer, ["chest pain"])[0] is not None
+    print("✅ A half-promoted pair is refused and the old version keeps serving")
+
+    # The watcher picks up the finished promotion by itself
+    promote(str(tmp_path / "v2"), artifact_dir)
+    registry.watch(0.05)
+    deadline = time.monotonic() + 10
+    while registry.current.version == v1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    registry.stop()
+    assert registry.current.version != v1 and registry.last_error is None
+    assert predict_risk(registry.current.scorer, ["severe bleeding now"])[0] is not None
+    print("✅ The watcher swaps in the finished promotion")
+
+
+def test_mismatched_pickles_are_refused(tmp_path):
+    # Hand-placed pickles (no manifest) from two different training runs
+    artifact_dir = str(tmp_path)
+    copy_sources(artifact_dir)
+    registry = ArtifactRegistry(artifact_dir, {})
+    version = registry.current.version
+
+    joblib.dump(small_model(["chest pain", "mild cough", "headache"], ["HIGH", "LOW", "MEDIUM"])[1],
+                os.path.join(artifact_dir, "vectorizer.pkl"))
+    try:
+        registry.reload()
+    except ValueError as e:
+        assert "features" in str(e), e
+    else:
+        raise AssertionError("mismatched pair was loaded")
+    assert registry.current.version == version
+    assert predict_risk(registry.current.scorer, ["chest pain"])[0] is not None
+    print("✅ A vectorizer from another training run is refused at load time")
@@ -0,0 +1,49 @@
+from doctor_directory import DoctorDirectory
+
+# python -m pytest tests/test_doctor_directory.py (from backend/)
+
+SPECIALIZATIONS = {"cardio": "cardiologist", "skin": "dermatologist"}
+
+
+def doctor(name, specialization, experience, area="Gota", **extra):
+    return dict(doctor_name=name, specialization=specialization, hospital="City Hospital", area=area, contact=name,
+                experience_years=experience, city="ahmedabad", **extra)
+
+
+def test_rating_is_only_the_csvs():
+    rows = [doctor("Dr. A", "cardiologist", 20), doctor("Dr. B", "cardiologist", 5, rating="4.26"),
+            doctor("Dr. C", "cardiologist", 30, rating=float("nan"))]
+    ratings = {d["name"]: d["rating"] for d in DoctorDirectory(rows, SPECIALIZATIONS).lookup("cardiologist", k=3)}
+    assert ratings == {"Dr. A": None, "Dr. B": 4.3, "Dr. C": None}, ratings
+    print("✅ Doctors without a rating in the CSV have none")
+
+
+def test_ranking_is_deterministic():
+    rows = [
+        doctor("Dr. Junior", "cardiologist", 2),
+        doctor("Dr. Senior", "cardiologist", 25),
+        doctor("Dr. Mixed", "Emergency / Cardiologist", 30),
+        doctor("Dr. Skin", "dermatologist", 40),
+        doctor("Dr. GP", "general physician", 10)
+    ]
+    directory = DoctorDirectory(rows, SPECIALIZATIONS)
+    ranked = directory.lookup("Cardio specialist", k=3)
+    assert [d["name"] for d in ranked] == ["Dr. Senior", "Dr. Mixed", "Dr. Junior"], ranked
+    assert ranked[0]["matchScore"] > ranked[-1]["matchScore"]
+    assert ranked == DoctorDirectory(rows, SPECIALIZATIONS).lookup("Cardio specialist", k=3)
+    print("✅ Exact specialization and experience rank first, the same every time")
+
+    # Nobody with the specialization: general physicians stand in
+    assert [d["name"] for d in directory.lookup("neurologist", k=2)] == ["Dr. GP"]
+    print("✅ Unknown specializations fall back to general physicians")
+
+
+def test_location_ranks_nearby_doctors_first():
+    rows = [doctor("Dr. Far", "cardiologist", 20, area="Gota"), doctor("Dr. Near", "cardiologist", 20, area="Maninagar")]
+    areas = [{"city": "ahmedabad", "area": "Gota", "lat": 23.10, "lon": 72.54},
+             {"city": "ahmedabad", "area": "Maninagar", "lat": 22.99, "lon": 72.60}]
+    directory = DoctorDirectory(rows, SPECIALIZATIONS, area_rows=areas)
+    ranked = directory.lookup("cardiologist", k=2, location={"lat": 22.98, "lon": 72.60})
+    assert [d["name"] for d in ranked] == ["Dr. Near", "Dr. Far"], ranked
+    assert ranked[0]["distance_km"] < ranked[1]["distance_km"]
+    print("✅ With a location the nearer doctor ranks first")
@@ -0,0 +1,32 @@
+from fuzzy_index import FuzzyIndex, osa_distance
+
+# python -m pytest tests/test_fuzzy_index.py (from backend/)
+
+PHRASES = ["fever", "chest pain", "headache", "eye pain", "ear pain", "cold", "shortness of breath"]
+
+
+def test_typos_and_spacing():
+    index = FuzzyIndex(PHRASES, max_distance=2)
+    assert index.match("feaver")[0] == 0
+    assert index.match("i have chest pian")[0] == 1
+    assert index.match("bad head ache today")[0] == 2
+    position, confidence = index.match("shortnes of breth")
+    assert position == 6 and 0.75 < confidence < 1.0
+    assert index.match("headache") == (2, 1.0)
+    print("✅ Typos, swapped letters and spacing mistakes find their phrase")
+
+
+def test_short_words_need_exact_spelling():
+    index = FuzzyIndex(PHRASES, max_distance=2)
+    assert index.match("could") is None
+    assert index.match("ear") is None
+    assert index.match("ear pain")[0] == 4 and index.match("eye pain")[0] == 3
+    assert FuzzyIndex([], max_distance=2).match("fever") is None
+    print("✅ Short words are not fuzzed into other symptoms")
+
+
+def test_osa_distance():
+    assert osa_distance("pian", "pain", 2) == 1
+    assert osa_distance("feaver", "fever", 2) == 1
+    assert osa_distance("abc", "xyz", 1) > 1
+    print("✅ Adjacent swaps cost one edit")
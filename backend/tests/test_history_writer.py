@@ -0,0 +1,109 @@
+import threading
+import time
+
+from history_writer import HistoryWriter
+
+# python -m pytest tests/test_history_writer.py (from backend/)
+
+
+class BadRow(Exception):
+    pass
+
+
+def recorder(bad=()):
+    saved = []
+
+    def flush_rows(rows):
+        # All or nothing, like one transaction
+        if any(row in bad for row in rows):
+            raise BadRow("foreign key failed")
+        saved.extend(rows)
+    return saved, flush_rows
+
+
+def test_batches_and_close():
+    saved, flush_rows = recorder()
+    batches = []
+    writer = HistoryWriter(lambda rows: (batches.append(len(rows)), flush_rows(rows)), batch_size=10, flush_interval_ms=10000)
+    for i in range(25):
+        assert writer.write(i)
+
+    # Two full batches go out without waiting for the interval
+    writer.close()
+    assert saved == list(range(25))
+    assert batches[:2] == [10, 10], batches
+    assert not writer.write(99)
+    stats = writer.stats()
+    assert (stats["written"], stats["dropped"], stats["failed"], stats["queue_depth"]) == (25, 1, 0, 0), stats
+    print("✅ Rows are written in full batches and drained on close")
+
+
+def test_interval_flushes_a_partial_batch():
+    flushed = threading.Event()
+    writer = HistoryWriter(lambda rows: flushed.set(), batch_size=100, flush_interval_ms=20)
+    writer.write("row")
+    assert flushed.wait(2)
+    writer.close()
+    print("✅ A lone row is written after flush_interval_ms")
+
+
+def test_full_queue_drops_new_rows():
+    release = threading.Event()
+    writer = HistoryWriter(lambda rows: release.wait(5), max_queue=3, batch_size=1, flush_interval_ms=0)
+    accepted = [writer.write(i) for i in range(10)]
+    assert accepted.count(False) >= 10 - 4, accepted
+    release.set()
+    writer.close()
+    assert writer.stats()["dropped"] == accepted.count(False)
+    print("✅ A full queue drops rows instead of blocking")
+
+
+def test_bad_row_only_fails_itself():
+    saved, flush_rows = recorder(bad={"bad"})
+    writer = HistoryWriter(flush_rows, batch_size=10, flush_interval_ms=10000, row_errors=(BadRow,))
+    for row in ("a", "bad", "b"):
+        writer.write(row)
+    writer.close()
+    assert saved == ["a", "b"], saved
+    stats = writer.stats()
+    assert (stats["written"], stats["failed"]) == (2, 1), stats
+    print("✅ A bad row is retried alone and only it is dropped")
+
+
+def test_other_errors_fail_the_batch():
+    saved, flush_rows = recorder(bad={"bad"})
+    writer = HistoryWriter(flush_rows, mode="sync")
+    writer.write("a")
+    writer.write("bad")
+    stats = writer.stats()
+    assert saved == ["a"] and (stats["written"], stats["failed"]) == (1, 1), stats
+    print("✅ Errors not listed in row_errors fail the batch without retries")
+
+
+def test_save_history_drops_only_unknown_users():
+    from app import history_writer, save_history, storage
+
+    user_id = storage.create_user("Writer Test", "000", "writer-test@example.com", "x", 30, "Other")
+    result = {"text": "fever", "severity": 5, "risk": "LOW", "doctor": "general physician", "advice": "Rest."}
+    before = history_writer.stats()
+
+    # Not an id at all: never enqueued
+    for invalid in ("7", True, -1, 2 ** 40):
+        save_history(invalid, result)
+    assert history_writer.stats()["enqueued"] == before["enqueued"]
+
+    # No such user: only that row fails its foreign key
+    for uid in (user_id, 999999, user_id):
+        save_history(uid, result)
+    # The flusher thread may already hold part of it
+    history_writer.flush()
+    deadline = time.monotonic() + 5
+    while True:
+        stats = history_writer.stats()
+        if stats["written"] + stats["failed"] - before["written"] - before["failed"] >= 3 or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    assert stats["written"] - before["written"] == 2, stats
+    assert stats["failed"] - before["failed"] == 1, stats
+    assert len(storage.list_history(user_id)) == 2
+    print("✅ save_history skips invalid ids and a missing user only loses its own row")
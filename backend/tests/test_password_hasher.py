@@ -0,0 +1,70 @@
+from werkzeug.security import generate_password_hash
+
+from password_hasher import HasherBusy, PasswordHasher
+
+# python -m pytest tests/test_password_hasher.py (from backend/)
+
+FAST = "pbkdf2:sha256:1000"
+
+
+def test_hash_verify_and_rehash():
+    hasher = PasswordHasher(method=FAST, workers=0)
+    password_hash = hasher.hash("secret")
+    assert hasher.verify(password_hash, "secret")
+    assert not hasher.verify(password_hash, "guess")
+    assert not hasher.needs_rehash(password_hash)
+    assert hasher.needs_rehash(generate_password_hash("secret", "pbkdf2:sha256:500"))
+    print("✅ Hashes verify, and only other methods/costs need a rehash")
+
+
+def test_worker_processes():
+    hasher = PasswordHasher(method=FAST, workers=1)
+    try:
+        assert hasher.verify(hasher.hash("secret"), "secret")
+    finally:
+        hasher.close()
+    assert hasher.stats()["hashed"] == 1 and hasher.stats()["verified"] == 1
+    print("✅ Hashing works in the worker pool")
+
+
+def test_full_hasher_is_busy():
+    hasher = PasswordHasher(method=FAST, workers=0, max_pending=1)
+    hasher._slots.acquire()
+    try:
+        hasher.hash("secret")
+    except HasherBusy:
+        pass
+    else:
+        raise AssertionError("hash ran past max_pending")
+    hasher._slots.release()
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.hash("secret")
+    print("✅ Hashes over max_pending are refused instead of queued")
+
+
+def test_login_upgrades_old_hashes_best_effort(monkeypatch):
+    from app import app, password_hasher, storage
+
+    client = app.test_client()
+    email = "hasher-test@example.com"
+    storage.create_user("Hasher Test", "000", email, generate_password_hash("secret", "pbkdf2:sha256:500"), 30, "Other")
+
+    assert client.post("/login", json={"email": email, "password": "guess"}).status_code == 401
+
+    # A busy hasher after a correct password still logs in; the old hash stays
+    def busy(password_hash):
+        raise HasherBusy("busy")
+    monkeypatch.setattr(password_hasher, "needs_rehash", busy)
+    assert client.post("/login", json={"email": email, "password": "secret"}).status_code == 200
+    assert storage.get_user_by_email(email)["password_hash"].startswith("pbkdf2:sha256:500$")
+    monkeypatch.undo()
+    print("✅ A busy rehash does not fail a correct login")
+
+    assert client.post("/login", json={"email": email, "password": "secret"}).status_code == 200
+    assert not password_hasher.needs_rehash(storage.get_user_by_email(email)["password_hash"])
+    print("✅ The next login upgrades the hash")
+
+    # Verifying is not optional: a busy hasher there answers 503
+    monkeypatch.setattr(password_hasher, "verify", lambda password_hash, password: busy(password_hash))
+    assert client.post("/login", json={"email": email, "password": "secret"}).status_code == 503
+    print("✅ A busy verify answers 503")
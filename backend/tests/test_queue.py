@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+# python -m pytest tests/test_queue.py (from backend/)
+
+
+def add_result(user_id, symptoms):
+    from app import insert_history_rows
+
+    insert_history_rows([{"user_id": user_id, "symptoms": symptoms, "severity": 8, "risk": "HIGH",
+                          "doctor": "cardiologist", "advice": "Go now.", "created_at": datetime.now().replace(microsecond=0)}])
+
+
+def test_etag_follows_queue_changes():
+    from app import app, storage
+
+    client = app.test_client()
+    user_id = storage.create_user("Queue Test", "000", "queue-test@example.com", "x", 30, "Other")
+    add_result(user_id, "chest pain")
+
+    first = client.get("/queue")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag
+    assert client.get("/queue", headers={"If-None-Match": etag}).status_code == 304
+    print("✅ An unchanged queue answers 304")
+
+    add_result(user_id, "shortness of breath")
+    second = client.get("/queue", headers={"If-None-Match": etag})
+    assert second.status_code == 200 and second.headers["ETag"] != etag
+    assert int(second.headers["X-Queue-Version"]) > int(first.headers["X-Queue-Version"])
+    assert any("shortness of breath" in entry["symptoms"] for entry in json.loads(second.get_data()))
+    print("✅ A new result changes the ETag and the body")
+
+
+def test_long_poll_wakes_on_change():
+    from app import app, storage, triage_queue
+
+    client = app.test_client()
+    user_id = storage.create_user("Poll Test", "000", "poll-test@example.com", "x", 30, "Other")
+    triage_queue.ensure_fresh()
+    since, generation = triage_queue.version, triage_queue.generation
+
+    timer = threading.Timer(0.2, add_result, (user_id, "fainting"))
+    timer.start()
+    started = time.perf_counter()
+    resp = client.get(f"/queue/changes?since={since}&generation={generation}&timeout=10")
+    seconds = time.perf_counter() - started
+    timer.join()
+    assert resp.status_code == 200, resp.status_code
+    assert seconds < 2, seconds
+    assert any("fainting" in entry["symptoms"] for entry in json.loads(resp.get_data())["upserts"])
+    print(f"✅ A waiting long-poll returned {seconds * 1000:.0f} ms after the change")
+
+
+def test_long_poll_timeouts():
+    from app import app, triage_queue
+
+    client = app.test_client()
+    triage_queue.ensure_fresh()
+    position = f"since={triage_queue.version}&generation={triage_queue.generation}"
+
+    started = time.perf_counter()
+    assert client.get(f"/queue/changes?{position}&timeout=0").status_code == 204
+    assert time.perf_counter() - started < 0.5
+    print("✅ timeout=0 answers 204 straight away")
+
+    # nan / inf are not timeouts: the default applies, capped at
+    # QUEUE_LONG_POLL_MAX_SECONDS (1 s in conftest.py)
+    cap = app.config["QUEUE_LONG_POLL_MAX_SECONDS"]
+    for timeout in ("nan", "inf", "-inf"):
+        started = time.perf_counter()
+        resp = client.get(f"/queue/changes?{position}&timeout={timeout}")
+        seconds = time.perf_counter() - started
+        assert resp.status_code == 204, (timeout, resp.status_code)
+        assert seconds < cap + 1, (timeout, seconds)
+    print("✅ Non-finite timeouts wait the capped default and answer 204")
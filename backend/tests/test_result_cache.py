@@ -0,0 +1,92 @@
+import threading
+import time
+
+from result_cache import ResultCache, normalize_text
+
+# python -m pytest tests/test_result_cache.py (from backend/)
+
+
+def test_normalize_text():
+    assert normalize_text("  Chest-Pain!! ") == normalize_text("chest pain") == "chest pain"
+    assert normalize_text("'child's cough'") == "child's cough"
+    print("✅ Case, punctuation and spacing share one key")
+
+
+def test_lru_and_ttl():
+    cache = ResultCache(max_entries=2, ttl_seconds=0.2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1) and cache.get("c") == (True, 3)
+    print("✅ The least recently used entry is evicted")
+
+    time.sleep(0.25)
+    assert cache.get("a") == (False, None)
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1, stats
+    print("✅ Entries expire after the TTL")
+
+
+def test_disabled_cache_always_computes():
+    cache = ResultCache(max_entries=0)
+    calls = []
+    assert cache.get_or_compute("k", lambda: calls.append(1) or "v") == "v"
+    assert cache.get_or_compute("k", lambda: calls.append(1) or "v") == "v"
+    assert len(calls) == 2 and cache.get("k") == (False, None)
+    print("✅ A disabled cache computes every time")
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "result"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+    first.start()
+    started.wait(2)
+    others = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(8)]
+    for thread in others:
+        thread.start()
+    for thread in [first] + others:
+        thread.join()
+
+    assert results == ["result"] * 9 and len(calls) == 1
+    assert cache.stats()["coalesced"] == 8
+    print("✅ Concurrent misses on one key wait for a single computation")
+
+
+def test_failed_compute_is_not_cached():
+    cache = ResultCache()
+
+    def fail():
+        raise RuntimeError("db down")
+    try:
+        cache.get_or_compute("k", fail)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("error was swallowed")
+    assert cache.get_or_compute("k", lambda: "ok") == "ok"
+    print("✅ A failed computation is retried, not cached")
+
+
+def test_triage_repeats_hit_the_cache():
+    from app import app, cached_triage, current_kb, result_cache
+
+    with app.test_request_context():
+        kb = current_kb()
+        first = cached_triage(kb, normalize_text("Fever!!"))
+        hits = result_cache.stats()["hits"]
+        assert first is not None
+        assert cached_triage(kb, normalize_text("  fever ")) is first
+    assert result_cache.stats()["hits"] == hits + 1
+    print("✅ Repeats of a message, however spelled, are served from the cache")
@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+
+from rollups import count_batches, rollup_rows
+
+# python -m pytest tests/test_rollups.py (from backend/)
+
+
+def record(user_id, risk, symptoms, doctor, created_at):
+    return {"user_id": user_id, "symptoms": symptoms, "severity": 5, "risk": risk, "doctor": doctor,
+            "advice": "Rest.", "created_at": created_at}
+
+
+def test_rollup_rows_count_every_dimension():
+    records = [
+        record(1, "high", "Chest pain", "cardiologist", datetime(2024, 5, 1, 14, 5)),
+        record(1, "HIGH", "chest  pain", "Cardiologist", datetime(2024, 5, 1, 14, 55)),
+        record(1, "LOW", "cough", None, datetime(2024, 5, 1, 15, 0))
+    ]
+    counts = {row[:4]: row[4] for row in rollup_rows(records)}
+    assert counts[("hour", "2024-05-01 14:00:00", "risk", "HIGH")] == 2
+    assert counts[("hour", "2024-05-01 14:00:00", "symptom", "chest pain")] == 2
+    assert counts[("hour", "2024-05-01 15:00:00", "doctor", "unknown")] == 1
+    assert counts[("day", "2024-05-01 00:00:00", "risk", "HIGH")] == 2
+    assert counts[("day", "2024-05-01 00:00:00", "risk", "LOW")] == 1
+
+    # The backfill counts the same rows the same way
+    batches = [[(r["risk"], r["symptoms"], r["doctor"], r["created_at"]) for r in records]]
+    assert sorted(count_batches(batches)) == sorted(rollup_rows(records))
+    print("✅ Results are counted per hour and day, risk, symptom and doctor")
+
+
+def test_analytics_reads_saved_batches_and_rebuilds():
+    from app import app, insert_history_rows, storage
+
+    client = app.test_client()
+    user_id = storage.create_user("Rollup Test", "000", "rollup-test@example.com", "x", 30, "Other")
+    insert_history_rows([
+        record(user_id, "HIGH", "chest pain", "cardiologist", datetime(2001, 2, 3, 9, 15)),
+        record(user_id, "LOW", "cough", "general physician", datetime(2001, 2, 3, 9, 45)),
+        record(user_id, "LOW", "cough", "general physician", datetime(2001, 2, 3, 11, 0))
+    ])
+
+    def window():
+        resp = client.get("/analytics?granularity=hour&start=2001-02-03&end=2001-02-03")
+        assert resp.status_code == 200, resp.status_code
+        return json.loads(resp.get_data())
+
+    body = window()
+    assert len(body["buckets"]) == 24
+    assert body["totals"]["risk"] == {"HIGH": 1, "LOW": 2}, body["totals"]
+    assert body["buckets"][9]["total"] == 2 and body["buckets"][11]["total"] == 1
+    assert body["totals"]["top_symptoms"][0] == {"symptom": "cough", "count": 2}
+    print("✅ /analytics serves the counts saved with each history batch")
+
+    storage.rebuild_rollups(count_batches)
+    assert window() == body
+    print("✅ Rebuilding the rollups from history gives the same dashboard")
+
+
+def test_analytics_rejects_dates_out_of_range():
+    from app import app
+
+    client = app.test_client()
+    for query in ("end=9999-12-31", "granularity=day&end=9999-12-31", "end=9999-12-31T23:30:00",
+                  "granularity=day&end=0001-01-02", "end=not-a-date"):
+        resp = client.get(f"/analytics?{query}")
+        assert resp.status_code == 400, (query, resp.status_code)
+    print("✅ Dates at the ends of the calendar answer 400")
@@ -0,0 +1,39 @@
+import random
+
+from symptom_index import SymptomIndex
+
+# python -m pytest tests/test_symptom_index.py (from backend/)
+
+
+# What /triage did before the index: the longest phrase contained in the
+# message, the earliest row on ties
+def scan(phrases, text):
+    best = None
+    for position, phrase in enumerate(phrases):
+        if isinstance(phrase, str) and phrase and phrase in text:
+            if best is None or len(phrase) > len(phrases[best]):
+                best = position
+    return best
+
+
+def test_exact_and_longest_match():
+    phrases = ["fever", "chest pain", "pain", None, "", "severe chest pain", "fever"]
+    index = SymptomIndex(phrases)
+    assert len(index) == 4
+    assert index.match("fever") == 0
+    assert index.match("i have severe chest pain since morning") == 5
+    assert index.match("mild chest pain") == 1
+    assert index.match("painful") == 2
+    assert index.match("nothing known") is None
+    print("✅ Exact hits, longest contained phrase, blanks and duplicates skipped")
+
+
+def test_matches_a_full_scan():
+    rng = random.Random(7)
+    words = ["pain", "chest", "fever", "cough", "head", "ache", "dry", "high", "sore", "throat"]
+    phrases = [" ".join(rng.choices(words, k=rng.randint(1, 3))) for _ in range(300)]
+    index = SymptomIndex(phrases)
+    for _ in range(2000):
+        text = " ".join(rng.choices(words + ["and", "since", "x"], k=rng.randint(1, 8)))
+        assert index.match(text) == scan(phrases, text), text
+    print("✅ 2000 random messages match what a full scan finds")
@@ -0,0 +1,29 @@
+import time
+
+from app import app
+
+# python -m pytest tests/test_triage_limits.py (from backend/; conftest.py
+# points the app at a throwaway SQLite file)
+
+
+def test_message_length_cap():
+    client = app.test_client()
+    limit = app.config["TRIAGE_MAX_MESSAGE_CHARS"]
+    huge = " ".join(["fever"] * 20000)
+
+    started = time.perf_counter()
+    resp = client.post("/triage", json={"message": huge})
+    seconds = time.perf_counter() - started
+    assert resp.status_code == 413, resp.status_code
+    assert seconds < 0.5, f"took {seconds:.2f}s"
+    print(f"✅ /triage refused a {len(huge)}-character message in {seconds * 1000:.1f} ms")
+
+    resp = client.post("/triage/batch", json={"messages": ["fever", {"message": huge}]})
+    assert resp.status_code == 413, resp.status_code
+    print("✅ /triage/batch refused a batch with an over-long message")
+
+    resp = client.post("/triage", json={"message": "fever " + "x" * (limit - 10), "pacing": False})
+    resp.get_data()
+    assert resp.status_code == 200, resp.status_code
+    print(f"✅ A message of {limit} characters is still triaged")
+
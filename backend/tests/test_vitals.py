@@ -0,0 +1,77 @@
+import json
+import time
+from datetime import datetime
+
+from triage_queue import TriageQueue
+from vitals import VitalsStore
+
+# Runs in-process (no server needed): python -m pytest tests/test_vitals.py
+
+
+def test_hostile_timestamps():
+    persisted = []
+    store = VitalsStore(persist=persisted.extend, bucket_seconds=60, history_buckets=10)
+    now = time.time()
+
+    # Far past, far future, not a number: all dropped, no patient created
+    hostile = [-1e15, now - 60 * 11, 1e300, now + 3600, "nan", "inf", "-inf", "soon"]
+    accepted, rejected = store.ingest([(1, {"t": t, "heartRate": 80}) for t in hostile], now=now)
+    assert (accepted, rejected) == (0, len(hostile)), (accepted, rejected)
+    assert store.stats()["patients"] == 0
+    print("✅ Out-of-range timestamps rejected")
+
+    # The patient still ingests, sweeps and flushes normally afterwards
+    accepted, _ = store.ingest([(1, {"t": now - 120, "heartRate": 80}), (1, {"t": now, "heartRate": 90})], now=now)
+    assert accepted == 2
+    store.ingest([(2, {"heartRate": 70})], now=now + 600)
+    store.flush()
+    assert [row[0] for row in persisted] == [1, 1, 2], persisted
+    assert store.latest(1)["heartRate"] == 90
+    print("✅ Ingest, sweep and flush still work after hostile readings")
+
+
+def test_queue_follows_shown_vitals():
+    store = VitalsStore()
+    queue = TriageQueue(lambda size: [], lambda user_ids: [], render=lambda entries: json.dumps(entries, default=str), resync_seconds=0, vitals=store)
+    store.on_change = queue.vitals_changed
+    queue.remember_user({"id": 7, "name": "a"})
+    queue.add([1], [{"user_id": 7, "symptoms": "fever", "severity": 5, "risk": "LOW", "created_at": datetime.now()}])
+    version = queue.version
+    now = time.time()
+
+    # Readings that round to what is already shown, rejected resends and
+    # patients not in the queue leave the version (and /queue's ETag) alone
+    store.ingest([(7, {"t": now - 2, "heartRate": 80.2})], now=now)
+    version = queue.version
+    store.ingest([(7, {"t": now - 1, "heartRate": 79.9})], now=now)
+    store.ingest([(7, {"t": now - 1, "heartRate": 120})], now=now)
+    store.ingest([(8, {"t": now, "heartRate": 120})], now=now)
+    assert queue.version == version, (queue.version, version)
+    print("✅ Unchanged, resent and unqueued readings keep the queue version")
+
+    # A shown change is an ordinary queue change for the change feed
+    store.ingest([(7, {"t": now, "heartRate": 95})], now=now)
+    changes = queue.changes_since(version)
+    assert changes is not None and [entry["vitals"]["heartRate"] for entry in changes["upserts"]] == [95]
+    assert json.loads(queue.snapshot()[1])[0]["vitals"]["heartRate"] == 95
+    print("✅ New vitals reach /queue and the change feed")
+
+
+def test_series_query_parameters():
+    from app import app, vitals_store
+
+    client = app.test_client()
+    vitals_store.ingest([(4242, {"heartRate": 80})])
+
+    for query in ("step=nan", "step=inf", "seconds=nan", "seconds=-inf"):
+        resp = client.get(f"/vitals/4242?{query}")
+        assert resp.status_code == 400, (query, resp.status_code)
+    print("✅ Non-finite seconds / step answer 400")
+
+    resp = client.get("/vitals/4242?seconds=1e300&step=1e300")
+    assert resp.status_code == 200, resp.status_code
+    longest = app.config["VITALS_BUCKET_SECONDS"] * app.config["VITALS_HISTORY_BUCKETS"]
+    body = json.loads(resp.get_data())
+    assert body["seconds"] == longest and body["step"] <= longest, body
+    assert body["latest"]["heartRate"] == 80
+    print("✅ Huge seconds / step are clamped to the history kept")
@@ -1,44 +1,364 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+
 import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from inference import LinearTextModel, SklearnScorer, predict_risk
+from knowledge_base import MODEL_MANIFEST
+from result_cache import normalize_text
+
+# ================= TRAIN RISK MODEL =================
+# Trains the risk model the /triage fallback tier uses, writes it as a
+# versioned artifact and, if it is fast enough, promotes it to the files the
+# server loads (risk_model.pkl / vectorizer.pkl, hot-reloaded when they change):
+#
+#   python train_model.py                                  # TF-IDF + logistic regression
+#   python train_model.py --data corpus.csv --vectorizer hashing --chunksize 100000
+#   python train_model.py --max-single-ms 2 --no-promote
+#
+# The corpus is read in chunks of --chunksize rows. "tfidf" keeps only the
+# text/risk columns in memory and caps the vocabulary at --max-features;
+# "hashing" never holds more than one chunk: a fixed-size HashingVectorizer
+# feeds an SGD logistic regression through partial_fit.
+#
+# Accuracy comes from --folds-fold cross-validation, folds trained in parallel
+# on --jobs cores. Rows are assigned to folds by a hash of their text, so
+# duplicate phrases never sit on both sides of a split.
+#
+# Each run writes models/<version>/ with the pickles and metadata.json
+# (accuracy, single-row and batch inference latency, parameters). A model
+# whose latency is over budget is kept there, marked rejected, and never
+# promoted; the script then exits non-zero.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The model outputs these risk bands (see inference.RISK_SEVERITY)
+RISK_CLASSES = ["HIGH", "LOW", "MEDIUM"]
+
+
+# ================= CORPUS =================
+def fold_of(text, folds):
+    return zlib.crc32(text.encode("utf-8")) % folds
+
+
+# Yields (texts, risks) per chunk, normalized the way requests are; `select`
+# (fold -> bool) keeps only some folds
+def read_chunks(path, chunksize, folds=0, select=None):
+    reader = pd.read_csv(
+        path, encoding="latin1", chunksize=chunksize, dtype=str,
+        usecols=lambda column: column.strip().lower() in ("text", "risk")
+    )
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip().str.lower()
+        texts = []
+        risks = []
+        for text, risk in zip(chunk["text"], chunk["risk"]):
+            if not isinstance(text, str) or not isinstance(risk, str):
+                continue
+            text = normalize_text(text)
+            risk = risk.strip().upper()
+            if not text or not risk:
+                continue
+            if select is not None and not select(fold_of(text, folds)):
+                continue
+            texts.append(text)
+            risks.append(risk)
+        if texts:
+            yield texts, risks
+
+
+def scan(path, chunksize, sample_size):
+    counts = {}
+    sample = []
+    rows = 0
+    for texts, risks in read_chunks(path, chunksize):
+        rows += len(texts)
+        for risk in risks:
+            counts[risk] = counts.get(risk, 0) + 1
+        if len(sample) < sample_size:
+            sample.extend(texts[:sample_size - len(sample)])
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return rows, counts, sample, digest.hexdigest()
+
+
+# ================= MODELS =================
+def train_tfidf(args, select=None):
+    texts = []
+    risks = []
+    for chunk_texts, chunk_risks in read_chunks(args.data, args.chunksize, args.folds, select):
+        texts.extend(chunk_texts)
+        risks.extend(chunk_risks)
+
+    vectorizer = TfidfVectorizer(
+        lowercase=True,
+        stop_words="english",
+        ngram_range=(1, 2),
+        max_features=args.max_features or None
+    )
+    model = LogisticRegression(max_iter=1000)
+    model.fit(vectorizer.fit_transform(texts), risks)
+    return model, vectorizer
+
+
+def train_hashing(args, classes, select=None):
+    vectorizer = HashingVectorizer(
+        lowercase=True,
+        stop_words="english",
+        ngram_range=(1, 2),
+        n_features=2 ** args.hash_bits,
+        alternate_sign=False,
+        norm="l2"
+    )
+    model = SGDClassifier(loss="log_loss", alpha=args.alpha, random_state=args.seed)
+    shuffle = np.random.RandomState(args.seed)
+    for _ in range(args.epochs):
+        for texts, risks in read_chunks(args.data, args.chunksize, args.folds, select):
+            order = shuffle.permutation(len(texts))
+            X = vectorizer.transform([texts[i] for i in order])
+            model.partial_fit(X, [risks[i] for i in order], classes=classes)
+    return model, vectorizer
+
+
+def train(args, classes, select=None):
+    if args.vectorizer == "hashing":
+        return train_hashing(args, classes, select)
+    return train_tfidf(args, select)
+
+
+def evaluate(args, model, vectorizer, select):
+    correct = 0
+    total = 0
+    for texts, risks in read_chunks(args.data, args.chunksize, args.folds, select):
+        predicted = model.predict(vectorizer.transform(texts))
+        correct += sum(1 for want, got in zip(risks, predicted) if want == got)
+        total += len(texts)
+    return correct, total
+
+
+def run_fold(args, classes, fold):
+    started = time.perf_counter()
+    model, vectorizer = train(args, classes, select=lambda f: f != fold)
+    correct, total = evaluate(args, model, vectorizer, select=lambda f: f == fold)
+    return {
+        "fold": fold,
+        "rows": total,
+        "accuracy": correct / total if total else None,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def cross_validate(args, classes):
+    if args.folds < 2:
+        return None
+    folds = Parallel(n_jobs=args.jobs)(delayed(run_fold)(args, classes, fold) for fold in range(args.folds))
+    scored = [f for f in folds if f["accuracy"] is not None]
+    correct = sum(f["accuracy"] * f["rows"] for f in scored)
+    rows = sum(f["rows"] for f in scored)
+    return {
+        "folds": args.folds,
+        "accuracy": round(correct / rows, 4) if rows else None,
+        "accuracy_std": round(statistics.pstdev(f["accuracy"] for f in scored), 4) if scored else None,
+        "per_fold": folds
+    }
+
+
+# ================= LATENCY =================
+# Timed through predict_risk, the call the server makes, on both scorers the
+# server may use: the pickles (SklearnScorer) and, for TF-IDF models, the
+# compiled knowledge base (LinearTextModel, see build_kb.py)
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure_latency(scorer, texts, runs, batch_size):
+    batch = [texts[i % len(texts)] for i in range(batch_size)]
+    predict_risk(scorer, batch)                                   # warm up
+
+    single = []
+    for i in range(runs):
+        text = texts[i % len(texts)]
+        started = time.perf_counter()
+        predict_risk(scorer, [text])
+        single.append((time.perf_counter() - started) * 1000.0)
+
+    batched = []
+    for _ in range(max(5, runs // 20)):
+        started = time.perf_counter()
+        predict_risk(scorer, batch)
+        batched.append((time.perf_counter() - started) * 1000.0)
+
+    batch_ms = statistics.median(batched)
+    return {
+        "single_ms_p50": round(statistics.median(single), 4),
+        "single_ms_p99": round(percentile(single, 0.99), 4),
+        "batch_size": batch_size,
+        "batch_ms_p50": round(batch_ms, 4),
+        "batch_ms_per_row": round(batch_ms / batch_size, 4)
+    }
+
+
+def serving_scorers(model, vectorizer):
+    scorers = {"sources": SklearnScorer(model, vectorizer)}
+    if isinstance(vectorizer, TfidfVectorizer):
+        from build_kb import export_model
+        scorers["compiled"] = LinearTextModel(**export_model(model, vectorizer))
+    return scorers
+
+
+# Single rows are gated on p99 (one /triage message), batches on the median
+def over_budget(latency, args):
+    reasons = []
+    for name, measured in latency.items():
+        if args.max_single_ms and measured["single_ms_p99"] > args.max_single_ms:
+            reasons.append(f"{name}: single-row p99 {measured['single_ms_p99']} ms > {args.max_single_ms} ms")
+        if args.max_batch_ms and measured["batch_ms_p50"] > args.max_batch_ms:
+            reasons.append(f"{name}: batch of {measured['batch_size']} {measured['batch_ms_p50']} ms > {args.max_batch_ms} ms")
+    return reasons
+
+
+# ================= ARTIFACTS =================
+def save_version(version_dir, model, vectorizer, metadata):
+    os.makedirs(version_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(version_dir, "risk_model.pkl"))
+    joblib.dump(vectorizer, os.path.join(version_dir, "vectorizer.pkl"))
+    write_metadata(version_dir, metadata)
+
+
+def write_metadata(version_dir, metadata):
+    with open(os.path.join(version_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def file_sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+# Each pickle is copied next to the target and renamed into place, so the
+# hot-reload watcher never reads a half-written file. The metadata goes last
+# as MODEL_MANIFEST, naming both pickles by digest: until it is in place the
+# server refuses the new pair (see knowledge_base.check_manifest) and keeps
+# serving the old version.
+def promote(version_dir, target_dir):
+    files = {}
+    for name in ("vectorizer.pkl", "risk_model.pkl"):
+        source = os.path.join(version_dir, name)
+        target = os.path.join(target_dir, name)
+        files[name] = file_sha1(source)
+        shutil.copy2(source, target + ".tmp")
+        os.replace(target + ".tmp", target)
+
+    with open(os.path.join(version_dir, "metadata.json")) as f:
+        metadata = json.load(f)
+    metadata["files"] = files
+    manifest = os.path.join(target_dir, MODEL_MANIFEST)
+    with open(manifest + ".tmp", "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(manifest + ".tmp", manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the triage risk model")
+    parser.add_argument("--data", default=os.path.join(BASE_DIR, "training_data.csv"), help="CSV with text and risk columns")
+    parser.add_argument("--models-dir", default=os.path.join(BASE_DIR, "models"), help="where versioned artifacts are kept")
+    parser.add_argument("--target-dir", default=BASE_DIR, help="directory the server loads the model from")
+    parser.add_argument("--no-promote", action="store_true", help="only write the versioned artifact")
+    parser.add_argument("--vectorizer", choices=["tfidf", "hashing"], default="tfidf")
+    parser.add_argument("--chunksize", type=int, default=50000, help="CSV rows read at a time")
+    parser.add_argument("--max-features", type=int, default=50000, help="tfidf vocabulary cap (0 = unbounded)")
+    parser.add_argument("--hash-bits", type=int, default=18, help="hashing: 2**bits feature columns")
+    parser.add_argument("--epochs", type=int, default=5, help="hashing: passes over the corpus")
+    parser.add_argument("--alpha", type=float, default=1e-5, help="hashing: SGD regularization")
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds (0 = skip)")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel folds (-1 = all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-runs", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-single-ms", type=float, default=10.0, help="reject above this single-row p99 (0 = no limit)")
+    parser.add_argument("--max-batch-ms", type=float, default=100.0, help="reject above this median batch time (0 = no limit)")
+    args = parser.parse_args()
+
+    rows, class_counts, sample, data_sha1 = scan(args.data, args.chunksize, args.batch_size)
+    if not rows:
+        raise SystemExit(f"❌ No labelled rows in {args.data}")
+    classes = sorted(set(RISK_CLASSES) | set(class_counts))
+    print(f"📄 {rows} rows from {args.data}: " + ", ".join(f"{k} {v}" for k, v in sorted(class_counts.items())))
+
+    started = time.perf_counter()
+    cv = cross_validate(args, classes)
+    cv_seconds = time.perf_counter() - started
+    if cv is not None:
+        print(f"🧪 {cv['folds']}-fold accuracy {cv['accuracy']} (±{cv['accuracy_std']}) in {cv_seconds:.1f} s")
+
+    started = time.perf_counter()
+    model, vectorizer = train(args, classes)
+    train_seconds = time.perf_counter() - started
+
+    latency = {
+        name: measure_latency(scorer, sample, args.latency_runs, args.batch_size)
+        for name, scorer in serving_scorers(model, vectorizer).items()
+    }
+    for name, measured in latency.items():
+        print(f"⏱️  {name}: single p50 {measured['single_ms_p50']} ms / p99 {measured['single_ms_p99']} ms, "
+              f"batch of {measured['batch_size']} {measured['batch_ms_p50']} ms")
+    rejected = over_budget(latency, args)
+
+    created = datetime.now(timezone.utc)
+    version = f"{created:%Y%m%d-%H%M%S}-{data_sha1[:8]}"
+    version_dir = os.path.join(args.models_dir, version)
+    metadata = {
+        "version": version,
+        "created_at": created.isoformat(timespec="seconds"),
+        "status": "rejected" if rejected else "accepted",
+        "rejected_because": rejected,
+        "data": {"path": os.path.abspath(args.data), "sha1": data_sha1, "rows": rows, "classes": class_counts},
+        "vectorizer": args.vectorizer,
+        "features": len(vectorizer.vocabulary_) if hasattr(vectorizer, "vocabulary_") else vectorizer.n_features,
+        "params": {k: v for k, v in vars(args).items() if k not in ("data", "models_dir", "target_dir")},
+        "cross_validation": cv,
+        "train_seconds": round(train_seconds, 3),
+        "latency": latency,
+        "sklearn": sklearn.__version__
+    }
+    save_version(version_dir, model, vectorizer, metadata)
+    print(f"📦 Model {version} written to {version_dir}")
+
+    if rejected:
+        for reason in rejected:
+            print(f"❌ Over latency budget: {reason}")
+        print("❌ Not promoted")
+        sys.exit(1)
+
+    if args.no_promote:
+        return
+    promote(version_dir, args.target_dir)
+    metadata["promoted_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    write_metadata(version_dir, metadata)
+    print(f"✅ Promoted to {args.target_dir}")
+    if args.vectorizer == "tfidf":
+        print("   Re-run build_kb.py to compile it; until then the server loads the pickles")
+    else:
+        print("   Hashing models are served from the pickles (build_kb.py compiles TF-IDF models only)")
+
 
-# =============================
-# LOAD DATASET
-# =============================
-training_data = pd.read_csv(
-    os.path.join(BASE_DIR, "training_data.csv"),
-    encoding="utf-8"
-)
-training_data.columns = training_data.columns.str.strip().str.lower()
-
-
-
-X = data["text"]
-y = data["risk"]   # LOW / MEDIUM / HIGH
-
-# =============================
-# TEXT VECTORIZATION
-# =============================
-vectorizer = TfidfVectorizer(
-    lowercase=True,
-    stop_words="english",
-    ngram_range=(1,2)
-)
-
-X_vectorized = vectorizer.fit_transform(X)
-
-# =============================
-# TRAIN MODEL
-# =============================
-model = LogisticRegression(max_iter=1000)
-model.fit(X_vectorized, y)
-
-# =============================
-# SAVE MODEL
-# =============================
-joblib.dump(model, "risk_model.pkl")
-joblib.dump(vectorizer, "vectorizer.pkl")
-
-print("✅ ML Model trained successfully")
-print("📦 Files created: risk_model.pkl, vectorizer.pkl")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+import bisect
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+# ================= TRIAGE QUEUE =================
+# In-process copy of the staff queue. It holds the `size` most recent triage
+# results, kept sorted by clinical priority (risk, then severity, then
+# arrival), and is updated as history rows are written instead of re-running
+# the history/users JOIN on every poll. Each change bumps `version`; the
+# rendered JSON body is cached per version so unchanged polls cost a dict
+# read (and a 304 when the client sends the current ETag).
+#
+# Rows written by other processes only show up at the next resync from the
+# database (every `resync_seconds`, 0 disables it).
+#
+# Every version also records which entries it touched, so subscribers can ask
+# for just the changes since the version they last saw (changes_since) and
+# wait for the next one (wait_for_change, or add_listener for event loops).
+#
+# Each entry is served with the patient's latest vitals from `vitals` (a
+# VitalsStore, see vitals.py), read from memory when the body is rendered.
+# When a patient's shown vitals change, vitals_changed() bumps `version` for
+# their entries like any other change.
+
+RISK_RANK = {"high": 0, "medium": 1, "low": 2}
+
+# For patients with no readings yet
+NO_VITALS = {"heartRate": None, "temperature": None, "bloodPressure": None, "oxygenLevel": None}
+
+
+def parse_severity(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def queue_entry(history_id, user, symptoms, severity, risk, created_at):
+    risk = risk.lower().strip() if risk else "medium"
+    return {
+        "id": str(history_id),
+        "user_id": user.get("id"),
+        "name": user.get("name"),
+        # Use real age/gender if available, otherwise fallback to defaults
+        "age": user.get("age") or 30,
+        "gender": user.get("gender") or "Unknown",
+        "severity": risk,
+        "severity_score": parse_severity(severity),
+        # The history table stores symptoms as a comma separated string
+        "symptoms": [s.strip() for s in symptoms.split(",")] if symptoms else [],
+        "timestamp": created_at
+    }
+
+
+def priority_key(entry, arrival):
+    return (RISK_RANK.get(entry["severity"], 1), -entry["severity_score"], arrival)
+
+
+class TriageQueue:
+    def __init__(self, load_recent, load_users, render, size=50, resync_seconds=30, profile_cache_size=10000, change_log_size=1000, vitals=None):
+        self.load_recent = load_recent
+        self.load_users = load_users
+        self.render = render
+        self.vitals = vitals
+        self.size = max(1, int(size))
+        self.resync_seconds = float(resync_seconds)
+        self.profile_cache_size = profile_cache_size
+
+        # Versions restart at 0 in a new process; the generation tells clients
+        self.generation = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._change_log = deque(maxlen=change_log_size)  # (version, touched ids or None for a reset)
+        self._listeners = []
+        self._resync_lock = threading.Lock()
+        self._entries = {}        # history id -> (arrival, entry)
+        self._order = []          # sorted [(priority key, history id)]
+        self._arrivals = []       # sorted [(arrival, history id)], oldest first
+        self._profiles = OrderedDict()
+        self._loaded_at = None
+        self._rendered = (None, None)
+
+    # ================= PROFILES =================
+    def remember_user(self, user):
+        if not user or user.get("id") is None:
+            return
+        with self._lock:
+            self._remember(user)
+
+    def _remember(self, user):
+        self._profiles[user["id"]] = {
+            "id": user["id"], "name": user.get("name"), "age": user.get("age"), "gender": user.get("gender")
+        }
+        self._profiles.move_to_end(user["id"])
+        while len(self._profiles) > self.profile_cache_size:
+            self._profiles.popitem(last=False)
+
+    def _profiles_for(self, user_ids):
+        with self._lock:
+            missing = [uid for uid in set(user_ids) if uid not in self._profiles]
+        if missing:
+            users = self.load_users(missing)
+            with self._lock:
+                for user in users:
+                    self._remember(user)
+        with self._lock:
+            return {uid: self._profiles.get(uid, {"id": uid}) for uid in user_ids}
+
+    # ================= UPDATES =================
+    # records: dicts with user_id, symptoms, severity, risk, created_at
+    def add(self, history_ids, records):
+        profiles = self._profiles_for([r["user_id"] for r in records])
+        with self._lock:
+            touched = set()
+            for history_id, record in zip(history_ids, records):
+                entry = queue_entry(
+                    history_id, profiles[record["user_id"]], record["symptoms"],
+                    record["severity"], record["risk"], record["created_at"]
+                )
+                self._insert(history_id, (record["created_at"], history_id), entry)
+                touched.add(history_id)
+            touched.update(self._trim())
+            self._bump(touched)
+        self._notify_listeners()
+
+    # VitalsStore.on_change: the patients' entries count as changed, so
+    # pollers, SSE and long-poll clients all pick up the new readings
+    def vitals_changed(self, user_ids):
+        user_ids = set(user_ids)
+        with self._lock:
+            touched = {history_id for history_id, (_, entry) in self._entries.items() if entry["user_id"] in user_ids}
+            if not touched:
+                return
+            self._bump(touched)
+        self._notify_listeners()
+
+    def _bump(self, touched):
+        self.version += 1
+        self._change_log.append((self.version, touched))
+        self._changed.notify_all()
+
+    def _notify_listeners(self):
+        for listener in list(self._listeners):
+            try:
+                listener(self.version)
+            except Exception as e:
+                print(f"ERROR: Queue listener failed: {e}")
+
+    # Called from whichever thread changed the queue; must not block
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _insert(self, history_id, arrival, entry):
+        if history_id in self._entries:
+            self._remove(history_id)
+        self._entries[history_id] = (arrival, entry)
+        bisect.insort(self._order, (priority_key(entry, arrival), history_id))
+        bisect.insort(self._arrivals, (arrival, history_id))
+
+    def _remove(self, history_id):
+        arrival, entry = self._entries.pop(history_id)
+        del self._order[bisect.bisect_left(self._order, (priority_key(entry, arrival), history_id))]
+        del self._arrivals[bisect.bisect_left(self._arrivals, (arrival, history_id))]
+
+    def _trim(self):
+        removed = []
+        while len(self._arrivals) > self.size:
+            removed.append(self._arrivals[0][1])
+            self._remove(removed[-1])
+        return removed
+
+    # ================= LOADING =================
+    def resync(self):
+        rows = self.load_recent(self.size)
+        changed = False
+        with self._lock:
+            fresh = {}
+            for row in rows:
+                user = {"id": row.get("user_id"), "name": row["name"], "age": row.get("age"), "gender": row.get("gender")}
+                if user["id"] is not None:
+                    self._remember(user)
+                fresh[row["id"]] = queue_entry(
+                    row["id"], user, row["symptoms"], row["severity"], row["risk"], row["created_at"]
+                )
+
+            current = {hid: entry for hid, (_, entry) in self._entries.items()}
+            if fresh != current:
+                self._entries, self._order, self._arrivals = {}, [], []
+                for history_id, entry in fresh.items():
+                    self._insert(history_id, (entry["timestamp"], history_id), entry)
+                self._trim()
+                self._bump(None)
+                changed = True
+            self._loaded_at = time.monotonic()
+        if changed:
+            self._notify_listeners()
+
+    def ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.resync_seconds and time.monotonic() - loaded_at > self.resync_seconds):
+            # One caller reloads, concurrent pollers keep serving the current copy
+            if not self._resync_lock.acquire(blocking=loaded_at is None):
+                return
+            try:
+                if self._loaded_at == loaded_at:
+                    self.resync()
+            finally:
+                self._resync_lock.release()
+
+    # ================= READS =================
+    # Entries as served: copies with the latest vitals added
+    def _with_vitals(self, entries):
+        latest = self.vitals.latest_many([entry["user_id"] for entry in entries]) if self.vitals is not None else {}
+        return [dict(entry, vitals=latest.get(entry["user_id"]) or NO_VITALS) for entry in entries]
+
+    def entries(self):
+        with self._lock:
+            entries = [self._entries[history_id][1] for _, history_id in self._order]
+        return self._with_vitals(entries)
+
+    # Vitals are read after the version, and vitals_changed() bumps it after
+    # they change, so a body is never older than the version it is cached
+    # under
+    def snapshot(self):
+        version, body = self._rendered
+        if version == self.version:
+            return version, body
+        with self._lock:
+            version = self.version
+            entries = [self._entries[history_id][1] for _, history_id in self._order]
+        body = self.render(self._with_vitals(entries))
+        self._rendered = (version, body)
+        return version, body
+
+    # ================= CHANGE FEED =================
+    # Returns None when nothing changed after `since`. Otherwise `upserts`
+    # holds the current copy of every entry added or changed since then,
+    # `removed` the ids that left the queue and `order` all ids in priority
+    # order. When the log no longer reaches back to `since` (or the queue was
+    # reloaded) the full queue is sent with reset=True.
+    def changes_since(self, since, generation=None):
+        with self._lock:
+            stale = generation not in (None, self.generation) or since is None or since > self.version
+            if not stale and since == self.version:
+                return None
+
+            touched = set()
+            if not stale:
+                if not self._change_log or self._change_log[0][0] > since + 1:
+                    stale = True
+                else:
+                    for version, ids in self._change_log:
+                        if version <= since:
+                            continue
+                        if ids is None:
+                            stale = True
+                            break
+                        touched.update(ids)
+
+            order = [history_id for _, history_id in self._order]
+            if stale:
+                upserts = [self._entries[history_id][1] for history_id in order]
+                removed = []
+            else:
+                upserts = [self._entries[history_id][1] for history_id in order if history_id in touched]
+                removed = [str(history_id) for history_id in touched if history_id not in self._entries]
+
+            return {
+                "generation": self.generation,
+                "version": self.version,
+                "reset": stale,
+                "upserts": self._with_vitals(upserts),
+                "removed": removed,
+                "order": [str(history_id) for history_id in order]
+            }
+
+    def wait_for_change(self, since, timeout):
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != since, timeout)
+            return self.version
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "size": self.size,
+            "listeners": len(self._listeners)
+        }
@@ -0,0 +1,369 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+# ================= VITALS =================
+# Bedside readings, kept in memory per patient:
+#
+#   raw ring      the last `buffer_samples` readings, as sent
+#   bucket ring   per-`bucket_seconds` means (one per minute by default) for
+#                 the last `history_buckets` buckets
+#
+# Both are fixed-size NumPy arrays written round-robin, so memory per patient
+# is fixed and a batch is stored with a few slice assignments. Each bucket is
+# handed to `persist` (rows for the vitals table, see Storage.save_vitals) when
+# it closes: when a later reading arrives, or at the next sweep once it has
+# been quiet for a bucket. /queue reads latest_many(); /vitals/<user_id> reads
+# series(). Neither touches the database. `on_change(user_ids)` hears about
+# patients whose shown (rounded) latest values changed, so the queue only
+# changes when what it displays does.
+#
+# Readings at or before a patient's newest one are dropped, so a device can
+# resend a batch after a timeout without double counting. The least recently
+# updated patients are evicted past `max_patients`.
+
+# API name -> plausible range; values outside it are dropped as sensor noise.
+# bloodPressure comes in as "120/80" and is kept as two channels.
+CHANNELS = (
+    ("heartRate", 20.0, 250.0),
+    ("temperature", 80.0, 115.0),      # °F, like the frontend
+    ("systolic", 50.0, 260.0),
+    ("diastolic", 30.0, 160.0),
+    ("oxygenLevel", 50.0, 100.0)
+)
+CHANNEL_NAMES = tuple(name for name, _, _ in CHANNELS)
+LOW = np.array([low for _, low, _ in CHANNELS], dtype=np.float32)
+HIGH = np.array([high for _, _, high in CHANNELS], dtype=np.float32)
+ROUNDING = {"heartRate": 0, "temperature": 1, "systolic": 0, "diastolic": 0, "oxygenLevel": 0}
+SHOWN_SCALE = np.array([10.0 ** ROUNDING[name] for name in CHANNEL_NAMES])
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _blood_pressure(value):
+    if isinstance(value, str) and "/" in value:
+        systolic, _, diastolic = value.partition("/")
+        return _number(systolic), _number(diastolic)
+    return np.nan, np.nan
+
+
+# [(user_id, reading dict)] for a whole request -> (user ids, times, values),
+# sorted by patient then time with one reading per patient and instant, and
+# NaN for anything missing or implausible. Readings without a usable time or
+# value, or timed before `oldest` or more than a minute after `now`, are left
+# out. One pass over the batch, whatever the patient count.
+def parse_readings(readings, now, oldest):
+    users = []
+    times = []
+    rows = []
+    for user_id, reading in readings:
+        if not isinstance(reading, dict):
+            continue
+        systolic, diastolic = _blood_pressure(reading.get("bloodPressure"))
+        users.append(user_id)
+        times.append(_number(reading.get("t", now)))
+        rows.append((
+            _number(reading.get("heartRate")),
+            _number(reading.get("temperature")),
+            _number(reading.get("systolic", systolic)),
+            _number(reading.get("diastolic", diastolic)),
+            _number(reading.get("oxygenLevel"))
+        ))
+    users = np.array(users, dtype=np.int64)
+    times = np.array(times, dtype=np.float64)
+    values = np.array(rows, dtype=np.float32).reshape(-1, len(CHANNELS))
+    with np.errstate(invalid="ignore"):
+        values[(values < LOW) | (values > HIGH)] = np.nan
+
+    usable = (times >= oldest) & (times <= now + 60) & ~np.isnan(values).all(axis=1)
+    order = np.flatnonzero(usable)
+    order = order[np.lexsort((times[order], users[order]))]
+    users, times, values = users[order], times[order], values[order]
+    distinct = np.ones(len(times), dtype=bool)
+    distinct[1:] = (users[1:] != users[:-1]) | (times[1:] > times[:-1])
+    return users[distinct], times[distinct], values[distinct]
+
+
+# Sorted keys -> (first, end) index pairs of each run of equal keys
+def runs(keys):
+    if not len(keys):
+        return []
+    starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    return zip(np.concatenate(([0], starts)).tolist(), np.concatenate((starts, [len(keys)])).tolist())
+
+
+def _value(name, value):
+    if value != value:
+        return None
+    digits = ROUNDING[name]
+    return round(float(value), digits) if digits else int(round(float(value)))
+
+
+# Channel vector -> the shape the frontend uses for patient.vitals
+def vitals_dict(values):
+    named = {name: _value(name, value) for name, value in zip(CHANNEL_NAMES, values.tolist())}
+    systolic, diastolic = named.pop("systolic"), named.pop("diastolic")
+    named["bloodPressure"] = f"{systolic}/{diastolic}" if systolic is not None and diastolic is not None else None
+    return named
+
+
+# Channel vector as displayed (rounded like vitals_dict), for comparisons
+def shown(values):
+    return np.round(values * SHOWN_SCALE)
+
+
+# ================= RING BUFFER =================
+class Ring:
+    __slots__ = ("times", "values", "end", "count")
+
+    def __init__(self, capacity, channels):
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity, channels), dtype=np.float32)
+        self.end = 0
+        self.count = 0
+
+    def extend(self, times, values):
+        capacity = len(self.times)
+        if len(times) > capacity:
+            times, values = times[-capacity:], values[-capacity:]
+        slots = (self.end + np.arange(len(times))) % capacity
+        self.times[slots] = times
+        self.values[slots] = values
+        self.end = (self.end + len(times)) % capacity
+        self.count = min(capacity, self.count + len(times))
+
+    # Oldest first, from `since` on
+    def window(self, since):
+        capacity = len(self.times)
+        slots = (self.end - self.count + np.arange(self.count)) % capacity
+        times = self.times[slots]
+        first = np.searchsorted(times, since)
+        return times[first:], self.values[slots[first:]]
+
+
+# Mean per `step` seconds (NaNs ignored) -> (bucket starts, means)
+def downsample(times, values, step):
+    if not len(times):
+        return times, values
+    buckets = np.floor(times / step)
+    starts = np.array([first for first, _ in runs(buckets)], dtype=np.intp)
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(present, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (sums / counts).astype(np.float32)
+    return buckets[starts] * step, means
+
+
+class PatientVitals:
+    __slots__ = ("raw", "buckets", "latest", "latest_times", "newest", "bucket_start", "sums", "counts")
+
+    def __init__(self, buffer_samples, history_buckets):
+        channels = len(CHANNELS)
+        self.raw = Ring(buffer_samples, channels)
+        self.buckets = Ring(history_buckets, channels)
+        self.latest = np.full(channels, np.nan, dtype=np.float32)
+        self.latest_times = np.zeros(channels)
+        self.newest = -np.inf
+        # The bucket still filling up
+        self.bucket_start = None
+        self.sums = np.zeros(channels)
+        self.counts = np.zeros(channels, dtype=np.int64)
+
+
+class VitalsStore:
+    def __init__(self, persist=None, buffer_samples=600, bucket_seconds=60, history_buckets=720, max_patients=2000):
+        self.persist = persist
+        self.on_change = None
+        self.buffer_samples = max(1, int(buffer_samples))
+        self.bucket_seconds = max(1.0, float(bucket_seconds))
+        self.history_buckets = max(1, int(history_buckets))
+        self.max_patients = max(1, int(max_patients))
+
+        self._patients = OrderedDict()   # user id -> PatientVitals, least recently updated first
+        self._lock = threading.Lock()
+        self._swept_at = time.time()
+
+        self._accepted = 0
+        self._rejected = 0
+        self._buckets_closed = 0
+        self._evicted = 0
+
+    # ================= INGEST =================
+    # readings: [(user_id, reading dict)], user ids being ints; returns
+    # (accepted, rejected)
+    def ingest(self, readings, now=None):
+        now = time.time() if now is None else now
+        # Nothing older than the bucket ring reaches back, so every bucket
+        # start stays a real date
+        users, times, values = parse_readings(readings, now, now - self.bucket_seconds * self.history_buckets)
+        rejected = len(readings) - len(times)
+
+        closed = []
+        changed = []
+        accepted = 0
+        with self._lock:
+            for first, end in runs(users):
+                user_id = int(users[first])
+                patient = self._patient(user_id, closed)
+                # Resent or out-of-order readings; the batch is sorted, so
+                # everything from `fresh` on is newer
+                fresh = first + int(np.searchsorted(times[first:end], patient.newest, side="right"))
+                rejected += fresh - first
+                if fresh == end:
+                    continue
+                accepted += end - fresh
+                before = shown(patient.latest)
+                self._append(user_id, patient, times[fresh:end], values[fresh:end], closed)
+                if not np.array_equal(before, shown(patient.latest), equal_nan=True):
+                    changed.append(user_id)
+            if now - self._swept_at >= self.bucket_seconds:
+                self._sweep(now, closed)
+            self._accepted += accepted
+            self._rejected += rejected
+            self._buckets_closed += len(closed)
+
+        if closed and self.persist is not None:
+            self.persist(closed)
+        if changed and self.on_change is not None:
+            self.on_change(changed)
+        return accepted, rejected
+
+    def _patient(self, user_id, closed):
+        patient = self._patients.get(user_id)
+        if patient is None:
+            patient = self._patients[user_id] = PatientVitals(self.buffer_samples, self.history_buckets)
+            while len(self._patients) > self.max_patients:
+                evicted_id, evicted = self._patients.popitem(last=False)
+                self._close_bucket(evicted_id, evicted, closed)
+                self._evicted += 1
+        else:
+            self._patients.move_to_end(user_id)
+        return patient
+
+    def _append(self, user_id, patient, times, values, closed):
+        patient.raw.extend(times, values)
+        patient.newest = float(times[-1])
+
+        present = ~np.isnan(values)
+        seen = present.any(axis=0)
+        # Last present value per channel
+        last = len(values) - 1 - np.argmax(present[::-1], axis=0)
+        patient.latest[seen] = values[last[seen], seen]
+        patient.latest_times[seen] = times[last[seen]]
+
+        # Fold into per-bucket means, closing buckets as readings move past them
+        buckets = np.floor(times / self.bucket_seconds) * self.bucket_seconds
+        for start, end in runs(buckets):
+            bucket = float(buckets[start])
+            if patient.bucket_start != bucket:
+                self._close_bucket(user_id, patient, closed)
+                patient.bucket_start = bucket
+            patient.sums += np.where(present[start:end], values[start:end], 0.0).sum(axis=0)
+            patient.counts += present[start:end].sum(axis=0)
+
+    def _close_bucket(self, user_id, patient, closed):
+        if patient.bucket_start is None:
+            return
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (patient.sums / patient.counts).astype(np.float32)
+        patient.buckets.extend(np.array([patient.bucket_start]), means[np.newaxis])
+        closed.append(
+            (user_id, datetime.fromtimestamp(patient.bucket_start))
+            + tuple(_value(name, value) for name, value in zip(CHANNEL_NAMES, means.tolist()))
+            + (int(patient.counts.max()),)
+        )
+        patient.bucket_start = None
+        patient.sums[:] = 0.0
+        patient.counts[:] = 0
+
+    # Closes buckets whose patients went quiet; least recently updated first,
+    # so it stops at the first patient heard from recently
+    def _sweep(self, now, closed):
+        self._swept_at = now
+        cutoff = now - 2 * self.bucket_seconds
+        for user_id, patient in self._patients.items():
+            if patient.newest > cutoff:
+                break
+            self._close_bucket(user_id, patient, closed)
+
+    # Persists every open bucket (at shutdown)
+    def flush(self):
+        closed = []
+        with self._lock:
+            for user_id, patient in self._patients.items():
+                self._close_bucket(user_id, patient, closed)
+            self._buckets_closed += len(closed)
+        if closed and self.persist is not None:
+            self.persist(closed)
+
+    # ================= READS =================
+    # Latest vitals plus when the newest of them was taken, or None
+    def latest(self, user_id):
+        with self._lock:
+            patient = self._patients.get(user_id)
+            if patient is None:
+                return None
+            latest = vitals_dict(patient.latest)
+            updated_at = patient.latest_times.max()
+        latest["updatedAt"] = datetime.fromtimestamp(updated_at).isoformat(" ", "seconds")
+        return latest
+
+    # {user_id: latest vitals} for those that have any, under one lock
+    def latest_many(self, user_ids):
+        found = {}
+        with self._lock:
+            for user_id in user_ids:
+                patient = self._patients.get(user_id)
+                if patient is not None:
+                    found[user_id] = vitals_dict(patient.latest)
+        return found
+
+    # Points (oldest first) covering the last `seconds`, averaged per `step`.
+    # Steps shorter than a bucket come from the raw ring (which may not reach
+    # back the whole window); longer ones from the bucket ring plus the
+    # bucket still filling up.
+    def series(self, user_id, seconds, step, now=None):
+        now = time.time() if now is None else now
+        since = now - seconds
+        with self._lock:
+            patient = self._patients.get(user_id)
+            if patient is None:
+                return None
+            if step < self.bucket_seconds:
+                times, values = patient.raw.window(since)
+            else:
+                step = self.bucket_seconds * max(1, round(step / self.bucket_seconds))
+                times, values = patient.buckets.window(since - self.bucket_seconds)
+                if patient.bucket_start is not None:
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        current = (patient.sums / patient.counts).astype(np.float32)
+                    times = np.r_[times, patient.bucket_start]
+                    values = np.vstack([values, current])
+
+        starts, means = downsample(times, values, step)
+        points = []
+        for t, row in zip(starts.tolist(), means):
+            point = vitals_dict(row)
+            point["t"] = t
+            points.append(point)
+        return {"step": step, "points": points}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "patients": len(self._patients),
+                "max_patients": self.max_patients,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "buckets_closed": self._buckets_closed,
+                "evicted": self._evicted
+            }
@@ -0,0 +1,102 @@
+import argparse
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+
+# ================= VITALS SIMULATOR =================
+# Stands in for bedside devices during local development: sends a random walk
+# of vitals for a range of user ids to POST /vitals, one batched request per
+# `--batch-seconds`, e.g.
+#
+#   python vitals_simulator.py --users 1-20 --rate 1 --batch-seconds 5
+#
+# The queue (/queue) then shows these readings for any of the users with a
+# triage result waiting.
+
+# (start, step, low, high) per field; steps are the most it moves per reading
+WALK = {
+    "heartRate": (80.0, 2.0, 45.0, 160.0),
+    "temperature": (98.6, 0.05, 96.0, 104.0),
+    "systolic": (120.0, 1.5, 90.0, 180.0),
+    "diastolic": (80.0, 1.0, 55.0, 110.0),
+    "oxygenLevel": (97.0, 0.3, 85.0, 100.0)
+}
+
+
+def parse_users(value):
+    first, _, last = value.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+class Patient:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.state = {name: start + random.uniform(-5, 5) * step for name, (start, step, _, _) in WALK.items()}
+
+    def reading(self, t):
+        for name, (_, step, low, high) in WALK.items():
+            self.state[name] = min(high, max(low, self.state[name] + random.uniform(-step, step)))
+        return {
+            "user_id": self.user_id,
+            "t": round(t, 3),
+            "heartRate": round(self.state["heartRate"]),
+            "temperature": round(self.state["temperature"], 1),
+            "bloodPressure": f"{round(self.state['systolic'])}/{round(self.state['diastolic'])}",
+            "oxygenLevel": round(self.state["oxygenLevel"])
+        }
+
+
+def send(url, readings):
+    body = json.dumps({"readings": readings}).encode()
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send simulated bedside vitals to POST /vitals")
+    parser.add_argument("--url", default="http://localhost:5000/vitals")
+    parser.add_argument("--users", default="1-10", help="user id or range of ids, e.g. 1-10")
+    parser.add_argument("--rate", type=float, default=1.0, help="readings per second per patient")
+    parser.add_argument("--batch-seconds", type=float, default=5.0, help="seconds of readings per request")
+    parser.add_argument("--duration", type=float, default=0, help="stop after this many seconds (default: run until Ctrl+C)")
+    args = parser.parse_args()
+
+    patients = [Patient(user_id) for user_id in parse_users(args.users)]
+    interval = 1.0 / max(args.rate, 0.001)
+    batch_seconds = max(args.batch_seconds, interval)
+    print(f"🩺 Sending vitals for {len(patients)} patients to {args.url} every {batch_seconds:g}s")
+
+    started = time.time()
+    sent_until = started
+    accepted = 0
+    try:
+        while not args.duration or time.time() - started < args.duration:
+            time.sleep(max(0.0, sent_until + batch_seconds - time.time()))
+            now = time.time()
+            readings = []
+            t = sent_until + interval
+            while t <= now:
+                readings.extend(patient.reading(t) for patient in patients)
+                t += interval
+            sent_until = t - interval
+            if not readings:
+                continue
+            try:
+                result = send(args.url, readings)
+            except (urllib.error.URLError, OSError) as e:
+                print(f"ERROR: Vitals upload failed: {e}")
+                continue
+            accepted += result.get("accepted", 0)
+            elapsed = time.time() - started
+            print(f"✅ {result.get('accepted', 0)} accepted, {result.get('rejected', 0)} rejected ({accepted / elapsed:,.0f} readings/s)")
+    except KeyboardInterrupt:
+        pass
+
+    print(f"✅ Sent {accepted:,} readings in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
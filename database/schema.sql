@@ -21,5 +21,31 @@ CREATE TABLE IF NOT EXISTS history (
     doctor VARCHAR(255),
     advice TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    -- Serves /history/<user_id> keyset pages without a filesort
+    INDEX idx_history_user_created (user_id, created_at, id)
+);
+
+-- Pre-aggregated triage counts per hour/day (see backend/rollups.py)
+CREATE TABLE IF NOT EXISTS triage_rollups (
+    granularity VARCHAR(8) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    dimension VARCHAR(16) NOT NULL,
+    label VARCHAR(255) NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, dimension, label)
+);
+
+-- Per-minute vitals means from bedside devices (see backend/vitals.py).
+-- No foreign key: devices may report before the patient's account exists.
+CREATE TABLE IF NOT EXISTS vitals (
+    user_id INT NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    heart_rate FLOAT,
+    temperature FLOAT,
+    systolic FLOAT,
+    diastolic FLOAT,
+    oxygen_level FLOAT,
+    samples INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, bucket_start)
 );
@@ -0,0 +1,51 @@
+-- SQLite version of schema.sql for local runs and load tests
+-- (STORAGE_BACKEND=sqlite). Applied automatically on startup.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    contact VARCHAR(50),
+    age INT,
+    gender VARCHAR(20),
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    symptoms TEXT,
+    severity VARCHAR(50),
+    risk VARCHAR(50),
+    doctor VARCHAR(255),
+    advice TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_history_user_created ON history (user_id, created_at, id);
+
+-- Pre-aggregated triage counts per hour/day (see backend/rollups.py)
+CREATE TABLE IF NOT EXISTS triage_rollups (
+    granularity VARCHAR(8) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    dimension VARCHAR(16) NOT NULL,
+    label VARCHAR(255) NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, dimension, label)
+);
+
+-- Per-minute vitals means from bedside devices (see backend/vitals.py).
+-- No foreign key: devices may report before the patient's account exists.
+CREATE TABLE IF NOT EXISTS vitals (
+    user_id INT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    heart_rate FLOAT,
+    temperature FLOAT,
+    systolic FLOAT,
+    diastolic FLOAT,
+    oxygen_level FLOAT,
+    samples INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, bucket_start)
+);
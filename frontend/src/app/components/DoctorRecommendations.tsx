@@ -6,7 +6,7 @@ interface Doctor {
   name: string;
   specialty?: string;
   specialization?: string; // Backend uses this
-  rating: number;
+  rating: number | null; // null when the directory has no rating
   availability: string;
   experience: number;
   matchScore: number;
@@ -82,10 +82,12 @@ export function DoctorRecommendations({ doctors }: DoctorRecommendationsProps) {
               )}
 
               <div className="flex items-center gap-4 text-xs text-white/60 border-t border-white/5 pt-2 mt-2">
-                <div className="flex items-center gap-1">
-                  <Star className="w-3 h-3 fill-yellow-400 text-yellow-400" />
-                  <span>{doctor.rating}</span>
-                </div>
+                {doctor.rating != null && (
+                  <div className="flex items-center gap-1">
+                    <Star className="w-3 h-3 fill-yellow-400 text-yellow-400" />
+                    <span>{doctor.rating}</span>
+                  </div>
+                )}
                 <div className="flex items-center gap-1">
                   <Award className="w-3 h-3" />
                   <span>{doctor.experience}y exp</span>
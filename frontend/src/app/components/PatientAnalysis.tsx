@@ -1,19 +1,22 @@
+import { useEffect, useState } from 'react';
 import { motion } from 'motion/react';
 import { Brain, AlertTriangle, TrendingUp, Activity, Clock, CheckCircle2 } from 'lucide-react';
 import { LineChart, Line, ResponsiveContainer } from 'recharts';
+import { api } from '../../services/api';
 
 interface Patient {
   id: string;
+  user_id?: number;
   name: string;
   age: number;
   gender: string;
   severity: 'critical' | 'high' | 'medium' | 'low';
   symptoms: string[];
   vitals: {
-    heartRate: number;
-    temperature: number;
-    bloodPressure: string;
-    oxygenLevel: number;
+    heartRate: number | null;
+    temperature: number | null;
+    bloodPressure: string | null;
+    oxygenLevel: number | null;
   };
 }
 
@@ -21,14 +24,21 @@ interface PatientAnalysisProps {
   patient: Patient;
 }
 
-const heartRateData = [
-  { time: '10m', value: 75 },
-  { time: '8m', value: 78 },
-  { time: '6m', value: 85 },
-  { time: '4m', value: 92 },
-  { time: '2m', value: 98 },
-  { time: 'now', value: 112 },
-];
+interface VitalsPoint {
+  t: number;
+  heartRate: number | null;
+}
+
+// Per-minute heart rate over the last 10 minutes, from GET /vitals/<user_id>
+function toHeartRateData(points: VitalsPoint[]) {
+  const now = Date.now() / 1000;
+  return points
+    .filter((point) => point.heartRate !== null)
+    .map((point) => {
+      const minutes = Math.round((now - point.t) / 60);
+      return { time: minutes > 0 ? `${minutes}m` : 'now', value: point.heartRate };
+    });
+}
 
 const severityConfig = {
   critical: { color: '#ff0064', label: 'Critical', priority: 'Immediate Attention Required' },
@@ -39,6 +49,26 @@ const severityConfig = {
 
 export function PatientAnalysis({ patient }: PatientAnalysisProps) {
   const config = severityConfig[patient.severity];
+  const [heartRateData, setHeartRateData] = useState<{ time: string; value: number | null }[]>([]);
+
+  useEffect(() => {
+    const userId = patient.user_id;
+    if (userId == null) {
+      setHeartRateData([]);
+      return;
+    }
+    const load = async () => {
+      try {
+        const vitals = await api.getVitals(userId);
+        setHeartRateData(vitals ? toHeartRateData(vitals.points) : []);
+      } catch (error) {
+        console.error('Failed to load vitals', error);
+      }
+    };
+    load();
+    const interval = setInterval(load, 30000);
+    return () => clearInterval(interval);
+  }, [patient.user_id]);
 
   const aiInsights = [
     {
@@ -119,7 +149,7 @@ export function PatientAnalysis({ patient }: PatientAnalysisProps) {
             <TrendingUp className="w-4 h-4 text-[#ff0064]" />
             <h4 className="text-white">Heart Rate Trend</h4>
           </div>
-          <span className="text-[#ff0064] text-sm font-mono">{patient.vitals.heartRate} BPM</span>
+          <span className="text-[#ff0064] text-sm font-mono">{patient.vitals.heartRate ?? '--'} BPM</span>
         </div>
         
         <div style={{ width: '100%', height: '96px' }}>
@@ -202,19 +232,19 @@ export function PatientAnalysis({ patient }: PatientAnalysisProps) {
         <div className="grid grid-cols-2 gap-3">
           <div className="bg-white/5 rounded-lg p-3">
             <p className="text-white/60 text-xs mb-1">Heart Rate</p>
-            <p className="text-white text-lg">{patient.vitals.heartRate} <span className="text-sm text-white/60">BPM</span></p>
+            <p className="text-white text-lg">{patient.vitals.heartRate ?? '--'} <span className="text-sm text-white/60">BPM</span></p>
           </div>
           <div className="bg-white/5 rounded-lg p-3">
             <p className="text-white/60 text-xs mb-1">Temperature</p>
-            <p className="text-white text-lg">{patient.vitals.temperature} <span className="text-sm text-white/60">°F</span></p>
+            <p className="text-white text-lg">{patient.vitals.temperature ?? '--'} <span className="text-sm text-white/60">°F</span></p>
           </div>
           <div className="bg-white/5 rounded-lg p-3">
             <p className="text-white/60 text-xs mb-1">Blood Pressure</p>
-            <p className="text-white text-lg">{patient.vitals.bloodPressure} <span className="text-sm text-white/60">mmHg</span></p>
+            <p className="text-white text-lg">{patient.vitals.bloodPressure ?? '--'} <span className="text-sm text-white/60">mmHg</span></p>
           </div>
           <div className="bg-white/5 rounded-lg p-3">
             <p className="text-white/60 text-xs mb-1">O2 Saturation</p>
-            <p className="text-white text-lg">{patient.vitals.oxygenLevel} <span className="text-sm text-white/60">%</span></p>
+            <p className="text-white text-lg">{patient.vitals.oxygenLevel ?? '--'} <span className="text-sm text-white/60">%</span></p>
           </div>
         </div>
       </motion.div>
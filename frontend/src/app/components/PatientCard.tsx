@@ -10,10 +10,10 @@ interface PatientCardProps {
     severity: 'critical' | 'high' | 'medium' | 'low';
     symptoms: string[];
     vitals: {
-      heartRate: number;
-      temperature: number;
-      bloodPressure: string;
-      oxygenLevel: number;
+      heartRate: number | null;
+      temperature: number | null;
+      bloodPressure: string | null;
+      oxygenLevel: number | null;
     };
   };
   onClick?: () => void;
@@ -69,19 +69,19 @@ export function PatientCard({ patient, onClick }: PatientCardProps) {
       <div className="grid grid-cols-2 gap-2 mb-3">
         <div className="flex items-center gap-2 text-sm">
           <Heart className="w-4 h-4" style={{ color: colors.text }} />
-          <span className="text-white/80">{patient.vitals.heartRate} BPM</span>
+          <span className="text-white/80">{patient.vitals.heartRate ?? '--'} BPM</span>
         </div>
         <div className="flex items-center gap-2 text-sm">
           <Thermometer className="w-4 h-4" style={{ color: colors.text }} />
-          <span className="text-white/80">{patient.vitals.temperature}°F</span>
+          <span className="text-white/80">{patient.vitals.temperature ?? '--'}°F</span>
         </div>
         <div className="flex items-center gap-2 text-sm">
           <Activity className="w-4 h-4" style={{ color: colors.text }} />
-          <span className="text-white/80">{patient.vitals.bloodPressure}</span>
+          <span className="text-white/80">{patient.vitals.bloodPressure ?? '--'}</span>
         </div>
         <div className="flex items-center gap-2 text-sm">
           <Wind className="w-4 h-4" style={{ color: colors.text }} />
-          <span className="text-white/80">{patient.vitals.oxygenLevel}%</span>
+          <span className="text-white/80">{patient.vitals.oxygenLevel ?? '--'}%</span>
         </div>
       </div>
 
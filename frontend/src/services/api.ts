@@ -117,6 +117,14 @@ export const api = {
         return response.json();
     },
 
+    // Latest vitals plus a downsampled series; null when the patient has no readings
+    async getVitals(userId: number, seconds = 600, step = 60) {
+        const response = await fetch(`${API_BASE_URL}/vitals/${userId}?seconds=${seconds}&step=${step}`);
+        if (response.status === 404) return null;
+        if (!response.ok) throw new Error('Failed to fetch vitals');
+        return response.json();
+    },
+
     async getRecommendations(symptoms: string) {
         try {
             const response = await fetch(`${API_BASE_URL}/recommend`, {